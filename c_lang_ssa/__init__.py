@@ -1 +1,5 @@
-__all__ = ['cfgpass', 'block', 'ast_utils']
+__version__ = '0.1.0'
+
+__all__ = ['cfgpass', 'block', 'ast_utils', 'ssapass', 'blockgraph', 'dominators', 'dataflow', 'liveness', 'defuse',
+           'sccppass', 'dcepass', 'unitpass', 'batch', 'cache', 'ssaformat', 'emit', 'bench', 'stats', 'ingest',
+           'outofssapass', 'gvnpass', 'loops']
@@ -1,8 +1,20 @@
 import argparse
-from pycparser import parse_file
+import sys
+import tracemalloc
 from pycparser.c_ast import *
-from cfgpass.cfgpass import *
-from ssapass.ssapass import *
+from pycparser.c_generator import CGenerator
+from c_lang_ssa.unitpass.unitpass import *
+from c_lang_ssa.cache.cache import FunctionCache
+from c_lang_ssa.dcepass.dcepass import DCEPass
+from c_lang_ssa.gvnpass.gvnpass import GVNPass
+from c_lang_ssa.emit.emit import EmitOptions, emit_dot, emit_text
+from c_lang_ssa.loops.loops import write_report
+from c_lang_ssa.ingest.ingest import (PreprocessCache, add_preprocess_arguments, fake_libc_includes, load_text,
+                                      preprocess_options, without_fake_libc)
+from pycparser import CParser
+from c_lang_ssa.outofssapass.outofssapass import translate_unit
+from c_lang_ssa.sccppass.sccppass import SCCPPass
+from c_lang_ssa.stats.stats import Stats, phase
 
 def main():
     argparser = argparse.ArgumentParser('Dump AST')
@@ -12,14 +24,89 @@ def main():
                            help='name of file to parse')
     argparser.add_argument('--coord', help='show coordinates in the dump',
                            action='store_true')
+    argparser.add_argument('--jobs', help='number of processes for building functions SSA',
+                           type=int, default=1)
+    argparser.add_argument('--cache', help='directory of cache with SSA of functions from previous runs')
+    argparser.add_argument('--cache-size', help='cache size limit in megabytes',
+                           type=int, default=256)
+    argparser.add_argument('--dot', help='write DOT to file instead of rendering, - for stdout')
+    argparser.add_argument('--text', help='write SSA listing to file instead of rendering, - for stdout')
+    argparser.add_argument('--loops', help='write loop nests with induction variables to file, - for stdout')
+    argparser.add_argument('--c', help='translate out of SSA and write C to file, - for stdout')
+    argparser.add_argument('--optimize', help='run constant propagation, value numbering and dead code elimination over SSA',
+                           action='store_true')
+    argparser.add_argument('--function', help='emit only this function, can be repeated',
+                           action='append')
+    argparser.add_argument('--max-statements', help='cut emitted blocks to this number of lines',
+                           type=int)
+    argparser.add_argument('--collapse', help='emit straight-line chains of blocks as one block',
+                           action='store_true')
+    argparser.add_argument('--stats', help='print counters and time of pass phases to stderr',
+                           action='store_true')
+    argparser.add_argument('--stats-memory', help='with --stats also measure allocations of phases, slow',
+                           action='store_true')
+    add_preprocess_arguments(argparser)
     args = argparser.parse_args()
 
-    ast: FileAST = parse_file(args.filename, use_cpp=False)
+    stats = Stats() if args.stats else None
+    if stats is not None and args.stats_memory:
+        tracemalloc.start()
+    with phase(stats, 'parse'):
+        options = preprocess_options(args)
+        cpp_cache = PreprocessCache(args.cpp_cache) if args.cpp_cache and options is not None else None
+        text = load_text(args.filename, options, cpp_cache)
+        ast: FileAST = CParser().parse(text, args.filename)
     # ast.show()
-    cfg = CfgPass(ast)
+    cache = FunctionCache(args.cache, args.cache_size * 1024 * 1024) if args.cache else None
+    unit = UnitPass(ast, processes=args.jobs, cache=cache, stats=stats)
+    if args.optimize:
+        for ssa in unit.functions.values():
+            SCCPPass(ssa)
+            GVNPass(ssa)
+            DCEPass(ssa)
+    c_ast = None
+    if args.c is not None:
+        with phase(stats, 'outssa'):
+            c_ast = translate_unit(ast, unit.functions)
+        includes = ''
+        if options is not None and options.fake_libc:
+            # declarations from fake headers do not compile, real headers are included instead
+            includes = ''.join(f"#include <{h}>\n" for h in fake_libc_includes(text))
+            c_ast = without_fake_libc(c_ast)
+    if stats is not None:
+        print(stats.format(), file=sys.stderr)
+    if cache is not None:
+        print(f"cache: {cache.hits} hits, {cache.misses} misses, hit rate {cache.hit_rate:.0%}", file=sys.stderr)
     # cfg.show()
-    ssa = SSAPass(cfg.start_blocks[0])
-    ssa.show()
+    if c_ast is not None:
+        if args.c == '-':
+            print(includes + CGenerator().visit(c_ast))
+        else:
+            with open(args.c, 'w') as f:
+                f.write(includes + CGenerator().visit(c_ast))
+    if args.dot is None and args.text is None and args.loops is None:
+        if c_ast is None:
+            unit.show()
+        return
+
+    functions = unit.functions
+    if args.function:
+        unknown = [name for name in args.function if name not in functions]
+        if unknown:
+            argparser.error(f"unknown function: {', '.join(unknown)}")
+        functions = {name: functions[name] for name in args.function}
+    options = EmitOptions(max_statements=args.max_statements, collapse=args.collapse)
+    for (path, emit) in ((args.dot, emit_dot), (args.text, emit_text)):
+        if path == '-':
+            emit(sys.stdout, functions, options)
+        elif path is not None:
+            with open(path, 'w') as f:
+                emit(f, functions, options)
+    if args.loops == '-':
+        write_report(sys.stdout, functions)
+    elif args.loops is not None:
+        with open(args.loops, 'w') as f:
+            write_report(f, functions)
 
 if __name__ == '__main__':
     main()
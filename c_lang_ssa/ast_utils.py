@@ -1,31 +1,281 @@
+import copy
+from typing import Callable, Iterable, Optional, Sequence
+
 from pycparser.c_ast import *
 
 
-def rename_in_node(old_var_name: str, new_var_name: str, n: Node):
-    if n is None:
-        return
-    elif isinstance(n, Decl):
-        _rename_decl(old_var_name, new_var_name, n)
-    elif isinstance(n, Assignment):
-        _rename_assignment(old_var_name, new_var_name, n)
-    elif isinstance(n, BinaryOp):
-        _rename_binop(old_var_name, new_var_name, n)
-    elif isinstance(n, ID):
-        if n.name == old_var_name:
-            n.name = new_var_name
+# copies only declaration and its type modifiers, the rest of the subtree is shared with n
+def renamed_decl(n: Decl, new_name: str) -> Decl:
+    decl = copy.copy(n)
+    decl.name = new_name
+    parent = decl
+    while parent.type is not None and hasattr(parent.type, 'type'):
+        parent.type = copy.copy(parent.type)
+        if isinstance(parent.type, TypeDecl):
+            parent.type.declname = new_name
+            break
+        parent = parent.type
+    return decl
+
+
+# Function where every local variable has a name of its own: a declaration is renamed when its name
+# was declared before in the function (shadowing, sibling blocks) or names something outside of it,
+# so variables of different scopes are different variables for SSA. Parameters, extern and function
+# declarations keep names. func_def is not changed, only the paths to renamed nodes are copied.
+def unique_local_names(func_def: FuncDef) -> FuncDef:
+    scopes = [{}]
+    declared = []
+    references = []
+    outer = set()
+    args = func_def.decl.type.args
+    for p in args.params if args is not None else []:
+        if isinstance(p, Decl) and p.name is not None:
+            scopes[-1][p.name] = p
+            outer.add(p.name)
+    stack = list(reversed(func_def.body.block_items or []))
+    while stack:
+        n = stack.pop()
+        if n is None:
+            continue
+        if isinstance(n, tuple):
+            # ('pop',) closes scope, (name, decl) puts declaration into scope after its declarator
+            if len(n) == 1:
+                scopes.pop()
+            else:
+                scopes[-1][n[0]] = n[1]
+        elif isinstance(n, ID):
+            decl = next((scope[n.name] for scope in reversed(scopes) if n.name in scope), None)
+            if decl is None:
+                outer.add(n.name)
+            elif isinstance(decl, Decl):
+                references.append((n, decl))
+        elif isinstance(n, (Compound, For)):
+            scopes.append({})
+            stack.append(('pop',))
+            stack.extend(reversed([c for (_, c) in n.children()]))
+        elif isinstance(n, Decl):
+            if n.name is None:
+                stack.append(n.type)
+            elif isinstance(n.type, FuncDecl) or 'extern' in n.storage:
+                scopes[-1][n.name] = None
+                outer.add(n.name)
+            else:
+                declared.append(n)
+                stack.extend([n.init, (n.name, n), n.bitsize, n.type])
+        elif isinstance(n, Enumerator):
+            scopes[-1][n.name] = None
+            outer.add(n.name)
+            stack.append(n.value)
+        elif isinstance(n, StructRef):
+            stack.append(n.name)
+        elif isinstance(n, NamedInitializer):
+            stack.append(n.expr)
+        elif not isinstance(n, (Struct, Union, FuncDecl, Typedef)):
+            stack.extend(reversed([c for (_, c) in n.children()]))
+
+    taken = set(outer) | {d.name for d in declared}
+    seen = set(outer)
+    # new values of attributes of renamed nodes
+    updates: dict[Node, dict[str, str]] = {}
+    for d in declared:
+        name = d.name
+        if name in seen:
+            k = 1
+            while f"{d.name}_{k}" in taken:
+                k += 1
+            name = f"{d.name}_{k}"
+            taken.add(name)
+            updates[d] = {'name': name}
+            t = d.type
+            while not isinstance(t, TypeDecl):
+                t = t.type
+            updates[t] = {'declname': name}
+        seen.add(name)
+    for (n, decl) in references:
+        if decl in updates:
+            updates[n] = {'name': updates[decl]['name']}
+    return _updated(func_def, updates) if updates else func_def
+
+
+# copy of tree with attributes of nodes updated, nodes without updates below them are shared
+def _updated(root: Node, updates: dict[Node, dict[str, str]]) -> Node:
+    copies: dict[Node, Node] = {}
+    stack = [(root, False)]
+    while stack:
+        (n, visited) = stack.pop()
+        if not visited:
+            stack.append((n, True))
+            stack.extend((c, False) for (_, c) in n.children())
+            continue
+        changed = dict(updates.get(n, {}))
+        for attr in n.__slots__:
+            if attr in ('coord', '__weakref__'):
+                continue
+            value = getattr(n, attr)
+            if isinstance(value, Node) and value in copies:
+                changed[attr] = copies[value]
+            elif isinstance(value, list) and any(isinstance(v, Node) and v in copies for v in value):
+                changed[attr] = [copies.get(v, v) if isinstance(v, Node) else v for v in value]
+        if changed:
+            new = copy.copy(n)
+            for (attr, value) in changed.items():
+                setattr(new, attr, value)
+            copies[n] = new
+    return copies.get(root, root)
+
+
+INCREMENT_OPS = {'++': '+', 'p++': '+', '--': '-', 'p--': '-'}
+
+
+# node which gets new SSA name when statement n defines a variable
+_DEFINITION_NODES: dict[type, Callable[[Node], Optional[Decl | ID]]] = {
+    Decl: lambda n: n,
+    Assignment: lambda n: n.lvalue if isinstance(n.lvalue, ID) else None,
+    UnaryOp: lambda n: n.expr if n.op in INCREMENT_OPS and isinstance(n.expr, ID) else None,
+}
+
+
+def get_definition_node(n: Node) -> Optional[Decl | ID]:
+    definition_node = _DEFINITION_NODES.get(type(n))
+    return None if definition_node is None else definition_node(n)
+
+
+def get_definition(n: Node) -> Optional[str]:
+    node = get_definition_node(n)
+    return None if node is None else node.name
+
+
+def has_side_effects(n: Node) -> bool:
+    stack = [n]
+    while stack:
+        n = stack.pop()
+        if n is None:
+            continue
+        if isinstance(n, (FuncCall, Assignment)):
+            return True
+        if isinstance(n, UnaryOp) and n.op in INCREMENT_OPS:
+            return True
+        stack.extend(c for (_, c) in n.children())
+    return False
+
+
+# variables whose address is taken by &x, &s.f or &a[i] (not through ->): they may change through
+# pointers, so their SSA names do not follow their values
+def address_taken(statements: Iterable[Node]) -> set[str]:
+    taken = set()
+    for s in statements:
+        stack = [s]
+        while stack:
+            n = stack.pop()
+            if isinstance(n, UnaryOp) and n.op == '&':
+                base = n.expr
+                while isinstance(base, ArrayRef) or isinstance(base, StructRef) and base.type == '.':
+                    base = base.name
+                if isinstance(base, ID):
+                    taken.add(base.name)
+            if n is not None:
+                stack.extend(c for (_, c) in n.children())
+    return taken
+
+
+# variables defined inside expressions (x = y = 0, a[i++] = 1, while ((c = n) > 0)):
+# only definitions by whole statements get SSA names
+def nested_definitions(statements: Iterable[Node]) -> set[str]:
+    defined = set()
+    for s in statements:
+        stack = [c for (_, c) in s.children()]
+        while stack:
+            n = stack.pop()
+            node = get_definition_node(n) if not isinstance(n, Decl) else None
+            if node is not None:
+                defined.add(node.name)
+            if n is not None:
+                stack.extend(c for (_, c) in n.children())
+    return defined
+
+
+# subexpressions of a node which are evaluated, in source order: target of plain assignment to variable,
+# field names and types of casts are not usages. Types without entry get all children,
+# the entry is resolved once per class through its MRO
+_OPERANDS: dict[type, Callable[[Node], Sequence[Optional[Node]]]] = {
+    ID: lambda n: (),
+    Constant: lambda n: (),
+    BinaryOp: lambda n: (n.left, n.right),
+    UnaryOp: lambda n: (n.expr,),
+    Assignment: lambda n: (n.rvalue,) if n.op == '=' and isinstance(n.lvalue, ID) else (n.lvalue, n.rvalue),
+    FuncCall: lambda n: (n.name, n.args),
+    ExprList: lambda n: n.exprs,
+    ArrayRef: lambda n: (n.name, n.subscript),
+    StructRef: lambda n: (n.name,),
+    Cast: lambda n: (n.expr,),
+    TernaryOp: lambda n: (n.cond, n.iftrue, n.iffalse),
+    InitList: lambda n: n.exprs,
+    Return: lambda n: (n.expr,),
+    Typename: lambda n: (),
+    IdentifierType: lambda n: (),
+}
+
+
+def _all_children(n: Node) -> list[Node]:
+    return [c for (_, c) in n.children()]
+
+
+def _operands_of(node_type: type) -> Callable[[Node], Sequence[Optional[Node]]]:
+    operands = next((_OPERANDS[t] for t in node_type.__mro__ if t in _OPERANDS), _all_children)
+    _OPERANDS[node_type] = operands
+    return operands
+
 
+# replacements are subtrees substituted by optimization passes, usages are looked up in them instead
+def get_usages(n: Node, replacements: Optional[dict[Node, Node]] = None) -> list[ID]:
+    usages = []
+    stack = [n]
+    while stack:
+        n = stack.pop()
+        if replacements:
+            n = replacements.get(n, n)
+        if n is None:
+            continue
+        node_type = type(n)
+        if node_type is ID:
+            usages.append(n)
+            continue
+        operands = _OPERANDS.get(node_type) or _operands_of(node_type)
+        stack.extend(reversed(operands(n)))
+    return usages
 
-def _rename_decl(old_var_name: str, new_var_name: str, n: Decl):
-    rename_in_node(old_var_name, new_var_name, n.init)
 
+_CHAR_ESCAPES = {'n': 10, 't': 9, 'r': 13, '0': 0, '\\': 92, "'": 39, '"': 34, 'a': 7, 'b': 8, 'f': 12, 'v': 11}
 
-def _rename_assignment(old_var_name: str, new_var_name: str, n: Assignment):
-    # rename_in_node(old_var_name, new_var_name, n.lvalue)
-    rename_in_node(old_var_name, new_var_name, n.rvalue)
 
+# value of integer, floating or character literal, None for anything else
+def constant_value(n: Constant) -> Optional[int | float]:
+    value = n.value
+    try:
+        if n.type == 'char' and len(value) >= 3:
+            body = value[1:-1]
+            if len(body) == 1:
+                return ord(body)
+            if len(body) == 2 and body[0] == '\\':
+                return _CHAR_ESCAPES.get(body[1])
+            return None
+        if n.type in ('float', 'double', 'long double'):
+            return float(value.rstrip('fFlL'))
+        if 'int' in n.type or 'long' in n.type:
+            value = value.rstrip('uUlL')
+            if value.lower().startswith('0x'):
+                return int(value, 16)
+            if value.lower().startswith('0b'):
+                return int(value[2:], 2)
+            if len(value) > 1 and value.startswith('0'):
+                return int(value, 8)
+            return int(value)
+    except ValueError:
+        return None
+    return None
 
-def _rename_binop(old_var_name: str, new_var_name: str, n: BinaryOp):
-    rename_in_node(old_var_name, new_var_name, n.left)
-    rename_in_node(old_var_name, new_var_name, n.right)
 
-# def get_usages()
\ No newline at end of file
+def make_constant(value: int | float) -> Constant:
+    if isinstance(value, float):
+        return Constant('double', repr(value))
+    return Constant('int', str(value))
@@ -0,0 +1,6 @@
+import sys
+
+from c_lang_ssa.batch.batch import main
+
+if __name__ == '__main__':
+    sys.exit(main())
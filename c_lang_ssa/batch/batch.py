@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Optional
+
+from c_lang_ssa.cache.cache import FunctionCache
+from c_lang_ssa.emit.emit import emit_text
+from c_lang_ssa.ingest.ingest import (PreprocessCache, PreprocessOptions, add_preprocess_arguments, load_file,
+                                      preprocess_options)
+from c_lang_ssa.ssaformat.ssaformat import SSAWriter
+from c_lang_ssa.stats.stats import Stats
+from c_lang_ssa.unitpass.unitpass import UnitPass
+
+
+@dataclass(frozen=True)
+class BatchOptions:
+    pruned: bool = False
+    cache_dir: Optional[str] = None
+    cache_bytes: int = 256 * 1024 * 1024
+    binary: bool = False
+    stats: bool = False
+    preprocess: Optional[PreprocessOptions] = None
+    cpp_cache_dir: Optional[str] = None
+
+
+def collect_files(paths: list[str], files_from: Optional[str] = None) -> list[str]:
+    files = []
+    if files_from is not None:
+        with open(files_from) as f:
+            paths = paths + [line.strip() for line in f if line.strip()]
+    for path in paths:
+        if os.path.isdir(path):
+            for (root, _, names) in os.walk(path):
+                files += [os.path.join(root, n) for n in sorted(names) if n.endswith('.c')]
+        else:
+            files.append(path)
+    return files
+
+
+def process_file(path: str, output_path: Optional[str], options: BatchOptions = BatchOptions()) -> dict:
+    record = {'file': path, 'status': 'ok'}
+    start = time.perf_counter()
+    _process_file(path, output_path, options, record, start)
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+
+def _process_file(path: str, output_path: Optional[str], options: BatchOptions, record: dict, start: float):
+    try:
+        cpp_cache = PreprocessCache(options.cpp_cache_dir) \
+            if options.cpp_cache_dir is not None and options.preprocess is not None else None
+        ast = load_file(path, options.preprocess, cpp_cache)
+        parsed = time.perf_counter()
+        record['parse_seconds'] = parsed - start
+
+        cache = FunctionCache(options.cache_dir, options.cache_bytes) if options.cache_dir is not None else None
+        stats = Stats() if options.stats else None
+        unit = UnitPass(ast, pruned=options.pruned, cache=cache, stats=stats)
+        if stats is not None:
+            record['stats'] = stats.to_dict()
+        if cache is not None:
+            record['cache_hits'] = cache.hits
+            record['cache_misses'] = cache.misses
+        record['ssa_seconds'] = time.perf_counter() - parsed
+        record['functions'] = len(unit.functions)
+        record['blocks'] = sum(len(ssa.graph) for ssa in unit.functions.values())
+        record['phis'] = sum(len(phis) for ssa in unit.functions.values() for phis in ssa.phis)
+
+        if output_path is not None:
+            os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+            if options.binary:
+                with open(output_path, 'wb') as f, SSAWriter(f) as writer:
+                    for (name, ssa) in unit.functions.items():
+                        writer.write(name, ssa)
+            else:
+                with open(output_path, 'w') as f:
+                    emit_text(f, unit.functions)
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+        record['traceback'] = traceback.format_exc()
+
+
+def _output_path(path: str, output_dir: Optional[str], options: BatchOptions = BatchOptions()) -> Optional[str]:
+    if output_dir is None:
+        return None
+    relative = os.path.relpath(os.path.abspath(path)).lstrip(os.sep)
+    relative = relative.replace('..' + os.sep, '')
+    return os.path.join(output_dir, relative + ('.ssab' if options.binary else '.ssa'))
+
+
+def run_batch(files: list[str], output_dir: Optional[str], report, jobs: int = 1,
+              options: BatchOptions = BatchOptions()) -> int:
+    errors = 0
+
+    def write_record(record: dict):
+        nonlocal errors
+        if record['status'] != 'ok':
+            errors += 1
+        report.write(json.dumps(record) + '\n')
+        report.flush()
+
+    if jobs <= 1:
+        for path in files:
+            write_record(process_file(path, _output_path(path, output_dir, options), options))
+        return errors
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(process_file, path, _output_path(path, output_dir, options), options): path
+                   for path in files}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {'file': futures[future], 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+            write_record(record)
+    return errors
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    argparser = argparse.ArgumentParser('Build SSA for many C files')
+    argparser.add_argument('paths', nargs='*', help='C files or directories with C files')
+    argparser.add_argument('--files-from', help='file with list of C files, one per line')
+    argparser.add_argument('--output', help='directory for SSA listings')
+    argparser.add_argument('--binary', help='write compact binary SSA dumps instead of text listings',
+                           action='store_true')
+    argparser.add_argument('--report', help='JSON lines report file, stdout by default')
+    argparser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='number of worker processes')
+    argparser.add_argument('--pruned', help='build pruned SSA', action='store_true')
+    argparser.add_argument('--stats', help='add counters and time of pass phases to report', action='store_true')
+    argparser.add_argument('--cache', help='directory of cache with SSA of functions from previous runs')
+    argparser.add_argument('--cache-size', help='cache size limit in megabytes', type=int, default=256)
+    add_preprocess_arguments(argparser)
+    args = argparser.parse_args(argv)
+
+    files = collect_files(args.paths, args.files_from)
+    options = BatchOptions(pruned=args.pruned, cache_dir=args.cache, cache_bytes=args.cache_size * 1024 * 1024,
+                           binary=args.binary, stats=args.stats, preprocess=preprocess_options(args),
+                           cpp_cache_dir=args.cpp_cache)
+    start = time.perf_counter()
+    if args.report is not None:
+        with open(args.report, 'w') as report:
+            errors = run_batch(files, args.output, report, args.jobs, options)
+    else:
+        errors = run_batch(files, args.output, sys.stdout, args.jobs, options)
+    print(f"{len(files)} files, {errors} errors, {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return 1 if errors > 0 else 0
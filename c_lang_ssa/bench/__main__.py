@@ -0,0 +1,6 @@
+import sys
+
+from c_lang_ssa.bench.bench import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from typing import Optional
+
+from pycparser import parse_file
+
+import c_lang_ssa
+from c_lang_ssa.bench.synthetic import SyntheticParams, generate_unit
+from c_lang_ssa.cfgpass.cfgpass import CfgPass
+from c_lang_ssa.emit.emit import emit_dot, emit_text
+from c_lang_ssa.ssapass.ssapass import SSAPass
+from c_lang_ssa.stats.stats import Stats, phase
+
+def _run_pipeline(path: str, stats: Stats) -> dict:
+    with phase(stats, 'parse'):
+        ast = parse_file(path, use_cpp=False)
+    cfg = CfgPass(ast, stats=stats)
+    functions = {name: SSAPass(start_block, stats=stats) for (name, start_block) in cfg.functions.items()}
+    with phase(stats, 'render_text'):
+        emit_text(io.StringIO(), functions)
+    with phase(stats, 'render_dot'):
+        emit_dot(io.StringIO(), functions)
+    return {
+        'functions': len(functions),
+        'blocks': sum(len(ssa.graph) for ssa in functions.values()),
+        'phis': sum(len(phis) for ssa in functions.values() for phis in ssa.phis),
+        'statements': sum(len(ssa.graph.statements) for ssa in functions.values()),
+    }
+
+
+def bench_file(path: str, repeat: int = 3, memory: bool = False) -> dict:
+    with open(path) as f:
+        result = {'file': path, 'lines': sum(1 for _ in f)}
+    runs = []
+    for _ in range(repeat):
+        stats = Stats(node_types=False)
+        result.update(_run_pipeline(path, stats))
+        runs.append(stats)
+    # minimum over repeats is the least noisy estimate of time of a phase
+    result['seconds'] = {name: min(run.seconds[name] for run in runs) for name in runs[0].seconds}
+    result['total_seconds'] = min(sum(run.seconds.values()) for run in runs)
+    result['counters'] = dict(runs[0].counters)
+
+    if memory:
+        stats = Stats(node_types=False)
+        tracemalloc.start()
+        try:
+            _run_pipeline(path, stats)
+            result['peak_bytes'] = dict(stats.peak)
+            result['total_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def bench_synthetic(params: SyntheticParams, repeat: int = 3, memory: bool = False) -> dict:
+    with tempfile.NamedTemporaryFile('w', suffix='.c', delete=False) as f:
+        f.write(generate_unit(params))
+    try:
+        result = bench_file(f.name, repeat, memory)
+    finally:
+        os.unlink(f.name)
+    result['file'] = None
+    result['params'] = params.__dict__.copy()
+    return result
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(c_lang_ssa.__file__), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    argparser = argparse.ArgumentParser('Benchmark CFG and SSA construction')
+    argparser.add_argument('files', nargs='*', help='C files to benchmark, synthetic workloads if none given')
+    argparser.add_argument('--statements', type=int, nargs='+', default=[100, 1000, 5000],
+                           help='statements per synthetic function, one workload for every size')
+    argparser.add_argument('--loop-depth', type=int, default=2)
+    argparser.add_argument('--branch-density', type=float, default=0.2)
+    argparser.add_argument('--variables', type=int, default=8)
+    argparser.add_argument('--functions', type=int, default=1)
+    argparser.add_argument('--seed', type=int, default=0)
+    argparser.add_argument('--repeat', type=int, default=3, help='runs of every workload, minimum time is reported')
+    argparser.add_argument('--memory', help='measure peak memory of phases in an extra run', action='store_true')
+    argparser.add_argument('--output', help='JSON results file, stdout by default')
+    args = argparser.parse_args(argv)
+
+    if args.files:
+        workloads = [bench_file(path, args.repeat, args.memory) for path in args.files]
+    else:
+        workloads = []
+        for statements in args.statements:
+            params = SyntheticParams(statements=statements, loop_depth=args.loop_depth,
+                                     branch_density=args.branch_density, variables=args.variables,
+                                     functions=args.functions, seed=args.seed)
+            workloads.append(bench_synthetic(params, args.repeat, args.memory))
+            print(f"{statements} statements: {workloads[-1]['total_seconds']:.3f}s", file=sys.stderr)
+
+    results = {
+        'version': c_lang_ssa.__version__,
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        # kilobytes on Linux, bytes on macOS
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'workloads': workloads,
+    }
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    return 0
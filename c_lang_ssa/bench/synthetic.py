@@ -0,0 +1,97 @@
+import random
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class SyntheticParams:
+    # statements in every function, compound statements count as one plus their bodies
+    statements: int = 100
+    # every function has at least one loop nest of this depth
+    loop_depth: int = 2
+    # probability that statement is if-else
+    branch_density: float = 0.2
+    variables: int = 8
+    functions: int = 1
+    seed: int = 0
+
+
+# Generates C with only constructs which CfgPass supports: declarations, assignments,
+# if-else, while and for loops with break and continue, and return at the end of function
+class _FunctionWriter:
+    LOOP_PROBABILITY = 0.1
+    EXIT_PROBABILITY = 0.05
+
+    def __init__(self, params: SyntheticParams, rng: random.Random):
+        self._params = params
+        self._rng = rng
+        self._loops = 0
+        self.lines: list[str] = []
+
+    def _var(self) -> str:
+        return f"v{self._rng.randrange(self._params.variables)}"
+
+    def _operand(self) -> str:
+        return self._var() if self._rng.random() < 0.7 else str(self._rng.randrange(100))
+
+    def _condition(self) -> str:
+        return f"{self._var()} {self._rng.choice(['<', '>', '==', '!='])} {self._operand()}"
+
+    def _emit(self, indent: int, line: str):
+        self.lines.append('    ' * indent + line)
+
+    def body(self, budget: int, indent: int, depth: int, in_loop: bool):
+        # loop nest of full depth is the first statement of function body and of every loop body
+        force_loop = depth < self._params.loop_depth
+        while budget > 0:
+            budget -= 1
+            roll = self._rng.random()
+            if depth < self._params.loop_depth and budget > 0 and (force_loop or roll < self.LOOP_PROBABILITY):
+                force_loop = False
+                inner = self._rng.randint(1, max(1, budget // 2)) if budget > 1 else 1
+                budget -= inner
+                self._loop(inner, indent, depth)
+            elif budget > 1 and roll < self.LOOP_PROBABILITY + self._params.branch_density:
+                inner = self._rng.randint(2, max(2, budget // 2)) if budget > 2 else 2
+                inner = min(inner, budget)
+                budget -= inner
+                self._if(inner, indent, depth, in_loop)
+            elif in_loop and roll > 1 - self.EXIT_PROBABILITY:
+                self._emit(indent, f"if ({self._condition()}) {self._rng.choice(['break', 'continue'])};")
+            else:
+                op = self._rng.choice(['+', '-', '*', '&', '^'])
+                self._emit(indent, f"{self._var()} = {self._operand()} {op} {self._operand()};")
+
+    def _loop(self, budget: int, indent: int, depth: int):
+        self._loops += 1
+        if self._rng.random() < 0.5:
+            self._emit(indent, f"while ({self._condition()}) {{")
+        else:
+            i = f"i{self._loops}"
+            self._emit(indent, f"for (int {i} = 0; {i} < {self._operand()}; {i} = {i} + 1) {{")
+        self.body(budget, indent + 1, depth + 1, True)
+        self._emit(indent, "}")
+
+    def _if(self, budget: int, indent: int, depth: int, in_loop: bool):
+        then_budget = max(1, budget // 2)
+        self._emit(indent, f"if ({self._condition()}) {{")
+        self.body(then_budget, indent + 1, depth, in_loop)
+        if budget - then_budget > 0:
+            self._emit(indent, "} else {")
+            self.body(budget - then_budget, indent + 1, depth, in_loop)
+        self._emit(indent, "}")
+
+
+def generate_function(name: str, params: SyntheticParams, rng: random.Random) -> str:
+    writer = _FunctionWriter(params, rng)
+    writer.lines.append(f"int {name}(int v0) {{")
+    for v in range(1, params.variables):
+        writer.lines.append(f"    int v{v} = {rng.randrange(10)};")
+    writer.body(params.statements, 1, 0, False)
+    writer.lines.append(f"    return v{rng.randrange(params.variables)};")
+    writer.lines.append("}")
+    return '\n'.join(writer.lines) + '\n'
+
+
+def generate_unit(params: SyntheticParams) -> str:
+    rng = random.Random(params.seed)
+    return '\n'.join(generate_function(f"f{i}", params, rng) for i in range(params.functions))
@@ -4,10 +4,8 @@ from abc import *
 from dataclasses import dataclass
 from typing import Optional
 
-import frozendict as frozendict
 from pycparser.c_ast import *
 from pycparser.c_generator import CGenerator
-from c_lang_ssa.ast_utils import rename_in_node
 
 
 @dataclass
@@ -17,15 +15,41 @@ class DotParams:
     shape: str
 
 
+@dataclass(slots=True, eq=False)
+class Phi:
+    variable: str
+    name: str
+    args: list[Optional[str]]
+
+    def __str__(self):
+        return f"{self.name} = phi({', '.join(a or 'undef' for a in self.args)})"
+
+
 class Block(ABC):
+    __slots__ = ('_statements', '_parents', '_next_blocks', '_color', 'is_final', 'index', '_mark')
+
+    # every traversal takes a fresh mark, so visited blocks are found without hashing
+    _last_mark = 0
+
     def __init__(self, is_final: bool = False):
         self._statements = []
         self._parents = []
         self._next_blocks = []
         self._color = "white"
-        self._phis = {}
-        self._decls = []
         self.is_final = is_final
+        self.index = -1
+        self._mark = 0
+
+    @staticmethod
+    def new_mark() -> int:
+        Block._last_mark += 1
+        return Block._last_mark
+
+    def is_marked(self, mark: int) -> bool:
+        return self._mark == mark
+
+    def set_mark(self, mark: int):
+        self._mark = mark
 
     def add_parent(self, block: 'Block'):
         self._parents.append(block)
@@ -48,6 +72,10 @@ class Block(ABC):
     def set_color(self, color):
         self._color = color
 
+    @property
+    def color(self) -> str:
+        return self._color
+
     @property
     def next_blocks(self) -> list['Block']:
         return self._next_blocks
@@ -57,161 +85,109 @@ class Block(ABC):
         return [(b, "black") for b in self._next_blocks]
 
     @abc.abstractmethod
-    def dot_params(self) -> DotParams:
+    def dot_params(self, cg: Optional[CGenerator] = None, phis: list['Phi'] = ()) -> DotParams:
         pass
 
-    @property
-    @abc.abstractmethod
-    def _can_be_merged(self) -> bool:
-        return False
-
-    @abc.abstractmethod
-    def _merge_with(self, block: 'Block'):
-        pass
-
-    def merge_blocks_recursive(self):
-        self._merge_blocks_recursive(set())
-
-    # empty block is block without statements and always base block
-    # it can have more than one parent, but only one next block
-    def _eliminate_empty(self):
-        next_block = self._next_blocks[0]
-        next_block._parents.remove(self)
-        for p in self._parents:
-            # next_block.set_color(self._color)
-            p._next_blocks.remove(self)
-            p._next_blocks.append(next_block)
-            next_block._parents.append(p)
-
-    def _merge_blocks_recursive(self, was):
-        was.add(id(self))
-
-        # merge chains of base block line b1 -> b2 -> b3
-        i = 0
-        while self._can_be_merged and i < len(self.next_blocks):
-            if self.next_blocks[i]._can_be_merged:
-                self._merge_with(self.next_blocks[i])
-                i = 0
-            else:
-                i += 1
-
-        i = 0
-        while i < len(self.next_blocks):
-            if self.next_blocks[i].is_empty:
-                self.next_blocks[i]._eliminate_empty()
-                i = 0
-            else:
-                i += 1
-
-        for next_block in self.next_blocks:
-            if id(next_block) not in was:
-                next_block._merge_blocks_recursive(was)
-
-    def fill_decls(self) -> set[str]:
-        return self._fill_decls(set())
-
-    def _fill_decls(self, was) -> set[str]:
-        was.add(id(self))
-
-        for s in self._statements:
-            if isinstance(s, Decl):
-                self._decls.append(s.name)
-
-        decls = (set(self._decls))
-
-        for next_block in self.next_blocks:
-            if id(next_block) not in was:
-                decls = decls | next_block._fill_decls(was)
-        return decls
-
-    def init_phi_functions(self, variables: frozenset[str]):
-        self._init_phi_functions(frozenset(), set())
-
-    def _init_phi_functions(self, variables: frozenset[str], was):
-        was.add(id(self))
-
-        for s in self._statements:
-            if isinstance(s, Decl):
-                variables = variables.union(frozenset([s.name]))
-
-        for next_block in self.next_blocks:
-            if len(next_block.parents_blocks) > 1:
-                for v in variables:
-                    next_block._phis[v] = []
-
-            if id(next_block) not in was:
-                next_block._init_phi_functions(variables, was)
-
-    def rename(self, variables):
-        # vd = frozendict.frozendict()
-        vd = {}
-        for v in variables:
-            vd[v] = 0
-        self._rename(vd, frozendict.frozendict(), was=set())
-
-    def _rename(self, var_available_names, env, was):
-        was.add(id(self))
-
-        for phi in list(self._phis.keys()):
-            new_name = f"{phi}_{var_available_names[phi]}"
-            var_available_names[phi] = var_available_names[phi] + 1
-            env = env.set(phi, new_name)
-            self._phis[new_name] = self._phis[phi]
-            del self._phis[phi]
-
-        for s in self._statements:
-            for v, v_index in list(env.items()):
-                rename_in_node(v, v_index, s)
-
-            if isinstance(s, Assignment) and isinstance(s.lvalue, ID):
-                name = s.lvalue.name
-                new_name = f"{name}_{var_available_names[name]}"
-                s.lvalue.name = new_name
-                var_available_names[name] = var_available_names[name] + 1
-                env = env.set(name, new_name)
-                # vd = vd.set(name, vd[name] + 1)
-            elif isinstance(s, Decl):
-                name = s.name
-                new_name = f"{name}_{var_available_names[name]}"
-                s.name = new_name
-                s.type.declname = f"{name}_{var_available_names[name]}"
-                var_available_names[name] = var_available_names[name] + 1
-                env = env.set(name, new_name)
-                # vd = vd.set(name, vd[name] + 1)
-
-        for next_block in self.next_blocks:
-            if len(next_block._parents) > 1:
-                for v, v_index in env.items():
-                    for phi in next_block._phis.keys():
-                        if phi.startswith(v):
-                            next_block._phis[phi].append(v_index)
-            if id(next_block) not in was:
-                next_block._rename(var_available_names, env, was)
-
-    @staticmethod
-    def _render_phi(name, args):
-        return f"{name} = phi({', '.join(args)})"
-
-    def _render_statements(self) -> str:
+    # CFG simplification in one linear sweep over blocks reachable from self:
+    # empty blocks with one next block are bypassed through forwarding pointers (with path compression),
+    # then every chain where a base block has one next base block and that block has no other parents
+    # is collapsed into its head, statements of the chain are concatenated once.
+    # The start block and blocks without next blocks (function exits) are never removed,
+    # parents lists of the remaining blocks are exact afterwards.
+    # Returns numbers of merged and eliminated empty blocks.
+    def merge_blocks_recursive(self) -> tuple[int, int]:
+        blocks = self._reachable_preorder()
+        forward = {b: b._next_blocks[0] for b in blocks
+                   if not b._statements and len(b._next_blocks) == 1 and b is not self and isinstance(b, BaseBlock)}
+
+        def find(b: Block) -> Block:
+            path = []
+            seen = set()
+            while b in forward:
+                if b in seen:
+                    # cycle of empty blocks is kept as a loop on one of them
+                    del forward[b]
+                    break
+                seen.add(b)
+                path.append(b)
+                b = forward[b]
+            for p in path:
+                if p in forward:
+                    forward[p] = b
+            return b
+
+        for (b, target) in list(forward.items()):
+            if target in forward:
+                find(b)
+        live = [b for b in blocks if b not in forward]
+        for b in live:
+            b._parents = []
+        for b in live:
+            next_blocks = b._next_blocks
+            for (i, n) in enumerate(next_blocks):
+                if n in forward:
+                    next_blocks[i] = n = forward[n]
+                n._parents.append(b)
+
+        merged = 0
+        absorbed = set()
+        for head in live:
+            if head in absorbed or not isinstance(head, BaseBlock):
+                continue
+            segments = []
+            while len(head._next_blocks) == 1:
+                b = head._next_blocks[0]
+                if b is self or b is head or not isinstance(b, BaseBlock) \
+                        or len(b._parents) != 1 or len(b._next_blocks) == 0:
+                    break
+                segments.append(b._statements)
+                head._next_blocks = b._next_blocks
+                head.is_final = b.is_final
+                for n in b._next_blocks:
+                    n._parents = [head if p is b else p for p in n._parents]
+                absorbed.add(b)
+            if segments:
+                head._statements = head._statements + [s for segment in segments for s in segment]
+                merged += len(segments)
+        return merged, len(forward)
+
+    def _reachable_preorder(self) -> list['Block']:
+        mark = Block.new_mark()
+        self._mark = mark
+        blocks = []
+        worklist = [self]
+        while worklist:
+            block = worklist.pop()
+            blocks.append(block)
+            for next_block in reversed(block._next_blocks):
+                if next_block._mark != mark:
+                    next_block._mark = mark
+                    worklist.append(next_block)
+        return blocks
+
+    def _render_statements(self, cg: Optional[CGenerator] = None, phis: list['Phi'] = ()) -> str:
         output = ""
-        if len(self._phis) > 0:
-            output = "\\l".join([self._render_phi(p, args)for (p, args) in self._phis.items()]) + "\\l"
-        cg = CGenerator()
+        if len(phis) > 0:
+            output = "\\l".join([str(p) for p in phis]) + "\\l"
+        cg = cg or CGenerator()
         for s in self._statements:
             output += f"{cg.visit(s)}\\l".replace("<", "\\<").replace(">", "\\>")
         return output
 
-    def generate_dot(self, dot):
-        self._generate_dot(dot, was=set())
-
-    def _generate_dot(self, dot, was):
-        was.add(id(self))
-        params = self.dot_params()
-        dot.node(str(id(self)), shape=params.shape, label=params.label, fillcolor=params.color, style='filled')
-        for (next_block, color) in self.next_blocks_with_edge_color:
-            if id(next_block) not in was:
-                next_block._generate_dot(dot, was)
-            dot.edge(str(id(self)), str(id(next_block)), color=color)
+    # SSA views pass generator which knows new names and phis of every block by its index
+    def generate_dot(self, dot, cg: Optional[CGenerator] = None, phis: Optional[list[list['Phi']]] = None):
+        mark = Block.new_mark()
+        self.set_mark(mark)
+        worklist = [self]
+        while worklist:
+            block = worklist.pop()
+            params = block.dot_params(cg, phis[block.index] if phis is not None else ())
+            dot.node(str(id(block)), shape=params.shape, label=params.label, fillcolor=params.color, style='filled')
+            for (next_block, color) in block.next_blocks_with_edge_color:
+                if not next_block.is_marked(mark):
+                    next_block.set_mark(mark)
+                    worklist.append(next_block)
+                dot.edge(str(id(block)), str(id(next_block)), color=color)
 
     def __str__(self):
         rendered_statements = self._render_statements().replace('\\l', ';')
@@ -221,6 +197,7 @@ class Block(ABC):
 
 
 class BaseBlock(Block):
+    __slots__ = ('_label',)
 
     def __init__(self, is_final: bool = False, label: str = ""):
         super().__init__(is_final=is_final)
@@ -234,21 +211,13 @@ class BaseBlock(Block):
     def add_next_block(self, block: 'Block'):
         self._next_blocks.append(block)
 
-    def dot_params(self) -> DotParams:
-        label = self._render_statements()
+    def dot_params(self, cg: Optional[CGenerator] = None, phis: list['Phi'] = ()) -> DotParams:
+        label = self._render_statements(cg, phis)
         return DotParams(label=label, color=self._color, shape='record')
 
-    @property
-    def _can_be_merged(self) -> bool:
-        return len(self.next_blocks) == 1 and len(self._parents) <= 1
-
-    def _merge_with(self, block: 'BaseBlock'):
-        self._next_blocks = block.next_blocks
-        self._statements += block.statements
-        del block
-
 
 class ConditionBlock(Block):
+    __slots__ = ()
 
     def __init__(self):
         super().__init__(is_final=False)
@@ -265,8 +234,8 @@ class ConditionBlock(Block):
         block.set_color("#ff9999")
         self._next_blocks[1] = block
 
-    def dot_params(self) -> DotParams:
-        label = self._render_statements()
+    def dot_params(self, cg: Optional[CGenerator] = None, phis: list['Phi'] = ()) -> DotParams:
+        label = self._render_statements(cg, phis)
         return DotParams(label=label, color='white', shape='record')
 
     # def _render_statements(self) -> str:
@@ -277,9 +246,3 @@ class ConditionBlock(Block):
     def next_blocks_with_edge_color(self) -> list[tuple['Block', str]]:
         return [(self._next_blocks[0], "#2b782a"), (self._next_blocks[1], "red")]
 
-    @property
-    def _can_be_merged(self) -> bool:
-        return False
-
-    def _merge_with(self, block: 'BaseBlock'):
-        raise Exception("ConditionBlock can't be merged")
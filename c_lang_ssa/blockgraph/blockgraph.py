@@ -0,0 +1,95 @@
+from array import array
+
+from pycparser.c_ast import *
+
+from c_lang_ssa.block.block import *
+
+
+# Dense view of CFG reachable from start block: blocks are numbered in reverse postorder,
+# edges and statements are kept in flat arrays (CSR), so analyses work with ints and bit vectors
+class BlockGraph:
+    __slots__ = ('blocks', 'succ_offsets', 'succs', 'succ_positions',
+                 'pred_offsets', 'preds', 'pred_edges', 'statement_offsets', 'statements')
+
+    def __init__(self, start_block: Block):
+        self.blocks = self._reverse_postorder(start_block)
+        for (i, b) in enumerate(self.blocks):
+            b.index = i
+        self._fill_edges()
+        self._fill_statements()
+
+    @staticmethod
+    def _reverse_postorder(start_block: Block) -> list[Block]:
+        postorder = []
+        mark = Block.new_mark()
+        start_block.set_mark(mark)
+        stack = [(start_block, iter(start_block.next_blocks))]
+        while stack:
+            (block, successors) = stack[-1]
+            for next_block in successors:
+                if not next_block.is_marked(mark):
+                    next_block.set_mark(mark)
+                    stack.append((next_block, iter(next_block.next_blocks)))
+                    break
+            else:
+                stack.pop()
+                postorder.append(block)
+        postorder.reverse()
+        return postorder
+
+    # predecessors are rebuilt from edges, so only reachable blocks count,
+    # succ_positions[e] is the position of the source of edge e among predecessors of its target,
+    # pred_edges is aligned with preds and holds the edge of every predecessor
+    def _fill_edges(self):
+        n = len(self.blocks)
+        self.succ_offsets = array('i', [0] * (n + 1))
+        self.succs = array('i')
+        in_degree = [0] * (n + 1)
+        for (i, b) in enumerate(self.blocks):
+            for next_block in b.next_blocks:
+                self.succs.append(next_block.index)
+                in_degree[next_block.index + 1] += 1
+            self.succ_offsets[i + 1] = len(self.succs)
+
+        self.pred_offsets = array('i', [0] * (n + 1))
+        for i in range(n):
+            self.pred_offsets[i + 1] = self.pred_offsets[i] + in_degree[i + 1]
+        self.preds = array('i', [0] * len(self.succs))
+        self.succ_positions = array('i', [0] * len(self.succs))
+        self.pred_edges = array('i', [0] * len(self.succs))
+        filled = [0] * n
+        for b in range(n):
+            for e in range(self.succ_offsets[b], self.succ_offsets[b + 1]):
+                target = self.succs[e]
+                self.preds[self.pred_offsets[target] + filled[target]] = b
+                self.pred_edges[self.pred_offsets[target] + filled[target]] = e
+                self.succ_positions[e] = filled[target]
+                filled[target] += 1
+
+    def _fill_statements(self):
+        self.statement_offsets = array('i', [0])
+        self.statements = []
+        for b in self.blocks:
+            self.statements += b.statements
+            self.statement_offsets.append(len(self.statements))
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def successors(self, b: int) -> array:
+        return self.succs[self.succ_offsets[b]:self.succ_offsets[b + 1]]
+
+    def successor_edges(self, b: int) -> range:
+        return range(self.succ_offsets[b], self.succ_offsets[b + 1])
+
+    def predecessors(self, b: int) -> array:
+        return self.preds[self.pred_offsets[b]:self.pred_offsets[b + 1]]
+
+    def predecessor_edge(self, b: int, position: int) -> int:
+        return self.pred_edges[self.pred_offsets[b] + position]
+
+    def predecessors_count(self, b: int) -> int:
+        return self.pred_offsets[b + 1] - self.pred_offsets[b]
+
+    def block_statements(self, b: int) -> list[Node]:
+        return self.statements[self.statement_offsets[b]:self.statement_offsets[b + 1]]
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from typing import Optional
+
+from pycparser.c_ast import *
+from pycparser.c_generator import CGenerator
+
+import c_lang_ssa
+from c_lang_ssa.ssapass.ssapass import SSAPass
+
+_SUFFIX = '.ssa.pickle'
+# bumped when CFG or SSA construction changes, so entries built by older code are not used
+_CONSTRUCTION_VERSION = 6
+
+
+# On-disk cache of SSA for functions keyed by hash of function source and tool version.
+# Least recently used entries (by file modification time, touched on every hit)
+# are evicted when the cache is bigger than max_bytes.
+class FunctionCache:
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(e.stat().st_size for e in self._entries())
+
+    @staticmethod
+    def key(func_def: FuncDef, **options) -> str:
+        h = hashlib.sha256()
+        h.update(f"{c_lang_ssa.__version__}/{_CONSTRUCTION_VERSION}".encode())
+        h.update(repr(sorted(options.items())).encode())
+        h.update(CGenerator().visit(func_def).encode())
+        return h.hexdigest()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key + _SUFFIX)
+
+    def _entries(self) -> list[os.DirEntry]:
+        return [e for e in os.scandir(self._directory) if e.name.endswith(_SUFFIX)]
+
+    def get(self, key: str) -> Optional[SSAPass]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                ssa = pickle.load(f)
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return ssa
+
+    def put(self, key: str, ssa: SSAPass):
+        data = pickle.dumps(ssa, protocol=pickle.HIGHEST_PROTOCOL)
+        # several processes may share cache directory, so entry appears atomically
+        (fd, tmp_path) = tempfile.mkstemp(dir=self._directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        self._size += len(data)
+        if self._size > self._max_bytes:
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for e in self._entries():
+            try:
+                stat = e.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, e.path))
+        entries.sort()
+        self._size = sum(size for (_, size, _) in entries)
+        for (_, size, path) in entries:
+            if self._size <= self._max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
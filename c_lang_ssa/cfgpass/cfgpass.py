@@ -1,55 +1,135 @@
-from typing import Tuple
+import copy
+import dataclasses
+import logging
+import time
+from types import GeneratorType
+from typing import Generator, Optional, Tuple
 
 from pycparser.c_ast import *
+from c_lang_ssa.ast_utils import has_side_effects, unique_local_names
 from c_lang_ssa.block.block import *
+from c_lang_ssa.stats.stats import Stats, phase
 import graphviz
 from dataclasses import dataclass
 
-
-# TODO: break in for and while, switch case, labels goto, returns
+logger = logging.getLogger(__name__)
 
 
 # noinspection PyMethodMayBeStatic
 
 class CfgPass:
 
-    def __init__(self, ast: FileAST):
-        self._traverses = [
-            (self._traverse_func_def, FuncDef),
-            (self._traverse_func_decl, FuncDecl),
-            (self._traverse_param_list, ParamList),
-            (self._traverse_decl, Decl),
-            (self._traverse_compound, Compound),
-            (self._traverse_if, If),
-            (self._traverse_binary_op, BinaryOp),
-            (self._traverse_assigment, Assignment),
-            (self._traverse_return, Return),
-            (self._traverse_while, While),
-            (self._traverse_for, For),
-            (self._traverse_continue, Continue),
-            (self._traverse_break, Break),
-        ]
-        self.start_blocks = self._traverse_file_ast(ast)
-        self._merge_base_blocks()
+    def __init__(self, ast: FileAST, stats: Optional[Stats] = None):
+        self._stats = stats
+        self._switch_temporaries = 0
+        # handlers by node type, subclasses are resolved through MRO once and cached here
+        self._traverses = {
+            FuncDef: self._traverse_func_def,
+            FuncDecl: self._traverse_func_decl,
+            ParamList: self._traverse_param_list,
+            Decl: self._traverse_decl,
+            Compound: self._traverse_compound,
+            If: self._traverse_if,
+            BinaryOp: self._traverse_binary_op,
+            Assignment: self._traverse_assigment,
+            Return: self._traverse_return,
+            While: self._traverse_while,
+            For: self._traverse_for,
+            Continue: self._traverse_continue,
+            Break: self._traverse_break,
+            DoWhile: self._traverse_do_while,
+            Switch: self._traverse_switch,
+            Case: self._traverse_case,
+            Default: self._traverse_default,
+            Label: self._traverse_label,
+            Goto: self._traverse_goto,
+            TernaryOp: self._traverse_ternary_op,
+            EmptyStatement: self._traverse_empty_statement,
+            FuncCall: self._traverse_func_call,
+            UnaryOp: self._traverse_unary_op,
+        }
+        self.functions: dict[str, BaseBlock] = {}
+        # functions which CFGs are built from, with unique names of local variables
+        self.func_defs: dict[str, FuncDef] = {}
+        with phase(stats, 'cfg.traverse'):
+            self.start_blocks = self._traverse_file_ast(ast)
+        with phase(stats, 'cfg.merge'):
+            self._merge_base_blocks()
 
     def _traverse_file_ast(self, node: FileAST) -> list[BaseBlock]:
         all_blocks = []
         for n in node.ext:
-            end_block = BaseBlock()
+            if isinstance(n, FuncDef):
+                # variables are told apart by names, so scoped declarations must not share them
+                n = unique_local_names(n)
+                self.func_defs[n.decl.name] = n
+            end_block = BaseBlock(is_final=True)
             context = CFGContext(
                 cycle_cont=None,
                 cycle_after=None,
                 return_block=end_block,
+                labels=_Labels(),
             )
-            all_blocks.append(self._traverse(n, context)[0])
+            start_block = self._traverse(n, context)[0]
+            if isinstance(n, FuncDef):
+                self.functions[n.decl.name] = start_block
+            all_blocks.append(start_block)
         return all_blocks
 
+    # traverses of nested statements are generators which yield (node, context) of a child
+    # and get its (first, last) blocks back, so nesting depth is limited by memory, not by the Python stack
     def _traverse(self, node: Node, context: 'CFGContext') -> Tuple[BaseBlock, BaseBlock]:
-        for (f, node_type) in self._traverses:
-            if isinstance(node, node_type):
-                return f(node, context)
-        else:
-            print(f"Unknown node: {type(node)} at {node.coord}")
+        stack = []
+        result = self._traverse_node(node, context)
+        while True:
+            if isinstance(result, GeneratorType):
+                stack.append(result)
+                result = None
+            elif not stack:
+                return result
+            try:
+                (child, child_context) = stack[-1].send(result)
+                result = self._traverse_node(child, child_context)
+            except StopIteration as e:
+                stack.pop()
+                result = e.value
+
+    def _traverse_node(self, node: Node, context: 'CFGContext'):
+        if self._stats is not None and self._stats.node_types:
+            return self._traverse_node_profiled(node, context)
+        f = self._traverses.get(type(node)) or self._resolve_traverse(type(node))
+        return f(node, context)
+
+    def _resolve_traverse(self, node_type: type):
+        f = next((self._traverses[t] for t in node_type.__mro__ if t in self._traverses), self._unknown_traverse)
+        self._traverses[node_type] = f
+        return f
+
+    def _unknown_traverse(self, node: Node, context: 'CFGContext') -> Tuple[BaseBlock, BaseBlock]:
+        logger.warning("unknown node %s at %s", type(node).__name__, node.coord)
+        return self._default_traverse(node, context)
+
+    # time of a node excludes its children: generators are timed only while they run
+    def _traverse_node_profiled(self, node: Node, context: 'CFGContext'):
+        name = f"cfg.nodes.{type(node).__name__}"
+        self._stats.count(name)
+        start = time.perf_counter()
+        f = self._traverses.get(type(node)) or self._resolve_traverse(type(node))
+        result = f(node, context)
+        self._stats.add_time(name, time.perf_counter() - start)
+        return self._timed_traverse(result, name) if isinstance(result, GeneratorType) else result
+
+    def _timed_traverse(self, traverse: 'Traverse', name: str) -> 'Traverse':
+        result = None
+        while True:
+            start = time.perf_counter()
+            try:
+                child = traverse.send(result)
+            except StopIteration as e:
+                self._stats.add_time(name, time.perf_counter() - start)
+                return e.value
+            self._stats.add_time(name, time.perf_counter() - start)
+            result = yield child
 
     @staticmethod
     def _link_blocks(parent: BaseBlock, child: Block):
@@ -57,17 +137,19 @@ class CfgPass:
         parent.add_next_block(child)
         child.add_parent(parent)
 
-    def _traverse_func_def(self, node: FuncDef, context: 'CFGContext') -> Tuple[BaseBlock, BaseBlock]:
+    def _traverse_func_def(self, node: FuncDef, context: 'CFGContext') -> 'Traverse':
         func_start_block = BaseBlock(label=f"function {node.decl.name} start")
         args = node.decl.type.args
         func_start_block.add_statements([] if args is None else args.params)
         (func_body_block_start, func_body_block_finish) = \
-            self._traverse_compound(node.body, context)
+            yield node.body, context
         self._link_blocks(parent=func_start_block, child=func_body_block_start)
-        return func_start_block, func_body_block_finish
+        if not func_body_block_finish.is_final:
+            self._link_blocks(parent=func_body_block_finish, child=context.return_block)
+        context.labels.check(node.decl.name)
+        return func_start_block, context.return_block
 
     def _default_traverse(self, node: Node, context: 'CFGContext') -> Tuple[BaseBlock, BaseBlock]:
-        print(f"use default traverse for {type(node)}")
         block = BaseBlock()
         block.add_statements([node])
         return block, block
@@ -79,26 +161,44 @@ class CfgPass:
         return self._default_traverse(node, context)
 
     def _traverse_decl(self, node: Decl, context: 'CFGContext') -> Tuple[BaseBlock, BaseBlock]:
+        if isinstance(node.init, TernaryOp):
+            return self._traverse_declared_ternary(node, context)
         return self._default_traverse(node, context)
 
-    def _traverse_compound(self, node: Compound, context: 'CFGContext') -> Tuple[BaseBlock, BaseBlock]:
-        first_compound_block = BaseBlock()
-        current_block = first_compound_block
-
-        for n in (node.block_items or []):
-            first, last = self._traverse(n, context)
+    # int x = c ? a : b; is declaration without initializer followed by branch of assignments
+    def _traverse_declared_ternary(self, node: Decl, context: 'CFGContext') -> 'Traverse':
+        decl = copy.copy(node)
+        decl.init = None
+        first, decl_last = yield decl, context
+        ternary_first, last = yield from self._traverse_ternary_op(
+            node.init, context, lambda value: Assignment('=', ID(node.name, coord=node.coord), value, coord=node.coord)
+        )
+        self._link_blocks(parent=decl_last, child=ternary_first)
+        return first, last
+
+    def _traverse_compound(self, node: Compound, context: 'CFGContext') -> 'Traverse':
+        return (yield from self._traverse_sequence(BaseBlock(), node.block_items or [], context))
+
+    # statements after jump (return, break, continue, goto) get a new block without parents,
+    # it is reachable only through labels or cases
+    def _traverse_sequence(self, first_block: BaseBlock, items: list[Node], context: 'CFGContext') -> 'Traverse':
+        current_block = first_block
+        for n in items:
+            first, last = yield n, context
+            if current_block.is_final:
+                current_block = BaseBlock()
             self._link_blocks(parent=current_block, child=first)
             current_block = last
-        return first_compound_block, current_block
+        return first_block, current_block
 
-    def _traverse_if(self, node: If, context: 'CFGContext') -> Tuple[BaseBlock, BaseBlock]:
+    def _traverse_if(self, node: If, context: 'CFGContext') -> 'Traverse':
         begin_block = BaseBlock()
         cond_block = ConditionBlock()
         self._link_blocks(parent=begin_block, child=cond_block)
         cond_block.add_statements([node.cond])
-        left_first_block, left_last_block = self._traverse(node.iftrue, context)
+        left_first_block, left_last_block = yield node.iftrue, context
         if node.iffalse is not None:
-            right_first_block, right_last_block = self._traverse(node.iffalse, context)
+            right_first_block, right_last_block = yield node.iffalse, context
         else:
             b = BaseBlock()
             right_first_block, right_last_block = (b, b)
@@ -121,7 +221,7 @@ class CfgPass:
         if not right_last_block.is_final:
             self._link_blocks(parent=right_last_block, child=join_block)
 
-    def _traverse_while(self, node: While, context: 'CFGContext') -> Tuple[BaseBlock, BaseBlock]:
+    def _traverse_while(self, node: While, context: 'CFGContext') -> 'Traverse':
         begin_block = BaseBlock()
         cond_block = ConditionBlock()
         after_block = BaseBlock()
@@ -129,43 +229,43 @@ class CfgPass:
         self._link_blocks(parent=begin_block, child=cond_block)
         cond_block.add_statements([node.cond])
         first_statement, last_statement = \
-            self._traverse(node.stmt,
-                           CFGContext(return_block=context.return_block
-                                      , cycle_cont=cond_block
-                                      , cycle_after=after_block))
+            yield node.stmt, dataclasses.replace(context, cycle_cont=cond_block, cycle_after=after_block)
 
         cond_block.add_left_block(first_statement)
         first_statement.add_parent(cond_block)
 
-        self._link_blocks(parent=last_statement, child=cond_block)
+        if not last_statement.is_final:
+            self._link_blocks(parent=last_statement, child=cond_block)
 
         cond_block.add_right_block(after_block)
         after_block.add_parent(cond_block)
 
         return begin_block, after_block
 
-    def _traverse_for(self, node: For, context: 'CFGContext') -> Tuple[BaseBlock, BaseBlock]:
+    def _traverse_for(self, node: For, context: 'CFGContext') -> 'Traverse':
         init_block = BaseBlock()
-        init_block.add_statements(node.init.decls)
+        if isinstance(node.init, DeclList):
+            init_block.add_statements(node.init.decls)
+        elif node.init is not None:
+            init_block.add_statements([node.init])
 
         cond_block = ConditionBlock()
-        cond_block.add_condition(node.cond)
+        # for (;;) loops until break
+        cond_block.add_condition(node.cond if node.cond is not None else Constant('int', '1'))
 
         next_block = BaseBlock()
-        next_block.add_statements([node.next])
+        next_block.add_statements([] if node.next is None else [node.next])
 
         after_block = BaseBlock()
 
         first_statement, last_statement \
-            = self._traverse(node.stmt,
-                             CFGContext(return_block=context.return_block
-                                        , cycle_cont=next_block
-                                        , cycle_after=after_block))
+            = yield node.stmt, dataclasses.replace(context, cycle_cont=next_block, cycle_after=after_block)
 
         self._link_blocks(parent=init_block, child=cond_block)
         cond_block.add_left_block(first_statement)
         first_statement.add_parent(cond_block)
-        self._link_blocks(parent=last_statement, child=next_block)
+        if not last_statement.is_final:
+            self._link_blocks(parent=last_statement, child=next_block)
         self._link_blocks(parent=next_block, child=cond_block)
         cond_block.add_right_block(after_block)
         after_block.add_parent(cond_block)
@@ -175,11 +275,20 @@ class CfgPass:
         return self._default_traverse(node, context)
 
     def _traverse_assigment(self, node: Assignment, context: 'CFGContext') -> Tuple[Block, Block]:
+        if node.op == '=' and isinstance(node.rvalue, TernaryOp):
+            return self._traverse_ternary_op(
+                node.rvalue, context,
+                # SSA names are kept per node, so every arm defines its own copy of the target
+                lambda value: Assignment('=', copy.deepcopy(node.lvalue), value, coord=node.coord)
+            )
         return self._default_traverse(node, context)
 
-    def _traverse_return(self, node: Return, _context: 'CFGContext') -> Tuple[Block, Block]:
+    def _traverse_return(self, node: Return, context: 'CFGContext') -> Tuple[Block, Block]:
+        if isinstance(node.expr, TernaryOp):
+            return self._traverse_ternary_op(node.expr, context, lambda value: Return(value, coord=node.coord))
         block = BaseBlock(is_final=True)
         block.add_statements([node])
+        self._link_blocks(block, context.return_block)
         return block, block
 
     def _traverse_continue(self, node: Continue, context: 'CFGContext') -> Tuple[Block, Block]:
@@ -187,7 +296,7 @@ class CfgPass:
         block = BaseBlock(is_final=True)
         # block.add_statements([node])
         if context.cycle_cont is None:
-            raise "continue not in cycle"
+            raise Exception(f"continue not in cycle at {node.coord}")
         self._link_blocks(block, context.cycle_cont)
         return block, block
 
@@ -195,17 +304,157 @@ class CfgPass:
         block = BaseBlock(is_final=True)
         block.add_statements([])
         if context.cycle_after is None:
-            raise "break not in cycle"
+            raise Exception(f"break not in cycle or switch at {node.coord}")
         self._link_blocks(block, context.cycle_after)
         return block, block
 
+    def _traverse_do_while(self, node: DoWhile, context: 'CFGContext') -> 'Traverse':
+        begin_block = BaseBlock()
+        cond_block = ConditionBlock()
+        after_block = BaseBlock()
+        cond_block.add_statements([node.cond])
+
+        first_statement, last_statement = \
+            yield node.stmt, dataclasses.replace(context, cycle_cont=cond_block, cycle_after=after_block)
+
+        self._link_blocks(parent=begin_block, child=first_statement)
+        if not last_statement.is_final:
+            self._link_blocks(parent=last_statement, child=cond_block)
+        cond_block.add_left_block(first_statement)
+        first_statement.add_parent(cond_block)
+        cond_block.add_right_block(after_block)
+        after_block.add_parent(cond_block)
+        return begin_block, after_block
+
+    # switch is a chain of equality tests in order of cases, default is taken when all of them fail.
+    # Case labels register their blocks while the body is traversed, falling through between cases
+    # is the usual sequencing of statements of the body
+    def _traverse_switch(self, node: Switch, context: 'CFGContext') -> 'Traverse':
+        begin_block = BaseBlock()
+        after_block = BaseBlock()
+        cond = node.cond
+        if has_side_effects(cond):
+            # condition is evaluated once, like in C. Its type is not known here: values of any integer
+            # type and case constants converted to unsigned long long are equal exactly when they are in C
+            self._switch_temporaries += 1
+            name = f"__switch_{self._switch_temporaries}"
+            temporary_type = IdentifierType(['unsigned', 'long', 'long'])
+            begin_block.add_statements([Decl(name, [], [], [], [], TypeDecl(name, [], None, temporary_type),
+                                             cond, None, coord=node.coord)])
+            cond = ID(name, coord=node.coord)
+
+        switch = _Switch()
+        body_first, body_last = \
+            yield node.stmt, dataclasses.replace(context, cycle_after=after_block, switch=switch)
+        if not body_last.is_final:
+            self._link_blocks(parent=body_last, child=after_block)
+
+        current_block = begin_block
+        for (value, case_block) in switch.cases:
+            test_block = ConditionBlock()
+            test_block.add_condition(BinaryOp('==', copy.deepcopy(cond), value, coord=value.coord))
+            self._link_blocks(parent=current_block, child=test_block)
+            test_block.add_left_block(case_block)
+            case_block.add_parent(test_block)
+            current_block = BaseBlock()
+            test_block.add_right_block(current_block)
+            current_block.add_parent(test_block)
+        self._link_blocks(parent=current_block, child=switch.default or after_block)
+        return begin_block, after_block
+
+    def _traverse_case(self, node: Case, context: 'CFGContext') -> 'Traverse':
+        if context.switch is None:
+            raise Exception(f"case not in switch at {node.coord}")
+        block = BaseBlock()
+        context.switch.cases.append((node.expr, block))
+        return (yield from self._traverse_sequence(block, node.stmts or [], context))
+
+    def _traverse_default(self, node: Default, context: 'CFGContext') -> 'Traverse':
+        if context.switch is None:
+            raise Exception(f"default not in switch at {node.coord}")
+        if context.switch.default is not None:
+            raise Exception(f"multiple default labels in one switch at {node.coord}")
+        block = BaseBlock()
+        context.switch.default = block
+        return (yield from self._traverse_sequence(block, node.stmts or [], context))
+
+    def _traverse_label(self, node: Label, context: 'CFGContext') -> 'Traverse':
+        block = context.labels.define(node.name, str(node.coord))
+        first, last = yield node.stmt, context
+        self._link_blocks(parent=block, child=first)
+        return block, last
+
+    def _traverse_goto(self, node: Goto, context: 'CFGContext') -> Tuple[Block, Block]:
+        block = BaseBlock(is_final=True)
+        self._link_blocks(block, context.labels.use(node.name, str(node.coord)))
+        return block, block
+
+    # conditional operator as a statement, or as a value of assignment, declaration or return,
+    # is a branch, each arm gets its own statement built by make_statement
+    def _traverse_ternary_op(self, node: TernaryOp, context: 'CFGContext', make_statement=None) -> 'Traverse':
+        make_statement = make_statement or (lambda value: value)
+        begin_block = BaseBlock()
+        cond_block = ConditionBlock()
+        self._link_blocks(parent=begin_block, child=cond_block)
+        cond_block.add_statements([node.cond])
+        left_first_block, left_last_block = yield make_statement(node.iftrue), context
+        right_first_block, right_last_block = yield make_statement(node.iffalse), context
+        join_block = BaseBlock()
+        self._link_cond(cond_block, join_block, left_first_block, left_last_block, right_first_block, right_last_block)
+        return begin_block, join_block
+
+    def _traverse_empty_statement(self, node: EmptyStatement, context: 'CFGContext') -> Tuple[Block, Block]:
+        block = BaseBlock()
+        return block, block
+
+    def _traverse_func_call(self, node: FuncCall, context: 'CFGContext') -> Tuple[Block, Block]:
+        return self._default_traverse(node, context)
+
+    # ++ and -- are definitions, other unary operators are evaluated for side effects of operand
+    def _traverse_unary_op(self, node: UnaryOp, context: 'CFGContext') -> Tuple[Block, Block]:
+        return self._default_traverse(node, context)
+
     def show(self):
         dot = graphviz.Digraph("SSA", format='png', renderer='cairo', strict=True)
         self.start_blocks[0].generate_dot(dot)
         dot.view(quiet_view=True)
 
     def _merge_base_blocks(self):
-        self.start_blocks[0].merge_blocks_recursive()
+        for start_block in self.start_blocks:
+            (merged, eliminated) = start_block.merge_blocks_recursive()
+            if self._stats is not None:
+                self._stats.count('cfg.blocks_merged', merged)
+                self._stats.count('cfg.blocks_eliminated', eliminated)
+
+
+# case blocks of switch in order of case labels
+class _Switch:
+    def __init__(self):
+        self.cases: list[tuple[Node, BaseBlock]] = []
+        self.default: Optional[BaseBlock] = None
+
+
+# blocks of labels of a function, goto before its label gets the block which the label fills in later
+class _Labels:
+    def __init__(self):
+        self._blocks: dict[str, BaseBlock] = {}
+        self._defined: set[str] = set()
+        self._used_at: dict[str, str] = {}
+
+    def use(self, name: str, coord: str) -> BaseBlock:
+        self._used_at.setdefault(name, coord)
+        return self._blocks.setdefault(name, BaseBlock())
+
+    def define(self, name: str, coord: str) -> BaseBlock:
+        if name in self._defined:
+            raise Exception(f"duplicate label {name} at {coord}")
+        self._defined.add(name)
+        return self._blocks.setdefault(name, BaseBlock())
+
+    def check(self, function: str):
+        for (name, coord) in self._used_at.items():
+            if name not in self._defined:
+                raise Exception(f"label {name} used at {coord} is not defined in {function}")
 
 
 @dataclass(frozen=True)
@@ -213,3 +462,8 @@ class CFGContext:
     cycle_cont: Optional[BaseBlock]
     cycle_after: Optional[BaseBlock]
     return_block: BaseBlock
+    labels: Optional[_Labels] = None
+    switch: Optional[_Switch] = None
+
+
+Traverse = Generator[Tuple[Node, CFGContext], Tuple[Block, Block], Tuple[Block, Block]]
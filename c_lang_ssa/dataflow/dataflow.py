@@ -0,0 +1,113 @@
+import abc
+import heapq
+from abc import ABC
+from enum import Enum
+
+from c_lang_ssa.blockgraph.blockgraph import BlockGraph
+
+
+class Direction(Enum):
+    FORWARD = 0
+    BACKWARD = 1
+
+
+class Meet(Enum):
+    # may problems (liveness, reaching definitions)
+    UNION = 0
+    # must problems (available expressions, dominators)
+    INTERSECTION = 1
+
+
+# Facts are bits of Python ints, so a set of n facts is one int and meet and transfer
+# are a few bitwise operations on it
+class DataflowProblem(ABC):
+    direction: Direction = Direction.FORWARD
+    meet: Meet = Meet.UNION
+
+    def __init__(self, size: int):
+        # number of facts
+        self.size = size
+        self.universe = (1 << size) - 1
+
+    # value at the entry block for forward problems and at exit blocks for backward ones
+    def boundary(self) -> int:
+        return 0
+
+    # value every block starts from, top of the lattice
+    def initial(self) -> int:
+        return 0 if self.meet is Meet.UNION else self.universe
+
+    @abc.abstractmethod
+    def transfer(self, b: int, value: int) -> int:
+        pass
+
+
+# transfer(x) = gen | (x & ~kill) with per block gen and kill sets
+class GenKillProblem(DataflowProblem):
+    def __init__(self, size: int, gen: list[int], kill: list[int]):
+        super().__init__(size)
+        self.gen = gen
+        self.kill = kill
+
+    def transfer(self, b: int, value: int) -> int:
+        return self.gen[b] | (value & ~self.kill[b])
+
+
+# Worklist solver. Blocks of BlockGraph are numbered in reverse postorder, so the smallest index
+# first is RPO for forward problems and the largest first is postorder for backward ones:
+# on loops built by while and for traversal values reach a fixpoint in a couple of rounds.
+# Returns values at block entries and exits.
+class DataflowSolver:
+    __slots__ = ('_graph', '_problem', 'ins', 'outs', 'visits')
+
+    def __init__(self, graph: BlockGraph, problem: DataflowProblem):
+        self._graph = graph
+        self._problem = problem
+        initial = problem.initial()
+        self.ins = [initial] * len(graph)
+        self.outs = [initial] * len(graph)
+        # transfer function applications, for checking convergence speed
+        self.visits = 0
+        if len(graph) > 0:
+            self._solve()
+
+    def _solve(self):
+        graph = self._graph
+        problem = self._problem
+        forward = problem.direction is Direction.FORWARD
+        union = problem.meet is Meet.UNION
+        boundary = problem.boundary()
+        # values flow from sources to block, result is stored into results and propagated to targets
+        (sources, targets) = (graph.predecessors, graph.successors) if forward else \
+            (graph.successors, graph.predecessors)
+        (inputs, results) = (self.ins, self.outs) if forward else (self.outs, self.ins)
+
+        worklist = list(range(len(graph))) if forward else [-b for b in reversed(range(len(graph)))]
+        queued = bytearray([1]) * len(graph)
+        while worklist:
+            b = heapq.heappop(worklist)
+            b = b if forward else -b
+            queued[b] = 0
+            self.visits += 1
+
+            block_sources = sources(b)
+            if (b == 0) if forward else len(block_sources) == 0:
+                value = boundary
+                for s in block_sources:
+                    value = value | results[s] if union else value & results[s]
+            elif len(block_sources) == 0:
+                # unreachable for forward problem, never happens for blocks of BlockGraph
+                value = problem.initial()
+            else:
+                value = results[block_sources[0]]
+                for s in block_sources[1:]:
+                    value = value | results[s] if union else value & results[s]
+            inputs[b] = value
+
+            result = problem.transfer(b, value)
+            if result != results[b]:
+                results[b] = result
+                for t in targets(b):
+                    if not queued[t]:
+                        queued[t] = 1
+                        heapq.heappush(worklist, t if forward else -t)
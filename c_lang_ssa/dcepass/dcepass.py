@@ -0,0 +1,89 @@
+from pycparser.c_ast import *
+
+from c_lang_ssa.ast_utils import address_taken, get_definition_node, has_side_effects, nested_definitions
+from c_lang_ssa.block.block import ConditionBlock, Phi
+from c_lang_ssa.ssapass.ssapass import SSAPass
+from c_lang_ssa.stats.stats import phase
+
+_PURE_STATEMENTS = (Decl, Assignment, UnaryOp, BinaryOp, ID, Constant, Cast, TernaryOp, ArrayRef, StructRef)
+
+
+# Mark-sweep dead code elimination over SSA names: statements with effects outside of SSA
+# variables are live, everything they (transitively) use is live, the rest is removed.
+# Declarations without initializer (parameters among them) are kept, so are all definitions of
+# variables which are not in SSA form: the ones with address taken or defined inside expressions.
+class DCEPass:
+    def __init__(self, ssa: SSAPass):
+        self._ssa = ssa
+        self.before = self._sizes()
+        statements = ssa.graph.statements
+        self._pinned = address_taken(statements) | nested_definitions(statements)
+        self._live_statements: set[int] = set()
+        self._live_phis: set[Phi] = set()
+        with phase(ssa.stats, 'dce.mark'):
+            self._mark()
+        with phase(ssa.stats, 'dce.sweep'):
+            self._sweep()
+        self.after = self._sizes()
+        self.removed_phis = self.before['phis'] - self.after['phis']
+        self.removed_statements = self.before['statements'] - self.after['statements']
+        self.removed_blocks = self.before['blocks'] - self.after['blocks']
+        if ssa.stats is not None:
+            ssa.stats.count('dce.removed_phis', self.removed_phis)
+            ssa.stats.count('dce.removed_statements', self.removed_statements)
+            ssa.stats.count('dce.removed_blocks', self.removed_blocks)
+
+    def _sizes(self) -> dict[str, int]:
+        return {
+            'phis': sum(len(phis) for phis in self._ssa.phis),
+            'statements': len(self._ssa.graph.statements),
+            'blocks': len(self._ssa.graph),
+        }
+
+    def _is_critical(self, b: int, s: Node) -> bool:
+        s = self._ssa.replacements.get(s, s)
+        if isinstance(self._ssa.graph.blocks[b], ConditionBlock):
+            return True
+        if not isinstance(s, _PURE_STATEMENTS):
+            return True
+        node = get_definition_node(s)
+        if node is None or node not in self._ssa.names:
+            return has_side_effects(s) or isinstance(s, Decl)
+        if node.name in self._pinned:
+            return True
+        if isinstance(s, Decl):
+            return s.init is None or has_side_effects(s.init)
+        if isinstance(s, Assignment):
+            return has_side_effects(s.rvalue)
+        return False
+
+    def _mark(self):
+        graph = self._ssa.graph
+        def_use = self._ssa.def_use
+        worklist = []
+        for b in range(len(graph)):
+            if b in self._ssa.unreachable_blocks:
+                continue
+            for i in range(graph.statement_offsets[b], graph.statement_offsets[b + 1]):
+                if self._is_critical(b, graph.statements[i]):
+                    self._live_statements.add(i)
+                    worklist += def_use.used_by_statement(i)
+
+        while worklist:
+            site = def_use.definition(worklist.pop())
+            if site is None:
+                continue
+            if site.is_phi:
+                if site.phi not in self._live_phis:
+                    self._live_phis.add(site.phi)
+                    worklist += [a for a in site.phi.args if a is not None]
+            elif site.statement not in self._live_statements:
+                self._live_statements.add(site.statement)
+                worklist += def_use.used_by_statement(site.statement)
+
+    def _sweep(self):
+        graph = self._ssa.graph
+        removed = {s for (i, s) in enumerate(graph.statements) if i not in self._live_statements}
+        for b in range(len(graph)):
+            self._ssa.phis[b] = [phi for phi in self._ssa.phis[b] if phi in self._live_phis]
+        self._ssa.restructure(removed)
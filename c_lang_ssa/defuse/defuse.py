@@ -0,0 +1,51 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from pycparser.c_ast import *
+
+from c_lang_ssa.block.block import Phi
+
+
+# Place where SSA name is defined or used. statement is index in BlockGraph.statements,
+# for phis it is -1 and position is the phi argument (predecessor) index for uses
+@dataclass(frozen=True, slots=True)
+class Site:
+    block: int
+    statement: int
+    node: Optional[Node] = None
+    phi: Optional[Phi] = None
+    position: int = -1
+
+    @property
+    def is_phi(self) -> bool:
+        return self.phi is not None
+
+
+class DefUse:
+    __slots__ = ('definitions', 'uses', 'statement_uses')
+
+    def __init__(self):
+        self.definitions: dict[str, Site] = {}
+        self.uses: dict[str, list[Site]] = {}
+        self.statement_uses: dict[int, list[str]] = {}
+
+    def add_definition(self, name: str, site: Site):
+        self.definitions[name] = site
+        self.uses.setdefault(name, [])
+
+    def add_use(self, name: str, site: Site):
+        self.uses.setdefault(name, []).append(site)
+        if site.statement >= 0:
+            self.statement_uses.setdefault(site.statement, []).append(name)
+
+    def definition(self, name: str) -> Optional[Site]:
+        return self.definitions.get(name)
+
+    def uses_of(self, name: str) -> list[Site]:
+        return self.uses.get(name, [])
+
+    def used_by_statement(self, statement: int) -> list[str]:
+        return self.statement_uses.get(statement, [])
+
+    def names(self) -> list[str]:
+        return list(self.definitions.keys())
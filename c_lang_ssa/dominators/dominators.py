@@ -0,0 +1,94 @@
+from array import array
+
+from c_lang_ssa.blockgraph.blockgraph import BlockGraph
+
+
+# Cooper, Harvey, Kennedy "A Simple, Fast Dominance Algorithm"
+class DominatorTree:
+    __slots__ = ('_graph', 'idom', 'children', 'preorder', 'postorder', 'frontiers')
+
+    def __init__(self, graph: BlockGraph):
+        self._graph = graph
+        self.idom = self._compute_idoms()
+        self.children = self._collect_children()
+        self.preorder, self.postorder = self._number_tree()
+        self.frontiers = self._compute_frontiers()
+
+    def _compute_idoms(self) -> array:
+        graph = self._graph
+        idom = array('i', [-1] * len(graph))
+        idom[0] = 0
+        changed = True
+        while changed:
+            changed = False
+            for b in range(1, len(graph)):
+                new_idom = -1
+                for p in graph.predecessors(b):
+                    if idom[p] == -1:
+                        continue
+                    new_idom = p if new_idom == -1 else self._intersect(idom, p, new_idom)
+                if idom[b] != new_idom:
+                    idom[b] = new_idom
+                    changed = True
+        return idom
+
+    @staticmethod
+    def _intersect(idom: array, b1: int, b2: int) -> int:
+        while b1 != b2:
+            while b1 > b2:
+                b1 = idom[b1]
+            while b2 > b1:
+                b2 = idom[b2]
+        return b1
+
+    def _collect_children(self) -> list[list[int]]:
+        children = [[] for _ in range(len(self._graph))]
+        for b in range(1, len(self._graph)):
+            children[self.idom[b]].append(b)
+        return children
+
+    def _number_tree(self) -> tuple[array, array]:
+        preorder = array('i', [0] * len(self._graph))
+        postorder = array('i', [0] * len(self._graph))
+        pre = post = 0
+        stack = [(0, False)]
+        while stack:
+            (b, leaving) = stack.pop()
+            if leaving:
+                postorder[b] = post
+                post += 1
+                continue
+            preorder[b] = pre
+            pre += 1
+            stack.append((b, True))
+            stack.extend((c, False) for c in reversed(self.children[b]))
+        return preorder, postorder
+
+    def _compute_frontiers(self) -> list[set[int]]:
+        graph = self._graph
+        frontiers = [set() for _ in range(len(graph))]
+        for b in range(len(graph)):
+            if graph.predecessors_count(b) < 2:
+                continue
+            for p in graph.predecessors(b):
+                runner = p
+                while runner != self.idom[b]:
+                    frontiers[runner].add(b)
+                    runner = self.idom[runner]
+        return frontiers
+
+    def dominates(self, b1: int, b2: int) -> bool:
+        return self.preorder[b1] <= self.preorder[b2] and self.postorder[b2] <= self.postorder[b1]
+
+    def iterated_frontier(self, blocks: list[int]) -> list[int]:
+        marked = bytearray(len(self._graph))
+        result = []
+        worklist = list(blocks)
+        while worklist:
+            b = worklist.pop()
+            for f in self.frontiers[b]:
+                if not marked[f]:
+                    marked[f] = 1
+                    result.append(f)
+                    worklist.append(f)
+        return result
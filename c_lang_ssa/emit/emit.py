@@ -0,0 +1,110 @@
+from dataclasses import dataclass
+from typing import Optional, TextIO, Union
+
+from pycparser.c_generator import CGenerator
+
+from c_lang_ssa.block.block import Block, ConditionBlock, Phi
+from c_lang_ssa.blockgraph.blockgraph import BlockGraph
+from c_lang_ssa.ssapass.ssapass import SSAPass
+
+# Emitters write DOT or text listing directly to a stream, without graphviz objects and rendering,
+# so dumps of huge functions are cheap. Functions are given as SSA views or as CFG start blocks.
+Function = Union[SSAPass, Block]
+
+
+@dataclass(frozen=True)
+class EmitOptions:
+    # blocks with more lines are cut to this number of lines, None keeps all lines
+    max_statements: Optional[int] = None
+    # chains of blocks where block is the only successor of previous one and has no other predecessors
+    # are emitted as one node
+    collapse: bool = False
+
+
+class _View:
+    __slots__ = ('graph', 'cg', 'phis', 'chain_end')
+
+    def __init__(self, function: Function, options: EmitOptions):
+        if isinstance(function, SSAPass):
+            self.graph = function.graph
+            self.cg = function.generator()
+            self.phis = function.phis
+        else:
+            self.graph = BlockGraph(function)
+            self.cg = CGenerator()
+            self.phis = None
+        # in RPO chain block follows its single predecessor immediately, so chains are index ranges
+        graph = self.graph
+        self.chain_end = list(range(len(graph)))
+        if options.collapse:
+            for b in range(len(graph) - 2, -1, -1):
+                succs = graph.successors(b)
+                if len(succs) == 1 and succs[0] == b + 1 and graph.predecessors_count(b + 1) == 1:
+                    self.chain_end[b] = self.chain_end[b + 1]
+
+    def heads(self) -> list[int]:
+        # first blocks of chains
+        heads = []
+        b = 0
+        while b < len(self.graph):
+            heads.append(b)
+            b = self.chain_end[b] + 1
+        return heads
+
+    def block_phis(self, b: int) -> list[Phi]:
+        return self.phis[b] if self.phis is not None else []
+
+    def lines(self, head: int, max_statements: Optional[int]) -> list[str]:
+        lines = []
+        total = 0
+        for b in range(head, self.chain_end[head] + 1):
+            phis = self.block_phis(b)
+            statements = self.graph.block_statements(b)
+            total += len(phis) + len(statements)
+            if max_statements is not None and len(lines) >= max_statements:
+                continue
+            lines += [str(p) for p in phis]
+            lines += [self.cg.visit(s) for s in statements]
+        if max_statements is not None and total > max_statements:
+            lines = lines[:max_statements]
+            lines.append(f"... {total - max_statements} more")
+        return lines
+
+
+def _dot_escape(s: str) -> str:
+    return s.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def emit_dot(out: TextIO, functions: dict[str, Function], options: EmitOptions = EmitOptions()):
+    out.write('digraph SSA {\n  node [shape=box, style=filled, fontname="monospace"];\n')
+    for (f, (name, function)) in enumerate(functions.items()):
+        view = _View(function, options)
+        graph = view.graph
+        out.write(f'  subgraph cluster_{f} {{\n    label="{_dot_escape(name)}";\n')
+        for head in view.heads():
+            tail = view.chain_end[head]
+            label = ''.join(_dot_escape(line) + '\\l' for line in view.lines(head, options.max_statements))
+            color = 'white' if isinstance(graph.blocks[head], ConditionBlock) else graph.blocks[head].color
+            out.write(f'    n{f}_{head} [label="{label}", fillcolor="{color}"];\n')
+            edges = []
+            is_condition = isinstance(graph.blocks[tail], ConditionBlock)
+            for (position, s) in enumerate(graph.successors(tail)):
+                edge_color = ('#2b782a', 'red')[position] if is_condition else 'black'
+                edges.append(f'    n{f}_{head} -> n{f}_{s} [color="{edge_color}"];\n')
+            out.write(''.join(edges))
+        out.write('  }\n')
+    out.write('}\n')
+
+
+def emit_text(out: TextIO, functions: dict[str, Function], options: EmitOptions = EmitOptions()):
+    for (name, function) in functions.items():
+        view = _View(function, options)
+        graph = view.graph
+        chunks = [f"function {name}\n"]
+        for head in view.heads():
+            tail = view.chain_end[head]
+            chunks.append(f"  b{head}:\n" if tail == head else f"  b{head}..b{tail}:\n")
+            chunks += [f"    {line}\n" for line in view.lines(head, options.max_statements)]
+            next_blocks = ', '.join(f"b{s}" for s in graph.successors(tail))
+            chunks.append(f"    -> {next_blocks}\n" if next_blocks else "    -> exit\n")
+        out.write(''.join(chunks))
@@ -0,0 +1,242 @@
+from typing import Optional
+
+from pycparser.c_ast import *
+
+from c_lang_ssa.ast_utils import INCREMENT_OPS, address_taken, constant_value, get_definition_node, nested_definitions
+from c_lang_ssa.ssapass.ssapass import SSAPass
+from c_lang_ssa.stats.stats import phase
+
+_ARITHMETIC = {'+', '-', '*', '/', '%', '<<', '>>', '&', '|', '^'}
+_COMPARISONS = {'<', '>', '<=', '>=', '==', '!=', '&&', '||'}
+_COMMUTATIVE = {'+', '*', '&', '|', '^', '==', '!=', '&&', '||'}
+_UNARY = {'-', '+', '~', '!'}
+# types which integer promotions leave as they are: an expression over variables of one such type
+# has the same type, so a variable of it holds the value of the expression exactly
+_TYPE_WORDS = {'int', 'unsigned', 'signed', 'long', 'float', 'double'}
+# type of unsuffixed integer constant, it takes type of the other operand
+_LITERAL = 'literal'
+_INT_MAX = 2 ** 31 - 1
+
+
+def _variable_type(decl: Decl) -> Optional[str]:
+    t = decl.type
+    if not isinstance(t, TypeDecl) or not isinstance(t.type, IdentifierType) or 'volatile' in t.quals \
+            or 'static' in decl.storage or 'extern' in decl.storage:
+        return None
+    if not all(word in _TYPE_WORDS for word in t.type.names):
+        return None
+    return ' '.join(t.type.names)
+
+
+def _constant_type(n: Constant) -> Optional[str]:
+    if n.type == 'int' and n.value[-1] not in 'uUlL':
+        value = constant_value(n)
+        return _LITERAL if value is not None and value <= _INT_MAX else None
+    if n.type == 'double' and n.value[-1] not in 'fFlL':
+        return 'double'
+    return None
+
+
+def _result_type(op: str, left: str, right: str) -> Optional[str]:
+    if op in _COMPARISONS:
+        return 'int'
+    if op in ('<<', '>>'):
+        return 'int' if left == _LITERAL else left
+    if left == _LITERAL or left == right:
+        return right
+    return left if right == _LITERAL else None
+
+
+# Dominator-based value numbering (Briggs, Cooper, Simpson "Value Numbering"): expressions are numbered
+# by operator and numbers of operands, the SSA name which first got a number leads it in the blocks
+# dominated by its definition, later expressions with that number are replaced by the leader.
+# Only variables of arithmetic types which never have their address taken are numbered,
+# they change only through their SSA definitions.
+class GVNPass:
+    def __init__(self, ssa: SSAPass):
+        self._ssa = ssa
+        self._graph = ssa.graph
+        self._types = self._collect_types()
+        # value numbers of SSA names, numbers are indices of types of their values
+        self.values: dict[str, int] = {}
+        self._value_types: list[Optional[str]] = []
+        self._numbers: dict[tuple, int] = {}
+        self._leaders: dict[int, tuple[str, str]] = {}
+        self._expressions: dict[Node, Optional[int]] = {}
+        with phase(ssa.stats, 'gvn.number'):
+            self.eliminated = self._run()
+        with phase(ssa.stats, 'gvn.def_use'):
+            ssa.index_def_use()
+        if ssa.stats is not None:
+            ssa.stats.count('gvn.values', len(self._value_types))
+            ssa.stats.count('gvn.eliminated', self.eliminated)
+
+    # types of numbered variables, None for the rest: address-taken variables and variables which
+    # are assigned inside expressions are not in SSA form
+    def _collect_types(self) -> dict[str, Optional[str]]:
+        statements = self._graph.statements
+        types = {}
+        for s in statements:
+            if isinstance(s, Decl) and s.name is not None:
+                t = _variable_type(s)
+                types[s.name] = t if types.get(s.name, t) == t else None
+        for name in address_taken(statements) | nested_definitions(statements):
+            types[name] = None
+        return types
+
+    def _fresh(self, value_type: Optional[str]) -> int:
+        self._value_types.append(value_type)
+        return len(self._value_types) - 1
+
+    def _number_key(self, key: tuple, value_type: str) -> int:
+        number = self._numbers.get(key)
+        if number is None:
+            number = self._fresh(value_type)
+            self._numbers[key] = number
+        return number
+
+    # variable of variable_type holds value of number exactly
+    def _holds(self, variable_type: Optional[str], number: int) -> bool:
+        value_type = self._value_types[number]
+        return variable_type is not None and (value_type == variable_type or
+                                              value_type == _LITERAL and variable_type == 'int')
+
+    # value number of expression without side effects, None for the rest
+    def _number(self, n: Node) -> Optional[int]:
+        n = self._ssa.replacements.get(n, n)
+        if isinstance(n, ID):
+            name = self._ssa.names.get(n)
+            return self.values.get(name) if name is not None and self._types.get(n.name) else None
+        elif isinstance(n, Constant):
+            value_type = _constant_type(n)
+            return None if value_type is None else self._number_key(('c', constant_value(n)), value_type)
+        elif n in self._expressions:
+            return self._expressions[n]
+        number = None
+        if isinstance(n, BinaryOp) and (n.op in _ARITHMETIC or n.op in _COMPARISONS):
+            (left, right) = (self._number(n.left), self._number(n.right))
+            if left is not None and right is not None:
+                value_type = _result_type(n.op, self._value_types[left], self._value_types[right])
+                if n.op in _COMMUTATIVE and right < left:
+                    (left, right) = (right, left)
+                if value_type is not None:
+                    number = self._number_key((n.op, left, right), value_type)
+        elif isinstance(n, UnaryOp) and n.op in _UNARY:
+            operand = self._number(n.expr)
+            if operand is not None:
+                value_type = 'int' if n.op == '!' else self._value_types[operand]
+                number = self._number_key((n.op, operand), value_type)
+        self._expressions[n] = number
+        return number
+
+    # value of compound assignment or increment of variable
+    def _compound(self, op: str, lvalue: ID, rvalue: Node) -> Optional[int]:
+        prior = self._ssa.prior_names.get(lvalue)
+        (left, right) = (self.values.get(prior) if prior is not None else None, self._number(rvalue))
+        if left is None or right is None:
+            return None
+        value_type = _result_type(op, self._value_types[left], self._value_types[right])
+        if op in _COMMUTATIVE and right < left:
+            (left, right) = (right, left)
+        return None if value_type is None else self._number_key((op, left, right), value_type)
+
+    def _leader(self, number: Optional[int], coord) -> Optional[ID]:
+        leader = self._leaders.get(number) if number is not None else None
+        if leader is None:
+            return None
+        (name, variable) = leader
+        n = ID(variable, coord)
+        self._ssa.names[n] = name
+        return n
+
+    # replaces maximal redundant subexpressions, returns number of replaced expressions
+    def _replace(self, n: Node) -> int:
+        replaced = 0
+        stack = [n]
+        while stack:
+            n = stack.pop()
+            view = self._ssa.replacements.get(n, n)
+            if view is None or isinstance(view, (ID, Constant)):
+                continue
+            leader = self._leader(self._number(view), view.coord) \
+                if isinstance(view, (BinaryOp, UnaryOp)) else None
+            if leader is not None:
+                self._ssa.replacements[n] = leader
+                replaced += 1
+            else:
+                stack.extend(c for (_, c) in view.children())
+        return replaced
+
+    def _lead(self, name: str, variable: str, number: int, added: list[int]):
+        if number not in self._leaders and self._holds(self._types.get(variable), number):
+            self._leaders[number] = (name, variable)
+            added.append(number)
+
+    # numbers definition of statement s, returns number of eliminated expressions
+    def _visit_statement(self, s: Node, added: list[int]) -> int:
+        ssa = self._ssa
+        view = ssa.replacements.get(s, s)
+        eliminated = self._replace(s)
+        node = get_definition_node(view)
+        name = ssa.names.get(node) if node is not None else None
+        if name is None:
+            return eliminated
+        variable_type = self._types.get(node.name)
+        number = None
+        if variable_type is None:
+            pass
+        elif isinstance(view, Decl):
+            number = self._number(view.init) if view.init is not None else None
+        elif isinstance(view, Assignment) and view.op == '=':
+            number = self._number(view.rvalue)
+        else:
+            if isinstance(view, Assignment):
+                number = self._compound(view.op[:-1], view.lvalue, view.rvalue)
+            else:
+                number = self._compound(INCREMENT_OPS[view.op], view.expr, Constant('int', '1'))
+            leader = self._leader(number, view.coord) if number is not None and self._holds(variable_type, number) \
+                else None
+            if leader is not None:
+                ssa.replacements[s] = Assignment('=', node, leader, view.coord)
+                eliminated += 1
+        if number is None or not self._holds(variable_type, number):
+            number = self._fresh(variable_type)
+        self.values[name] = number
+        self._lead(name, node.name, number, added)
+        return eliminated
+
+    # preorder walk of dominator tree, leaders defined in a block are dropped when its subtree is done
+    def _run(self) -> int:
+        graph = self._graph
+        eliminated = 0
+        worklist = [(0, None)]
+        while worklist:
+            (b, added) = worklist.pop()
+            if added is not None:
+                for number in added:
+                    del self._leaders[number]
+                continue
+            if b in self._ssa.unreachable_blocks:
+                continue
+
+            added = []
+            for phi in self._ssa.phis[b]:
+                variable_type = self._types.get(phi.variable)
+                args = [self.values.get(a) if a is not None else None for a in phi.args]
+                if variable_type is None or None in args:
+                    number = self._fresh(variable_type)
+                elif len(set(args)) == 1:
+                    # every path brings the same value
+                    number = args[0]
+                else:
+                    number = self._number_key(('phi', b, *args), variable_type)
+                self.values[phi.name] = number
+                self._lead(phi.name, phi.variable, number, added)
+
+            for s in graph.block_statements(b):
+                self._expressions.clear()
+                eliminated += self._visit_statement(s, added)
+
+            worklist.append((b, added))
+            worklist.extend((c, None) for c in reversed(self._ssa.dom_tree.children[b]))
+        return eliminated
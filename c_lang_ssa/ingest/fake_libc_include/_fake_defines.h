@@ -0,0 +1,104 @@
+#ifndef _FAKE_DEFINES_H
+#define _FAKE_DEFINES_H
+
+/* Only names pycparser needs to parse code using the C library: macros expanding to
+   expressions and types. Functions and variables need no declarations for parsing. */
+
+#define NULL 0
+#define EOF (-1)
+#define BUFSIZ 8192
+#define FILENAME_MAX 4096
+#define FOPEN_MAX 16
+#define L_tmpnam 20
+#define TMP_MAX 238328
+#define SEEK_SET 0
+#define SEEK_CUR 1
+#define SEEK_END 2
+#define _IOFBF 0
+#define _IOLBF 1
+#define _IONBF 2
+
+#define EXIT_SUCCESS 0
+#define EXIT_FAILURE 1
+#define RAND_MAX 2147483647
+#define MB_CUR_MAX 1
+
+#define bool _Bool
+#define true 1
+#define false 0
+#define __bool_true_false_are_defined 1
+
+#define CHAR_BIT 8
+#define SCHAR_MIN (-128)
+#define SCHAR_MAX 127
+#define UCHAR_MAX 255
+#define CHAR_MIN (-128)
+#define CHAR_MAX 127
+#define SHRT_MIN (-32768)
+#define SHRT_MAX 32767
+#define USHRT_MAX 65535
+#define INT_MIN (-2147483647 - 1)
+#define INT_MAX 2147483647
+#define UINT_MAX 4294967295U
+#define LONG_MIN (-9223372036854775807L - 1)
+#define LONG_MAX 9223372036854775807L
+#define ULONG_MAX 18446744073709551615UL
+#define LLONG_MIN (-9223372036854775807LL - 1)
+#define LLONG_MAX 9223372036854775807LL
+#define ULLONG_MAX 18446744073709551615ULL
+#define PATH_MAX 4096
+
+#define INT8_MIN (-128)
+#define INT8_MAX 127
+#define UINT8_MAX 255
+#define INT16_MIN (-32768)
+#define INT16_MAX 32767
+#define UINT16_MAX 65535
+#define INT32_MIN (-2147483647 - 1)
+#define INT32_MAX 2147483647
+#define UINT32_MAX 4294967295U
+#define INT64_MIN (-9223372036854775807LL - 1)
+#define INT64_MAX 9223372036854775807LL
+#define UINT64_MAX 18446744073709551615ULL
+#define SIZE_MAX 18446744073709551615UL
+#define INTPTR_MAX 9223372036854775807L
+#define UINTPTR_MAX 18446744073709551615UL
+
+#define FLT_MAX 3.40282347e+38F
+#define FLT_MIN 1.17549435e-38F
+#define FLT_EPSILON 1.19209290e-07F
+#define DBL_MAX 1.7976931348623157e+308
+#define DBL_MIN 2.2250738585072014e-308
+#define DBL_EPSILON 2.2204460492503131e-16
+#define HUGE_VAL (1e308 * 10)
+#define INFINITY (1e308 * 10)
+#define NAN (0.0 / 0.0)
+#define M_PI 3.14159265358979323846
+#define M_E 2.7182818284590452354
+
+#define EDOM 33
+#define ERANGE 34
+#define EINVAL 22
+#define ENOMEM 12
+#define ENOENT 2
+#define EAGAIN 11
+#define EINTR 4
+
+#define SIGINT 2
+#define SIGTERM 15
+#define SIGSEGV 11
+#define SIG_DFL ((void (*)(int))0)
+#define SIG_IGN ((void (*)(int))1)
+
+#define CLOCKS_PER_SEC 1000000L
+
+#define va_start(ap, last) ((void)0)
+#define va_end(ap) ((void)0)
+#define va_copy(dest, src) ((void)0)
+#define va_arg(ap, type) (*(type *)0)
+
+#define offsetof(type, member) ((size_t)&(((type *)0)->member))
+#define assert(expr) ((void)(expr))
+#define static_assert _Static_assert
+
+#endif
@@ -0,0 +1,119 @@
+#ifndef _FAKE_TYPEDEFS_H
+#define _FAKE_TYPEDEFS_H
+
+typedef int size_t;
+typedef int ssize_t;
+typedef int ptrdiff_t;
+typedef int wchar_t;
+typedef int wint_t;
+typedef int wctype_t;
+typedef int wctrans_t;
+typedef int max_align_t;
+
+typedef signed char int8_t;
+typedef short int16_t;
+typedef int int32_t;
+typedef long long int64_t;
+typedef unsigned char uint8_t;
+typedef unsigned short uint16_t;
+typedef unsigned int uint32_t;
+typedef unsigned long long uint64_t;
+typedef int int_least8_t;
+typedef int int_least16_t;
+typedef int int_least32_t;
+typedef int int_least64_t;
+typedef int uint_least8_t;
+typedef int uint_least16_t;
+typedef int uint_least32_t;
+typedef int uint_least64_t;
+typedef int int_fast8_t;
+typedef int int_fast16_t;
+typedef int int_fast32_t;
+typedef int int_fast64_t;
+typedef int uint_fast8_t;
+typedef int uint_fast16_t;
+typedef int uint_fast32_t;
+typedef int uint_fast64_t;
+typedef long intptr_t;
+typedef unsigned long uintptr_t;
+typedef long long intmax_t;
+typedef unsigned long long uintmax_t;
+typedef int char16_t;
+typedef int char32_t;
+
+typedef int FILE;
+typedef int fpos_t;
+typedef int va_list;
+typedef int __builtin_va_list;
+typedef int jmp_buf;
+typedef int sigjmp_buf;
+typedef int sig_atomic_t;
+typedef int sigset_t;
+typedef int div_t;
+typedef int ldiv_t;
+typedef int lldiv_t;
+typedef int mbstate_t;
+typedef int locale_t;
+typedef int fenv_t;
+typedef int fexcept_t;
+typedef int float_t;
+typedef int double_t;
+typedef int imaxdiv_t;
+
+typedef int time_t;
+typedef int clock_t;
+typedef int clockid_t;
+typedef int timer_t;
+typedef int suseconds_t;
+typedef int useconds_t;
+
+typedef int off_t;
+typedef int mode_t;
+typedef int pid_t;
+typedef int uid_t;
+typedef int gid_t;
+typedef int id_t;
+typedef int dev_t;
+typedef int ino_t;
+typedef int nlink_t;
+typedef int blksize_t;
+typedef int blkcnt_t;
+typedef int key_t;
+typedef int DIR;
+typedef int regex_t;
+typedef int regmatch_t;
+typedef int regoff_t;
+typedef int nfds_t;
+typedef int tcflag_t;
+typedef int speed_t;
+typedef int cc_t;
+
+typedef int socklen_t;
+typedef int sa_family_t;
+typedef int in_addr_t;
+typedef int in_port_t;
+
+typedef int pthread_t;
+typedef int pthread_attr_t;
+typedef int pthread_mutex_t;
+typedef int pthread_mutexattr_t;
+typedef int pthread_cond_t;
+typedef int pthread_condattr_t;
+typedef int pthread_key_t;
+typedef int pthread_once_t;
+typedef int pthread_rwlock_t;
+typedef int pthread_rwlockattr_t;
+typedef int pthread_spinlock_t;
+typedef int pthread_barrier_t;
+typedef int pthread_barrierattr_t;
+typedef int thrd_t;
+typedef int mtx_t;
+typedef int cnd_t;
+typedef int tss_t;
+typedef int once_flag;
+
+typedef int atomic_int;
+typedef int atomic_bool;
+typedef int memory_order;
+
+#endif
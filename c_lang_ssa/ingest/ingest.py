@@ -0,0 +1,249 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from pycparser import CParser
+from pycparser.c_ast import *
+
+import c_lang_ssa
+from c_lang_ssa.cfgpass.cfgpass import CfgPass
+
+FAKE_LIBC_INCLUDE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_libc_include')
+
+# compiler extensions which pycparser does not parse, they appear in user code written for gcc or clang
+_EXTENSION_DEFINES = (
+    '__attribute__(x)=',
+    '__extension__=',
+    '__restrict=restrict',
+    '__restrict__=restrict',
+    '__inline=inline',
+    '__inline__=inline',
+    '__asm__(x)=',
+    '__volatile__=volatile',
+    '__const=const',
+)
+
+_SUFFIX = '.i.json'
+_LINE_MARKER = re.compile(r'^#\s*(?:line\s+)?\d+\s+"((?:[^"\\]|\\.)*)"', re.MULTILINE)
+# line marker with flags, flag 1 marks entering an included file
+_LINE_MARKER_FLAGS = re.compile(r'^#\s*(?:line\s+)?\d+\s+"((?:[^"\\]|\\.)*)"([ \d]*)$', re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class PreprocessOptions:
+    cpp_path: str = 'cpp'
+    include_dirs: tuple[str, ...] = ()
+    defines: tuple[str, ...] = ()
+    fake_libc: bool = True
+    extra_args: tuple[str, ...] = ()
+
+    def cpp_args(self, path: str) -> list[str]:
+        args = [self.cpp_path, '-E']
+        if self.fake_libc:
+            # system headers are full of extensions, fake ones declare only names needed for parsing
+            args += ['-nostdinc', '-I', FAKE_LIBC_INCLUDE]
+        for d in self.include_dirs:
+            args += ['-I', d]
+        args += ['-D' + d for d in _EXTENSION_DEFINES]
+        args += ['-D' + d for d in self.defines]
+        args += list(self.extra_args)
+        args.append(path)
+        return args
+
+
+def preprocess(path: str, options: PreprocessOptions = PreprocessOptions()) -> str:
+    try:
+        result = subprocess.run(options.cpp_args(path), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                universal_newlines=True)
+    except OSError as e:
+        raise Exception(f"Unable to invoke '{options.cpp_path}': {e}")
+    if result.returncode != 0:
+        raise Exception(f"Preprocessing of {path} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+# files which preprocessed text came from, taken from line markers left by cpp
+def included_files(text: str, path: str) -> list[str]:
+    files = dict.fromkeys(m.group(1).replace('\\\\', '\\') for m in _LINE_MARKER.finditer(text))
+    return [f for f in files if not f.startswith('<') and f != path]
+
+
+def _is_fake_libc(path: str) -> bool:
+    return os.path.abspath(path).startswith(FAKE_LIBC_INCLUDE + os.sep)
+
+
+# fake libc headers included from user files, in order of inclusion: they stand for the real headers
+def fake_libc_includes(text: str) -> list[str]:
+    headers = {}
+    current = None
+    for m in _LINE_MARKER_FLAGS.finditer(text):
+        path = m.group(1).replace('\\\\', '\\')
+        if '1' in m.group(2).split() and _is_fake_libc(path) and current is not None and not _is_fake_libc(current):
+            headers.setdefault(os.path.relpath(path, FAKE_LIBC_INCLUDE).replace(os.sep, '/'), None)
+        current = path
+    return list(headers)
+
+
+# declarations of user files, the ones from fake libc headers are good only for parsing
+def without_fake_libc(ast: FileAST) -> FileAST:
+    return FileAST([n for n in ast.ext if n.coord is None or not _is_fake_libc(n.coord.file)], ast.coord)
+
+
+# content hashes of headers are memoized by file modification time and size:
+# the same headers are included by most files of a project
+_file_hashes: dict[str, tuple[int, int, str]] = {}
+
+
+def _file_hash(path: str) -> Optional[str]:
+    try:
+        stat = os.stat(path)
+        memo = _file_hashes.get(path)
+        if memo is not None and memo[0] == stat.st_mtime_ns and memo[1] == stat.st_size:
+            return memo[2]
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+    _file_hashes[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+# On-disk cache of preprocessed text keyed by hash of the file, its path (quoted includes
+# are searched relative to it, coordinates refer to it) and preprocessor options.
+# Every entry keeps content hashes of included files, it is used only while they match.
+class PreprocessCache:
+    def __init__(self, directory: str):
+        self._directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(path: str, content: bytes, options: PreprocessOptions) -> str:
+        h = hashlib.sha256()
+        h.update(c_lang_ssa.__version__.encode())
+        h.update(repr(options.cpp_args(os.path.abspath(path))).encode())
+        h.update(content)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key + _SUFFIX)
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if any(_file_hash(path) != digest for (path, digest) in entry['includes'].items()):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['text']
+
+    def put(self, key: str, path: str, text: str):
+        includes = {f: _file_hash(f) for f in included_files(text, path)}
+        # several processes may share cache directory, so entry appears atomically
+        (fd, tmp_path) = tempfile.mkstemp(dir=self._directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'text': text, 'includes': includes}, f)
+        os.replace(tmp_path, self._path(key))
+
+
+def preprocess_cached(path: str, options: PreprocessOptions = PreprocessOptions(),
+                      cache: Optional[PreprocessCache] = None) -> str:
+    if cache is None:
+        return preprocess(path, options)
+    with open(path, 'rb') as f:
+        key = cache.key(path, f.read(), options)
+    text = cache.get(key)
+    if text is None:
+        text = preprocess(path, options)
+        cache.put(key, path, text)
+    return text
+
+
+# text of one file, preprocessed when options are given
+def load_text(path: str, options: Optional[PreprocessOptions] = None,
+              cache: Optional[PreprocessCache] = None) -> str:
+    if options is None:
+        with open(path) as f:
+            return f.read()
+    return preprocess_cached(path, options, cache)
+
+
+# preprocesses (when options are given) and parses one file
+def load_file(path: str, options: Optional[PreprocessOptions] = None,
+              cache: Optional[PreprocessCache] = None) -> FileAST:
+    return CParser().parse(load_text(path, options, cache), path)
+
+
+@dataclass
+class ParsedFile:
+    path: str
+    ast: Optional[FileAST] = None
+    error: Optional[str] = None
+    cfg: Optional[CfgPass] = field(default=None, repr=False)
+
+
+def _load_file(path: str, options: Optional[PreprocessOptions], cache_dir: Optional[str]) -> ParsedFile:
+    cache = PreprocessCache(cache_dir) if cache_dir is not None and options is not None else None
+    try:
+        return ParsedFile(path, load_file(path, options, cache))
+    except Exception as e:
+        return ParsedFile(path, error=f"{type(e).__name__}: {e}")
+
+
+# Preprocessing and parsing of many files, in a process pool when processes > 1.
+# Files are yielded in order of completion, so consumer builds CFG of one file
+# while the rest are still parsed.
+def parse_files(paths: list[str], options: Optional[PreprocessOptions] = None, processes: int = 1,
+                cache_dir: Optional[str] = None) -> Iterator[ParsedFile]:
+    if processes <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield _load_file(path, options, cache_dir)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_load_file, path, options, cache_dir) for path in paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+# parse_files followed by CfgPass of every successfully parsed file
+def ingest(paths: list[str], options: Optional[PreprocessOptions] = None, processes: int = 1,
+           cache_dir: Optional[str] = None) -> Iterator[ParsedFile]:
+    for parsed in parse_files(paths, options, processes, cache_dir):
+        if parsed.ast is not None:
+            try:
+                parsed.cfg = CfgPass(parsed.ast)
+            except Exception as e:
+                parsed.error = f"{type(e).__name__}: {e}"
+        yield parsed
+
+
+def add_preprocess_arguments(argparser: argparse.ArgumentParser):
+    argparser.add_argument('--cpp', help='run C preprocessor with fake libc headers before parsing',
+                           action='store_true')
+    argparser.add_argument('--cpp-path', help='preprocessor executable, implies --cpp', default=None)
+    argparser.add_argument('-I', dest='include_dirs', help='include directory, implies --cpp',
+                           action='append', default=[])
+    argparser.add_argument('-D', dest='defines', help='macro definition, implies --cpp',
+                           action='append', default=[])
+    argparser.add_argument('--no-fake-libc', help='with --cpp use system headers instead of fake ones',
+                           action='store_true')
+    argparser.add_argument('--cpp-cache', help='directory of cache with preprocessed files')
+
+
+def preprocess_options(args: argparse.Namespace) -> Optional[PreprocessOptions]:
+    if not (args.cpp or args.cpp_path or args.include_dirs or args.defines):
+        return None
+    return PreprocessOptions(cpp_path=args.cpp_path or 'cpp', include_dirs=tuple(args.include_dirs),
+                             defines=tuple(args.defines), fake_libc=not args.no_fake_libc)
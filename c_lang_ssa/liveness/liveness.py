@@ -0,0 +1,52 @@
+from c_lang_ssa.ast_utils import get_definition, get_usages
+from c_lang_ssa.blockgraph.blockgraph import BlockGraph
+from c_lang_ssa.dataflow.dataflow import DataflowSolver, Direction, GenKillProblem
+
+
+# variables used before definition in a block are live at its entry
+class LivenessProblem(GenKillProblem):
+    direction = Direction.BACKWARD
+
+
+# Live variables of every block as bitsets indexed by variable number
+class Liveness:
+    def __init__(self, graph: BlockGraph, variables: list[str]):
+        self._graph = graph
+        self.variables = list(variables)
+        self.index = {v: i for (i, v) in enumerate(self.variables)}
+        self.uses, self.defs = self._collect_local_sets()
+        solver = DataflowSolver(graph, LivenessProblem(len(self.variables), self.uses, self.defs))
+        self.live_in: list[int] = solver.ins
+        self.live_out: list[int] = solver.outs
+
+    def _collect_local_sets(self) -> tuple[list[int], list[int]]:
+        index = self.index
+        uses = []
+        defs = []
+        for b in range(len(self._graph)):
+            block_uses = 0
+            block_defs = 0
+            for s in self._graph.block_statements(b):
+                for u in get_usages(s):
+                    i = index.get(u.name)
+                    if i is not None and not block_defs >> i & 1:
+                        block_uses |= 1 << i
+                i = index.get(get_definition(s))
+                if i is not None:
+                    block_defs |= 1 << i
+            uses.append(block_uses)
+            defs.append(block_defs)
+        return uses, defs
+
+    def is_live_in(self, b: int, variable: str) -> bool:
+        return bool(self.live_in[b] >> self.index[variable] & 1)
+
+    def is_live_out(self, b: int, variable: str) -> bool:
+        return bool(self.live_out[b] >> self.index[variable] & 1)
+
+    def names(self, bits: int) -> list[str]:
+        return [v for (i, v) in enumerate(self.variables) if bits >> i & 1]
+
+    # the largest number of variables live at a block boundary
+    def max_pressure(self) -> int:
+        return max((bits.bit_count() for bits in self.live_in + self.live_out), default=0)
@@ -0,0 +1,351 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import Optional, TextIO
+
+from pycparser.c_ast import *
+
+from c_lang_ssa.ast_utils import INCREMENT_OPS, address_taken, constant_value, nested_definitions
+from c_lang_ssa.block.block import Phi
+from c_lang_ssa.blockgraph.blockgraph import BlockGraph
+from c_lang_ssa.ssapass.ssapass import SSAPass
+
+_SELF = 1
+_REDUCIBLE = 2
+_IRREDUCIBLE = 3
+
+
+@dataclass(slots=True)
+class Loop:
+    header: int
+    # index of enclosing loop in LoopForest.loops, -1 for outermost loops
+    parent: int = -1
+    depth: int = 1
+    irreducible: bool = False
+    children: list[int] = field(default_factory=list)
+    # blocks whose innermost loop is this one, header first
+    blocks: list[int] = field(default_factory=list)
+    # number of blocks with blocks of nested loops
+    size: int = 0
+    back_edges: list[int] = field(default_factory=list)
+    # sources of back edges
+    latches: list[int] = field(default_factory=list)
+    # blocks besides header which are entered from outside, only irreducible loops have them
+    entries: list[int] = field(default_factory=list)
+
+
+# Havlak "Nesting of Reducible and Irreducible Loops": headers are visited in reverse depth-first
+# order and every header collapses its body into itself with union-find, so the forest is built
+# in almost linear time. Reducible loops are natural loops of their back edges, a loop which is
+# entered besides its header is irreducible, its header is the block where depth-first search entered it.
+# Loops are numbered in depth-first order of headers, so parent loop comes before its children.
+class LoopForest:
+    __slots__ = ('_graph', 'loops', 'loop_of', 'back_edges', '_preorder', '_postorder')
+
+    def __init__(self, graph: BlockGraph):
+        self._graph = graph
+        self.loops: list[Loop] = []
+        # innermost loop of every block, -1 outside of loops
+        self.loop_of = array('i', [-1] * len(graph))
+        self.back_edges: list[int] = []
+        self._find_loops()
+        self._preorder, self._postorder = self._number_tree()
+
+    # depth-first numbering of blocks, v is an ancestor of w when number[v] <= number[w] <= last[number[v]]
+    def _number_blocks(self) -> tuple[array, array, array]:
+        graph = self._graph
+        number = array('i', [-1] * len(graph))
+        node = array('i', [0] * len(graph))
+        last = array('i', [0] * len(graph))
+        count = 1
+        number[0] = 0
+        stack = [(0, iter(graph.successors(0)))]
+        while stack:
+            (b, successors) = stack[-1]
+            for t in successors:
+                if number[t] < 0:
+                    number[t] = count
+                    node[count] = t
+                    count += 1
+                    stack.append((t, iter(graph.successors(t))))
+                    break
+            else:
+                stack.pop()
+                last[number[b]] = count - 1
+        return number, node, last
+
+    def _find_loops(self):
+        graph = self._graph
+        n = len(graph)
+        (number, node, last) = self._number_blocks()
+        # everything below is in depth-first numbers
+        back_preds: list[list[tuple[int, int]]] = [[] for _ in range(n)]
+        other_preds: list[set[int]] = [set() for _ in range(n)]
+        for b in range(n):
+            w = number[b]
+            for (position, p) in enumerate(graph.predecessors(b)):
+                v = number[p]
+                if w <= v <= last[w]:
+                    back_preds[w].append((v, graph.predecessor_edge(b, position)))
+                else:
+                    other_preds[w].add(v)
+
+        union = list(range(n))
+
+        def find(x: int) -> int:
+            while union[x] != x:
+                union[x] = union[union[x]]
+                x = union[x]
+            return x
+
+        header = array('i', [-1] * n)
+        kind = bytearray(n)
+        entries: list[list[int]] = [[] for _ in range(n)]
+        marks = array('i', [-1] * n)
+        for w in range(n - 1, -1, -1):
+            body = []
+            for (v, _) in back_preds[w]:
+                if v == w:
+                    kind[w] = _SELF
+                else:
+                    x = find(v)
+                    if marks[x] != w:
+                        marks[x] = w
+                        body.append(x)
+            if not body:
+                continue
+            kind[w] = _REDUCIBLE
+            worklist = list(body)
+            while worklist:
+                x = worklist.pop()
+                for y in other_preds[x]:
+                    y = find(y)
+                    if not w <= y <= last[w]:
+                        # edge from outside enters the body not through the header
+                        kind[w] = _IRREDUCIBLE
+                        other_preds[w].add(y)
+                        entries[w].append(node[x])
+                    elif y != w and marks[y] != w:
+                        marks[y] = w
+                        body.append(y)
+                        worklist.append(y)
+            for x in body:
+                header[x] = w
+                union[x] = w
+
+        loop_index = array('i', [-1] * n)
+        for w in range(n):
+            if not kind[w]:
+                continue
+            loop_index[w] = len(self.loops)
+            parent = loop_index[header[w]] if header[w] >= 0 else -1
+            loop = Loop(node[w], parent=parent, irreducible=kind[w] == _IRREDUCIBLE,
+                        back_edges=[e for (_, e) in back_preds[w]], latches=[node[v] for (v, _) in back_preds[w]],
+                        entries=list(dict.fromkeys(entries[w])))
+            if parent >= 0:
+                loop.depth = self.loops[parent].depth + 1
+                self.loops[parent].children.append(len(self.loops))
+            self.loops.append(loop)
+            self.back_edges += loop.back_edges
+        for w in range(n):
+            i = loop_index[w] if kind[w] else loop_index[header[w]] if header[w] >= 0 else -1
+            if i >= 0:
+                self.loop_of[node[w]] = i
+                self.loops[i].blocks.append(node[w])
+        for i in range(len(self.loops) - 1, -1, -1):
+            loop = self.loops[i]
+            loop.size += len(loop.blocks)
+            if loop.parent >= 0:
+                self.loops[loop.parent].size += loop.size
+
+    def _number_tree(self) -> tuple[array, array]:
+        preorder = array('i', [0] * len(self.loops))
+        postorder = array('i', [0] * len(self.loops))
+        pre = post = 0
+        stack = [(i, False) for i in reversed(range(len(self.loops))) if self.loops[i].parent < 0]
+        while stack:
+            (i, leaving) = stack.pop()
+            if leaving:
+                postorder[i] = post
+                post += 1
+                continue
+            preorder[i] = pre
+            pre += 1
+            stack.append((i, True))
+            stack.extend((c, False) for c in reversed(self.loops[i].children))
+        return preorder, postorder
+
+    def depth(self, b: int) -> int:
+        i = self.loop_of[b]
+        return self.loops[i].depth if i >= 0 else 0
+
+    @property
+    def max_depth(self) -> int:
+        return max((loop.depth for loop in self.loops), default=0)
+
+    def is_nested(self, inner: int, outer: int) -> bool:
+        return self._preorder[outer] <= self._preorder[inner] and self._postorder[inner] <= self._postorder[outer]
+
+    def contains(self, loop: int, b: int) -> bool:
+        i = self.loop_of[b]
+        return i >= 0 and self.is_nested(i, loop)
+
+    # all blocks of the loop, with blocks of nested loops
+    def body(self, loop: int) -> list[int]:
+        blocks = []
+        stack = [loop]
+        while stack:
+            i = stack.pop()
+            blocks += self.loops[i].blocks
+            stack.extend(self.loops[i].children)
+        return blocks
+
+
+@dataclass(frozen=True, slots=True)
+class InductionVariable:
+    loop: int
+    phi: Phi
+    # SSA name which enters the loop, None when entering edges bring different names
+    initial: Optional[str]
+    # SSA name which comes back along back edges
+    update: str
+    # '+' or '-' and loop invariant operand of every increment from phi to update, in order of execution
+    steps: tuple[tuple[str, Node], ...]
+
+    # sum of increments when all of them are constants
+    @property
+    def step(self) -> Optional[int | float]:
+        total = 0
+        for (sign, operand) in self.steps:
+            value = constant_value(operand) if isinstance(operand, Constant) else None
+            if value is None:
+                return None
+            total += value if sign == '+' else -value
+        return total
+
+
+# Basic induction variables: phi at loop header whose value comes back along back edges
+# incremented by loop invariant values, as in i_1 = phi(i_0, i_2) with i_2 = i_1 + 1.
+# Only reducible loops are searched, variables not in SSA form (address taken or defined inside expressions)
+# are never induction variables.
+class InductionVariables:
+    def __init__(self, ssa: SSAPass, forest: Optional[LoopForest] = None):
+        self._ssa = ssa
+        self.forest = forest if forest is not None else LoopForest(ssa.graph)
+        # variables not in SSA form: address-taken ones and the ones defined inside expressions
+        self._pinned = address_taken(ssa.graph.statements) | nested_definitions(ssa.graph.statements)
+        self.variables: list[InductionVariable] = []
+        self.of_loop: list[list[InductionVariable]] = [[] for _ in self.forest.loops]
+        for (i, loop) in enumerate(self.forest.loops):
+            if loop.irreducible:
+                continue
+            for phi in ssa.phis[loop.header]:
+                variable = self._match(i, phi)
+                if variable is not None:
+                    self.variables.append(variable)
+                    self.of_loop[i].append(variable)
+
+    def _invariant(self, loop: int, n: Node) -> bool:
+        n = self._ssa.replacements.get(n, n)
+        if isinstance(n, Constant):
+            return constant_value(n) is not None
+        if isinstance(n, ID):
+            name = self._ssa.names.get(n)
+            site = self._ssa.def_use.definition(name) if name is not None else None
+            return site is not None and n.name not in self._pinned \
+                and not self.forest.contains(loop, site.block)
+        if isinstance(n, BinaryOp):
+            return self._invariant(loop, n.left) and self._invariant(loop, n.right)
+        if isinstance(n, (UnaryOp, Cast)) and getattr(n, 'op', None) not in ('&', '*', *INCREMENT_OPS):
+            return self._invariant(loop, n.expr)
+        return False
+
+    # previous SSA name, sign and operand of increment which defines name, None for anything else.
+    # Copies have no operand.
+    def _increment(self, loop: int, name: str) -> Optional[tuple[str, Optional[str], Optional[Node]]]:
+        ssa = self._ssa
+        site = ssa.def_use.definition(name)
+        if site is None or site.is_phi or not self.forest.contains(loop, site.block):
+            return None
+        s = ssa.graph.statements[site.statement]
+        s = ssa.replacements.get(s, s)
+        if isinstance(s, UnaryOp) and s.op in INCREMENT_OPS:
+            prior = ssa.prior_names.get(s.expr)
+            return None if prior is None else (prior, INCREMENT_OPS[s.op], Constant('int', '1'))
+        if isinstance(s, Assignment) and s.op in ('+=', '-='):
+            prior = ssa.prior_names.get(s.lvalue)
+            if prior is None or not self._invariant(loop, s.rvalue):
+                return None
+            return prior, s.op[0], s.rvalue
+        rvalue = s.init if isinstance(s, Decl) else s.rvalue if isinstance(s, Assignment) and s.op == '=' else None
+        rvalue = ssa.replacements.get(rvalue, rvalue)
+        if isinstance(rvalue, ID) and rvalue in ssa.names:
+            return ssa.names[rvalue], None, None
+        if not isinstance(rvalue, BinaryOp) or rvalue.op not in ('+', '-'):
+            return None
+        (left, right) = (ssa.replacements.get(rvalue.left, rvalue.left), ssa.replacements.get(rvalue.right, rvalue.right))
+        if isinstance(left, ID) and left in ssa.names and self._invariant(loop, right):
+            return ssa.names[left], rvalue.op, right
+        if rvalue.op == '+' and isinstance(right, ID) and right in ssa.names and self._invariant(loop, left):
+            return ssa.names[right], '+', left
+        return None
+
+    def _match(self, loop: int, phi: Phi) -> Optional[InductionVariable]:
+        if phi.variable in self._pinned:
+            return None
+        graph = self._ssa.graph
+        header = self.forest.loops[loop].header
+        inside = set()
+        outside = set()
+        for (position, p) in enumerate(graph.predecessors(header)):
+            (inside if self.forest.contains(loop, p) else outside).add(phi.args[position])
+        if len(inside) != 1 or None in inside:
+            return None
+        update = next(iter(inside))
+        steps = []
+        name = update
+        # every definition is visited once at most, SSA names of the loop can not form a cycle without a phi
+        while name != phi.name:
+            increment = self._increment(loop, name)
+            if increment is None:
+                return None
+            (name, sign, operand) = increment
+            if operand is not None:
+                steps.append((sign, operand))
+        initial = next(iter(outside)) if len(outside) == 1 else None
+        variable = InductionVariable(loop, phi, initial, update, tuple(reversed(steps)))
+        # increments which cancel out leave the variable invariant
+        return variable if steps and variable.step != 0 else None
+
+
+def _format_step(variable: InductionVariable, ssa: SSAPass) -> str:
+    step = variable.step
+    if step is not None:
+        return f"{step:+}"
+    cg = ssa.generator()
+    return ' '.join(f"{sign} {cg.visit(operand)}" for (sign, operand) in variable.steps)
+
+
+# loop nests of functions with their induction variables, innermost loops are the usual hot spots
+def write_report(out: TextIO, functions: dict[str, SSAPass]):
+    for (name, ssa) in functions.items():
+        variables = InductionVariables(ssa)
+        forest = variables.forest
+        irreducible = sum(loop.irreducible for loop in forest.loops)
+        chunks = [f"function {name}: {len(forest.loops)} loops, max depth {forest.max_depth}, "
+                  f"{irreducible} irreducible\n"]
+        stack = [i for i in reversed(range(len(forest.loops))) if forest.loops[i].parent < 0]
+        while stack:
+            i = stack.pop()
+            loop = forest.loops[i]
+            indent = '  ' * loop.depth
+            kind = 'irreducible loop' if loop.irreducible else 'loop'
+            chunks.append(f"{indent}{kind} b{loop.header}: depth {loop.depth}, {loop.size} blocks, "
+                          f"back edges from {', '.join(f'b{b}' for b in loop.latches)}\n")
+            if loop.entries:
+                chunks.append(f"{indent}  entries {', '.join(f'b{b}' for b in loop.entries)}\n")
+            for v in variables.of_loop[i]:
+                chunks.append(f"{indent}  iv {v.phi}, initial {v.initial or 'varies'}, "
+                              f"step {_format_step(v, ssa)}\n")
+            stack.extend(reversed(loop.children))
+        out.write(''.join(chunks))
+
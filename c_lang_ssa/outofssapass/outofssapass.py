@@ -0,0 +1,624 @@
+import copy
+from typing import Callable, Optional
+
+from pycparser.c_ast import *
+from pycparser.c_generator import CGenerator
+
+from c_lang_ssa.ast_utils import INCREMENT_OPS, address_taken, get_definition_node, get_usages, nested_definitions, \
+    renamed_decl
+from c_lang_ssa.block.block import ConditionBlock
+from c_lang_ssa.dataflow.dataflow import DataflowSolver
+from c_lang_ssa.liveness.liveness import LivenessProblem
+from c_lang_ssa.ssapass.ssapass import SSAPass
+from c_lang_ssa.stats.stats import phase
+
+
+def _bits(value: int):
+    while value:
+        low = value & -value
+        yield low.bit_length() - 1
+        value ^= low
+
+
+# variables which keep one C variable per declaration: their address may be taken,
+# their values can not be assigned (arrays, initializer lists, const) or their declaration
+# must be executed in place (static, extern, inline struct definitions)
+def _must_stay(decl: Decl) -> bool:
+    if set(decl.storage) & {'static', 'extern'} or set(decl.quals) & {'const', 'volatile'}:
+        return True
+    if isinstance(decl.type, ArrayDecl) or isinstance(decl.init, InitList):
+        return True
+    declared = decl.type.type if isinstance(decl.type, TypeDecl) else None
+    return isinstance(declared, (Struct, Union)) and declared.decls is not None or \
+        isinstance(declared, Enum) and declared.values is not None
+
+
+# declarations of variables in function body, optimizations may have removed some of them from the CFG
+def _local_decls(func_def: FuncDef) -> list[Decl]:
+    decls = []
+    stack = [func_def.body]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, Decl) and n.name is not None and not isinstance(n.type, FuncDecl):
+            decls.append(n)
+        if n is not None and not isinstance(n, (Struct, Union, Enum, FuncDecl, Typedef, Typename)):
+            stack.extend(reversed([c for (_, c) in n.children()]))
+    return decls
+
+
+# Parallel copy dst <- src as a sequence of copies: a copy is emitted once nobody needs its
+# destination, a cycle is broken by saving one value, into a destination which already holds it if any,
+# into temporary(location) otherwise, so every cycle costs one extra copy at most
+def sequentialize(copies: list[tuple[str, str]], temporary: Callable[[str], str]) -> list[tuple[str, str]]:
+    pending = {d: s for (d, s) in copies if d != s}
+    readers = {}
+    for s in pending.values():
+        readers[s] = readers.get(s, 0) + 1
+    location = {s: s for s in pending.values()}
+    saved = {}
+    result = []
+    ready = [d for d in pending if d not in readers]
+    while pending:
+        while ready:
+            d = ready.pop()
+            s = pending.pop(d)
+            result.append((d, location[s]))
+            saved.setdefault(s, d)
+            readers[s] -= 1
+            if readers[s] == 0 and s in pending:
+                ready.append(s)
+        if pending:
+            # only cycles are left, every pending destination is read by another pending copy
+            d = next(iter(pending))
+            if d in saved:
+                location[d] = saved[d]
+            else:
+                location[d] = temporary(d)
+                result.append((location[d], d))
+            readers[d] = 0
+            ready.append(d)
+    return result
+
+
+# Translation of SSA view back to C: phis become copies on predecessor edges, an edge from a condition
+# to a block with phis is split when copies remain on it. Copy related names which do not interfere
+# share one C variable, so most copies disappear, the rest of names get variables of their own.
+# Variables which must stay in memory keep one C variable per declaration and get no copies.
+class OutOfSSAPass:
+    def __init__(self, func_def: FuncDef, ssa: SSAPass):
+        self._ssa = ssa
+        self._graph = ssa.graph
+        self.copies = 0
+        self.temporaries = 0
+        self.split_edges = 0
+        self.coalesced = 0
+        args = func_def.decl.type.args
+        # parameters are the first statements of the start block, their declarations stay in the signature
+        self._params = self._graph.block_statements(0)[:len(args.params)] if args is not None else []
+        with phase(ssa.stats, 'outssa.names'):
+            self._collect_names(func_def)
+        with phase(ssa.stats, 'outssa.coalesce'):
+            self._coalesce()
+            self._assign_variables()
+        with phase(ssa.stats, 'outssa.emit'):
+            body = self._emit()
+        self.func_def = FuncDef(func_def.decl, func_def.param_decls, body, func_def.coord)
+        if ssa.stats is not None:
+            ssa.stats.count('outssa.copies', self.copies)
+            ssa.stats.count('outssa.temporaries', self.temporaries)
+            ssa.stats.count('outssa.split_edges', self.split_edges)
+            ssa.stats.count('outssa.coalesced', self.coalesced)
+
+    def _collect_names(self, func_def: FuncDef):
+        ssa = self._ssa
+        graph = self._graph
+        self._statements = [ssa.replacements.get(s, s) for s in graph.statements]
+        decls = [s for s in self._statements
+                 if isinstance(s, Decl) and s.name is not None and not isinstance(s.type, FuncDecl)]
+        present = set(graph.statements) | set(decls)
+        removed = [d for d in _local_decls(func_def) if d not in present]
+        self._removed_decls = set(removed)
+        decls += removed
+        variables = {d.name for d in decls}
+        first_decl = {}
+        for d in decls:
+            first_decl.setdefault(d.name, d)
+        # variables assigned inside expressions are not in SSA form either, they stay as they are
+        self._pinned = {d.name for d in decls if _must_stay(d)} | \
+            ((address_taken(self._statements) | nested_definitions(self._statements)) & variables)
+
+        # declaration of SSA name is the one of its variable closest on the dominator tree path
+        self._decl_of: dict[str, Decl] = {}
+        stacks = {v: [] for v in variables}
+
+        def top(variable: str) -> Decl:
+            return stacks[variable][-1] if stacks[variable] else first_decl[variable]
+
+        worklist = [(0, None)]
+        while worklist:
+            (b, popped) = worklist.pop()
+            if popped is not None:
+                for v in popped:
+                    stacks[v].pop()
+                continue
+            pushed = []
+            for phi in ssa.phis[b]:
+                self._decl_of[phi.name] = top(phi.variable)
+            for i in range(graph.statement_offsets[b], graph.statement_offsets[b + 1]):
+                s = self._statements[i]
+                if isinstance(s, Decl) and s.name in stacks:
+                    stacks[s.name].append(s)
+                    pushed.append(s.name)
+                node = get_definition_node(s)
+                if node is not None and node in ssa.names and node.name in stacks:
+                    self._decl_of[ssa.names[node]] = top(node.name)
+            worklist.append((b, pushed))
+            worklist.extend((c, None) for c in reversed(self._ssa.dom_tree.children[b]))
+
+        # names of identifiers without SSA name: reads of variables before any definition
+        # and names declared outside of the function, the latter must not be shadowed
+        self._first_decl = first_decl
+        self._reserved = set()
+        for s in self._statements:
+            node = get_definition_node(s)
+            for u in get_usages(s, ssa.replacements):
+                name = ssa.prior_names.get(u) if u is node else ssa.names.get(u)
+                if name is not None:
+                    if name not in self._decl_of and u.name in first_decl:
+                        self._decl_of[name] = first_decl[u.name]
+                elif u.name not in variables:
+                    self._reserved.add(u.name)
+        self._tracked = [n for (n, d) in self._decl_of.items() if d.name not in self._pinned]
+        self._first_names = {}
+        for (n, d) in self._decl_of.items():
+            self._first_names.setdefault(d.name, n)
+        self._decls = decls
+        self._index = {n: i for (i, n) in enumerate(self._tracked)}
+
+    def _type_key(self, decl: Decl) -> str:
+        key = self._type_keys.get(decl)
+        if key is None:
+            key = CGenerator().visit(self._declaration(decl, ''))
+            self._type_keys[decl] = key
+        return key
+
+    @staticmethod
+    def _declaration(decl: Decl, name: str) -> Decl:
+        decl = renamed_decl(decl, name)
+        decl.init = None
+        decl.bitsize = None
+        return decl
+
+    def _compatible(self, a: str, b: str) -> bool:
+        (da, db) = (self._decl_of[a], self._decl_of[b])
+        return da is db or da.name == db.name and self._type_key(da) == self._type_key(db)
+
+    # pairs of names which are worth one variable: phi and its arguments,
+    # compound assignment or increment and previous name of its variable, plain copies
+    def _affinities(self) -> list[tuple[int, int]]:
+        ssa = self._ssa
+        index = self._index
+        phi_pairs = []
+        for phis in ssa.phis:
+            for phi in phis:
+                if phi.name in index:
+                    phi_pairs += [(phi.name, a) for a in phi.args if a in index]
+        statement_pairs = []
+        for s in self._statements:
+            node = get_definition_node(s)
+            name = ssa.names.get(node) if node is not None else None
+            if name not in index:
+                continue
+            if isinstance(s, Assignment) and s.op == '=':
+                source = ssa.names.get(s.rvalue) if isinstance(s.rvalue, ID) else None
+            else:
+                source = ssa.prior_names.get(node)
+            if source in index:
+                statement_pairs.append((name, source))
+        return [(index[a], index[b]) for (a, b) in phi_pairs + statement_pairs if self._compatible(a, b)]
+
+    # liveness of SSA names: phi arguments are used at the end of predecessors, phis define at block entry
+    def _liveness(self) -> tuple[list[int], list[int]]:
+        ssa = self._ssa
+        graph = self._graph
+        index = self._index
+        gen = []
+        kill = []
+        edge_uses = []
+        for b in range(len(graph)):
+            block_gen = 0
+            block_kill = 0
+            for phi in ssa.phis[b]:
+                if phi.name in index:
+                    block_kill |= 1 << index[phi.name]
+            for i in range(graph.statement_offsets[b], graph.statement_offsets[b + 1]):
+                for u in ssa.def_use.used_by_statement(i):
+                    if u in index and not block_kill >> index[u] & 1:
+                        block_gen |= 1 << index[u]
+                d = self._defined(i)
+                if d is not None:
+                    block_kill |= 1 << index[d]
+            block_edge_uses = 0
+            for e in graph.successor_edges(b):
+                for phi in ssa.phis[graph.succs[e]]:
+                    arg = phi.args[graph.succ_positions[e]]
+                    if arg in index:
+                        block_edge_uses |= 1 << index[arg]
+            gen.append(block_gen | (block_edge_uses & ~block_kill))
+            kill.append(block_kill)
+            edge_uses.append(block_edge_uses)
+        solver = DataflowSolver(graph, LivenessProblem(len(self._tracked), gen, kill))
+        return [out | uses for (out, uses) in zip(solver.outs, edge_uses)], edge_uses
+
+    def _defined(self, i: int) -> Optional[str]:
+        node = get_definition_node(self._statements[i])
+        name = self._ssa.names.get(node) if node is not None else None
+        return name if name in self._index else None
+
+    # Chaitin style interference restricted to names with affinities: definition interferes
+    # with names live after it, except the source of a copy. Live names after phis of every
+    # block are kept to drop copies to dead phis.
+    def _interference(self, affine: int) -> dict[int, set[int]]:
+        ssa = self._ssa
+        graph = self._graph
+        index = self._index
+        (live_out, _) = self._liveness()
+        adjacency = {i: set() for i in _bits(affine)}
+
+        def interfere(d: int, live: int):
+            for i in _bits(live & affine & ~(1 << d)):
+                adjacency[d].add(i)
+                adjacency[i].add(d)
+
+        self._entry_live = []
+        for b in range(len(graph)):
+            live = live_out[b]
+            for i in reversed(range(graph.statement_offsets[b], graph.statement_offsets[b + 1])):
+                d = self._defined(i)
+                if d is not None:
+                    d = index[d]
+                    if affine >> d & 1:
+                        s = self._statements[i]
+                        source = ssa.names.get(s.rvalue) if isinstance(s, Assignment) and s.op == '=' \
+                            and isinstance(s.rvalue, ID) else None
+                        interfere(d, live & ~(1 << index[source]) if source in index else live)
+                    live &= ~(1 << d)
+                for u in ssa.def_use.used_by_statement(i):
+                    if u in index:
+                        live |= 1 << index[u]
+            self._entry_live.append(live)
+            for phi in ssa.phis[b]:
+                d = index.get(phi.name)
+                if d is not None and affine >> d & 1:
+                    interfere(d, live)
+        return adjacency
+
+    def _coalesce(self):
+        self._type_keys: dict[Decl, str] = {}
+        affinities = self._affinities()
+        affine = 0
+        for (a, b) in affinities:
+            affine |= 1 << a | 1 << b
+        adjacency = self._interference(affine)
+
+        parent = list(range(len(self._tracked)))
+        members = {i: {i} for i in _bits(affine)}
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for (a, b) in affinities:
+            (ra, rb) = (find(a), find(b))
+            if ra == rb:
+                continue
+            if len(members[ra]) > len(members[rb]):
+                (ra, rb) = (rb, ra)
+            if any(adjacency[m] & members[rb] for m in members[ra]):
+                continue
+            parent[ra] = rb
+            members[rb] |= members.pop(ra)
+            self.coalesced += 1
+        self._class = [find(i) for i in range(len(self._tracked))]
+
+    def _fresh(self, name: str, take: bool = True) -> str:
+        fresh = name
+        k = 1
+        while fresh in self._taken:
+            fresh = f"{name}_{k}"
+            k += 1
+        if take:
+            self._taken.add(fresh)
+        return fresh
+
+    # C names: parameters keep theirs, the first variable of every declaration gets declared name,
+    # the rest get it with a suffix. Names of coalesced classes are given in order of appearance in text,
+    # so the declared name goes to the class which is used first.
+    def _assign_variables(self):
+        self._taken = set(self._reserved)
+        self._variables: dict[int, str] = {}
+        self._instances: dict[Decl, str] = {}
+        self._declared: set[int] = set()
+        self._temporaries: dict[str, str] = {}
+        self._hoisted: list[Decl] = []
+        for p in self._params:
+            if not isinstance(p, Decl) or p.name is None:
+                continue
+            self._taken.add(p.name)
+            if p.name in self._pinned:
+                self._instances[p] = p.name
+            elif self._ssa.names.get(p) in self._index:
+                c = self._class[self._index[self._ssa.names[p]]]
+                self._variables[c] = p.name
+                self._declared.add(c)
+        for d in self._decls:
+            if d.name in self._pinned and d not in self._instances:
+                self._instances[d] = self._fresh(d.name)
+
+    def _class_variable(self, c: int) -> str:
+        variable = self._variables.get(c)
+        if variable is None:
+            variable = self._fresh(self._decl_of[self._tracked[c]].name)
+            self._variables[c] = variable
+        return variable
+
+    # C variable of SSA name, variable is declared at the top of function unless its first appearance
+    # is a declaration which may stay in place
+    def _variable(self, name: str) -> str:
+        i = self._index.get(name)
+        if i is not None:
+            c = self._class[i]
+            if c not in self._declared:
+                self._declared.add(c)
+                self._hoisted.append(self._declaration(self._decl_of[name], self._class_variable(c)))
+            return self._variables[c]
+        decl = self._decl_of.get(name)
+        if decl is None:
+            return name
+        if decl in self._removed_decls:
+            # declaration is dead, but the variable is still assigned
+            self._removed_decls.remove(decl)
+            hoisted = renamed_decl(decl, self._instances[decl])
+            if not set(decl.storage) & {'static', 'extern'}:
+                hoisted.init = None
+            self._hoisted.append(hoisted)
+        return self._instances[decl]
+
+    # variable read before any definition, any variable of it will do
+    def _undefined(self, variable: str) -> str:
+        name = self._first_names.get(variable)
+        return self._variable(name) if name is not None else variable
+
+    def _rewrite(self, n: Optional[Node]) -> Optional[Node]:
+        if n is None:
+            return None
+        n = self._ssa.replacements.get(n, n)
+        if isinstance(n, ID):
+            name = self._ssa.names.get(n)
+            if name is not None:
+                variable = self._variable(name)
+            elif n in self._raw_uses:
+                variable = self._undefined(n.name)
+            else:
+                return n
+            return n if variable == n.name else ID(variable, n.coord)
+        changed = {}
+        for (attr, value) in ((a, getattr(n, a)) for a in n.__slots__ if a not in ('coord', '__weakref__')):
+            # field names and designators are identifiers too
+            if attr == 'field' and isinstance(n, StructRef) or attr == 'name' and isinstance(n, NamedInitializer):
+                continue
+            if isinstance(value, Node):
+                new = self._rewrite(value)
+                if new is not value:
+                    changed[attr] = new
+            elif isinstance(value, list) and any(isinstance(v, Node) for v in value):
+                new = [self._rewrite(v) for v in value]
+                if any(a is not b for (a, b) in zip(new, value)):
+                    changed[attr] = new
+        if not changed:
+            return n
+        n = copy.copy(n)
+        for (attr, value) in changed.items():
+            setattr(n, attr, value)
+        return n
+
+    def _emit_statement(self, s: Node, items: list[Node]):
+        ssa = self._ssa
+        node = get_definition_node(s)
+        name = ssa.names.get(node) if node is not None else None
+        if isinstance(s, Decl):
+            if name is not None and name in self._index:
+                init = self._rewrite(s.init)
+                c = self._class[self._index[name]]
+                # the first appearance of the variable in the text is its declaration, it stays
+                # unless it declares a value which is never used
+                if c not in self._declared and (init is not None or self._ssa.def_use.uses_of(name)):
+                    self._declared.add(c)
+                    decl = renamed_decl(s, self._class_variable(c))
+                    decl.init = init
+                    items.append(decl)
+                elif init is not None:
+                    items.append(Assignment('=', ID(self._variable(name)), init, s.coord))
+                return
+            decl = s if name is None else renamed_decl(s, self._instances[s])
+            init = self._rewrite(s.init)
+            if init is not s.init:
+                decl = copy.copy(decl)
+                decl.init = init
+            items.append(decl)
+            return
+        if name is None or name not in self._index:
+            items.append(self._rewrite(s))
+            return
+
+        prior = ssa.prior_names.get(node)
+        if isinstance(s, Assignment) and s.op == '=':
+            rvalue = self._rewrite(s.rvalue)
+            variable = self._variable(name)
+            if not (isinstance(rvalue, ID) and rvalue.name == variable):
+                items.append(Assignment('=', ID(variable, node.coord), rvalue, s.coord))
+            return
+        (op, rvalue) = (s.op[:-1], self._rewrite(s.rvalue)) if isinstance(s, Assignment) else \
+            (INCREMENT_OPS[s.op], Constant('int', '1'))
+        variable = self._variable(name)
+        if prior is None or self._variable(prior) == variable:
+            target = ID(variable, node.coord)
+            items.append(Assignment(s.op, target, rvalue, s.coord) if isinstance(s, Assignment)
+                         else UnaryOp(s.op, target, s.coord))
+        else:
+            items.append(Assignment('=', ID(variable, node.coord),
+                                    BinaryOp(op, ID(self._variable(prior)), rvalue), s.coord))
+
+    # phi names and arguments which need a copy on edge e: arguments of dead phis
+    # and arguments coalesced with their phis need none
+    def _copy_pairs(self, e: int) -> list[tuple[str, str]]:
+        graph = self._graph
+        t = graph.succs[e]
+        position = graph.succ_positions[e]
+        pairs = []
+        for phi in self._ssa.phis[t]:
+            arg = phi.args[position]
+            i = self._index.get(phi.name)
+            if arg not in self._index or i is None or not self._entry_live[t] >> i & 1:
+                continue
+            if self._class[i] != self._class[self._index[arg]]:
+                pairs.append((phi.name, arg))
+        return pairs
+
+    # parallel copy of edge e as statements, temporaries are shared by all copies of one type
+    def _edge_copies(self, e: int) -> list[Node]:
+        pairs = self._copy_pairs(e)
+        decls = {}
+        copies = []
+        for (d, s) in pairs:
+            (dv, sv) = (self._variable(d), self._variable(s))
+            decls[dv] = self._decl_of[d]
+            copies.append((dv, sv))
+
+        def temporary(location: str) -> str:
+            decl = decls[location]
+            key = self._type_key(decl)
+            if key not in self._temporaries:
+                self._temporaries[key] = self._fresh('tmp')
+                self._hoisted.append(self._declaration(decl, self._temporaries[key]))
+                self.temporaries += 1
+            return self._temporaries[key]
+
+        sequence = sequentialize(copies, temporary)
+        self.copies += len(sequence)
+        return [Assignment('=', ID(d), ID(s)) for (d, s) in sequence]
+
+    # empty blocks without copies on their edge are jumped over, maps them to their final targets
+    def _empty_blocks(self, params: set[Node]) -> dict[int, int]:
+        graph = self._graph
+        forward = {}
+        for b in range(1, len(graph)):
+            statements = graph.block_statements(b)
+            if len(graph.successors(b)) == 1 and all(s in params for s in statements) \
+                    and not self._copy_pairs(graph.succ_offsets[b]):
+                forward[b] = graph.succs[graph.succ_offsets[b]]
+        for b in list(forward):
+            seen = {b}
+            t = forward[b]
+            while t in forward and t not in seen:
+                seen.add(t)
+                t = forward[t]
+            if t in seen:
+                # empty infinite loop stays
+                del forward[b]
+            else:
+                forward[b] = t
+        return forward
+
+    # blocks are laid out in reverse postorder with exit last, jumps to the next block are dropped,
+    # labels are given only to targets of jumps
+    def _emit(self) -> Compound:
+        graph = self._graph
+        self._raw_uses = set()
+        for s in self._statements:
+            node = get_definition_node(s)
+            for u in get_usages(s, self._ssa.replacements):
+                if (self._ssa.prior_names.get(u) if u is node else self._ssa.names.get(u)) is None \
+                        and u.name in self._first_decl:
+                    self._raw_uses.add(u)
+
+        params = set(self._params)
+        forward = self._empty_blocks(params)
+        order = [b for b in range(len(graph)) if len(graph.successors(b)) > 0 and b not in forward] + \
+                [b for b in range(len(graph)) if len(graph.successors(b)) == 0]
+        targets = set()
+        block_items = []
+
+        def jump(t: int, next_block: Optional[int], items: list[Node]):
+            t = forward.get(t, t)
+            if t != next_block:
+                targets.add(t)
+                items.append(Goto(f"b{t}"))
+
+        for (k, b) in enumerate(order):
+            next_block = order[k + 1] if k + 1 < len(order) else None
+            items = []
+            statements = [self._statements[i] for i in range(graph.statement_offsets[b], graph.statement_offsets[b + 1])
+                          if graph.statements[i] not in params]
+            is_condition = isinstance(graph.blocks[b], ConditionBlock) and len(graph.successors(b)) == 2
+            for s in statements[:-1] if is_condition else statements:
+                self._emit_statement(s, items)
+
+            if is_condition:
+                cond = self._rewrite(statements[-1])
+                (e_true, e_false) = graph.successor_edges(b)
+                (t_true, t_false) = (graph.succs[e_true], graph.succs[e_false])
+                (t_true, t_false) = (forward.get(t_true, t_true), forward.get(t_false, t_false))
+                (true_copies, false_copies) = (self._edge_copies(e_true), self._edge_copies(e_false))
+                self.split_edges += bool(true_copies) + bool(false_copies)
+                if true_copies:
+                    if false_copies:
+                        items.append(If(cond, Goto(f"e{e_true}"), None))
+                        items += false_copies
+                        jump(t_false, None, items)
+                        items.append(Label(f"e{e_true}", true_copies[0]))
+                        items += true_copies[1:]
+                    else:
+                        items.append(If(UnaryOp('!', cond), Goto(f"b{t_false}"), None))
+                        targets.add(t_false)
+                        items += true_copies
+                    jump(t_true, next_block, items)
+                elif false_copies:
+                    items.append(If(cond, Goto(f"b{t_true}"), None))
+                    targets.add(t_true)
+                    items += false_copies
+                    jump(t_false, next_block, items)
+                elif t_false == next_block:
+                    items.append(If(cond, Goto(f"b{t_true}"), None))
+                    targets.add(t_true)
+                elif t_true == next_block:
+                    items.append(If(UnaryOp('!', cond), Goto(f"b{t_false}"), None))
+                    targets.add(t_false)
+                else:
+                    items.append(If(cond, Goto(f"b{t_true}"), Goto(f"b{t_false}")))
+                    targets.update((t_true, t_false))
+            elif not (statements and isinstance(statements[-1], Return)):
+                for e in graph.successor_edges(b):
+                    items += self._edge_copies(e)
+                    jump(graph.succs[e], next_block, items)
+            block_items.append(items)
+
+        body = list(self._hoisted)
+        for (b, items) in zip(order, block_items):
+            if b in targets:
+                first = items.pop(0) if items and not isinstance(items[0], Decl) else EmptyStatement()
+                items.insert(0, Label(f"b{b}", first))
+            body += items
+        return Compound(body)
+
+
+# translation unit with functions translated out of SSA, other declarations are kept.
+# Functions are taken from SSA when it keeps them: their local variables may have been renamed
+def translate_unit(ast: FileAST, functions: dict[str, SSAPass]) -> FileAST:
+    ext = []
+    for n in ast.ext:
+        ssa = functions.get(n.decl.name) if isinstance(n, FuncDef) else None
+        ext.append(n if ssa is None else OutOfSSAPass(ssa.func_def if ssa.func_def is not None else n, ssa).func_def)
+    return FileAST(ext, ast.coord)
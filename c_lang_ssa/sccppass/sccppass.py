@@ -0,0 +1,335 @@
+import math
+from typing import Optional
+
+from pycparser.c_ast import *
+
+from c_lang_ssa.ast_utils import INCREMENT_OPS, address_taken, constant_value, has_side_effects, make_constant, \
+    nested_definitions
+from c_lang_ssa.block.block import ConditionBlock, Phi
+from c_lang_ssa.ssapass.ssapass import SSAPass
+from c_lang_ssa.stats.stats import phase
+
+
+class _Lattice:
+    def __init__(self, name: str):
+        self._name = name
+
+    def __repr__(self):
+        return self._name
+
+
+UNDEFINED = _Lattice("UNDEFINED")
+OVERDEFINED = _Lattice("OVERDEFINED")
+
+Value = int | float | _Lattice
+
+_INT_MIN = -2 ** 31
+_INT_MAX = 2 ** 31 - 1
+
+
+# int arithmetic wraps around in two's complement
+def _wrap(value: int) -> int:
+    return (value - _INT_MIN) % 2 ** 32 + _INT_MIN
+
+
+# only plain int variables are followed: values of other types would need their own arithmetic
+def _is_int(decl: Decl) -> bool:
+    t = decl.type
+    return isinstance(t, TypeDecl) and isinstance(t.type, IdentifierType) and \
+        t.type.names in (['int'], ['signed'], ['signed', 'int']) and 'volatile' not in t.quals and \
+        not {'static', 'extern'} & set(decl.storage)
+
+
+# int literals without suffix, character literals (they are int in C) and double literals without suffix
+def _literal_value(n: Constant) -> Value:
+    value = constant_value(n)
+    if value is None or n.type == 'char':
+        return OVERDEFINED if value is None else value
+    if n.type == 'int' and n.value[-1] not in 'uUlL' and value <= _INT_MAX:
+        return value
+    if n.type == 'double' and n.value[-1] not in 'fFlL':
+        return value
+    return OVERDEFINED
+
+
+def _meet(a: Value, b: Value) -> Value:
+    if a is UNDEFINED:
+        return b
+    if b is UNDEFINED:
+        return a
+    if a is OVERDEFINED or b is OVERDEFINED:
+        return OVERDEFINED
+    return a if type(a) is type(b) and a == b else OVERDEFINED
+
+
+def _c_div(a: int, b: int) -> int:
+    q = abs(a) // abs(b)
+    return q if (a < 0) == (b < 0) else -q
+
+
+def _fold_binary(op: str, a: int | float, b: int | float) -> Value:
+    value = _fold_arithmetic(op, a, b)
+    if isinstance(value, int):
+        return _wrap(value)
+    return value if not isinstance(value, float) or math.isfinite(value) else OVERDEFINED
+
+
+def _fold_arithmetic(op: str, a: int | float, b: int | float) -> Value:
+    is_int = isinstance(a, int) and isinstance(b, int)
+    match op:
+        case '+': return a + b
+        case '-': return a - b
+        case '*': return a * b
+        case '/' if b == 0: return OVERDEFINED
+        case '/': return _c_div(a, b) if is_int else a / b
+        case '%' if is_int and b != 0: return a - b * _c_div(a, b)
+        case '<<' if is_int and 0 <= b < 32: return a << b
+        case '>>' if is_int and 0 <= b < 32: return a >> b
+        case '&' if is_int: return a & b
+        case '|' if is_int: return a | b
+        case '^' if is_int: return a ^ b
+        case '<': return int(a < b)
+        case '>': return int(a > b)
+        case '<=': return int(a <= b)
+        case '>=': return int(a >= b)
+        case '==': return int(a == b)
+        case '!=': return int(a != b)
+        case '&&': return int(bool(a) and bool(b))
+        case '||': return int(bool(a) or bool(b))
+    return OVERDEFINED
+
+
+def _fold_unary(op: str, a: int | float) -> Value:
+    match op:
+        case '-': return _wrap(-a) if isinstance(a, int) else -a
+        case '+': return a
+        case '!': return int(not a)
+        case '~' if isinstance(a, int): return ~a
+    return OVERDEFINED
+
+
+# Wegman, Zadeck "Constant Propagation with Conditional Branches":
+# values flow along SSA def-use edges, blocks become executable only through executable CFG edges.
+# Variables other than plain int, variables with address taken and variables defined inside
+# expressions are overdefined.
+class SCCPPass:
+    def __init__(self, ssa: SSAPass):
+        self._ssa = ssa
+        self._graph = ssa.graph
+        self._tracked = self._collect_tracked()
+        self.values: dict[str, Value] = {}
+        self.executable_blocks = bytearray(len(self._graph))
+        self.executable_edges = bytearray(len(self._graph.succs))
+        self._flow_worklist: list[int] = []
+        self._ssa_worklist: list[str] = []
+        with phase(ssa.stats, 'sccp.solve'):
+            self._run()
+        with phase(ssa.stats, 'sccp.apply'):
+            self.folded = self._apply()
+            ssa.index_def_use()
+        if ssa.stats is not None:
+            ssa.stats.count('sccp.folded', self.folded)
+
+    def _collect_tracked(self) -> set[str]:
+        statements = self._graph.statements
+        decls = [s for s in statements if isinstance(s, Decl) and s.name is not None]
+        untracked = {d.name for d in decls if not _is_int(d)} | address_taken(statements) | \
+            nested_definitions(statements)
+        return {d.name for d in decls} - untracked
+
+    # value which variable gets by assignment of value: floats are truncated
+    def _assigned(self, variable: str, value: Value) -> Value:
+        if variable not in self._tracked:
+            return OVERDEFINED
+        if isinstance(value, float):
+            value = math.trunc(value)
+            return value if _INT_MIN <= value <= _INT_MAX else OVERDEFINED
+        return value
+
+    def _run(self):
+        self.executable_blocks[0] = 1
+        self._visit_block(0)
+        while self._flow_worklist or self._ssa_worklist:
+            while self._flow_worklist:
+                e = self._flow_worklist.pop()
+                target = self._graph.succs[e]
+                if self.executable_blocks[target]:
+                    for phi in self._ssa.phis[target]:
+                        self._visit_phi(target, phi)
+                else:
+                    self.executable_blocks[target] = 1
+                    self._visit_block(target)
+            while self._ssa_worklist:
+                name = self._ssa_worklist.pop()
+                for site in self._ssa.def_use.uses_of(name):
+                    if not self.executable_blocks[site.block]:
+                        continue
+                    if site.is_phi:
+                        self._visit_phi(site.block, site.phi)
+                    else:
+                        self._visit_statement(site.block, site.statement)
+
+    def _visit_block(self, b: int):
+        for phi in self._ssa.phis[b]:
+            self._visit_phi(b, phi)
+        for i in range(self._graph.statement_offsets[b], self._graph.statement_offsets[b + 1]):
+            self._visit_statement(b, i)
+        if not isinstance(self._graph.blocks[b], ConditionBlock):
+            for e in self._graph.successor_edges(b):
+                self._mark_edge(e)
+
+    def _visit_phi(self, b: int, phi: Phi):
+        if phi.variable not in self._tracked:
+            self._set_value(phi.name, OVERDEFINED)
+            return
+        value = UNDEFINED
+        for (position, arg) in enumerate(phi.args):
+            if arg is not None and self.executable_edges[self._graph.predecessor_edge(b, position)]:
+                value = _meet(value, self.values.get(arg, UNDEFINED))
+        self._set_value(phi.name, value)
+
+    def _visit_statement(self, b: int, i: int):
+        s = self._graph.statements[i]
+        if isinstance(self._graph.blocks[b], ConditionBlock):
+            self._visit_condition(b, s)
+        elif isinstance(s, Decl):
+            name = self._ssa.names.get(s)
+            if name is not None:
+                self._set_value(name, OVERDEFINED if s.init is None else self._assigned(s.name, self._evaluate(s.init)))
+        elif isinstance(s, Assignment) and isinstance(s.lvalue, ID):
+            name = self._ssa.names.get(s.lvalue)
+            if name is not None:
+                self._set_value(name, self._assigned(s.lvalue.name, self._evaluate_assignment(s)))
+        elif isinstance(s, UnaryOp) and s.op in INCREMENT_OPS and isinstance(s.expr, ID):
+            name = self._ssa.names.get(s.expr)
+            if name is not None:
+                prior = self._lookup(self._ssa.prior_names.get(s.expr))
+                self._set_value(name, self._assigned(s.expr.name, self._combine(INCREMENT_OPS[s.op], prior, 1)))
+
+    def _visit_condition(self, b: int, cond: Node):
+        value = self._evaluate(cond)
+        edges = self._graph.successor_edges(b)
+        if value is UNDEFINED:
+            return
+        elif value is OVERDEFINED:
+            for e in edges:
+                self._mark_edge(e)
+        else:
+            self._mark_edge(edges[0] if value else edges[1])
+
+    def _mark_edge(self, e: int):
+        if not self.executable_edges[e]:
+            self.executable_edges[e] = 1
+            self._flow_worklist.append(e)
+
+    def _set_value(self, name: str, value: Value):
+        old = self.values.get(name, UNDEFINED)
+        new = value if old is UNDEFINED else _meet(old, value)
+        if new is not old and not (type(new) is type(old) and new == old):
+            self.values[name] = new
+            self._ssa_worklist.append(name)
+
+    def _lookup(self, name: Optional[str]) -> Value:
+        if name is None:
+            return OVERDEFINED
+        return self.values.get(name, UNDEFINED)
+
+    def _evaluate_assignment(self, s: Assignment) -> Value:
+        value = self._evaluate(s.rvalue)
+        if s.op == '=':
+            return value
+        prior = self._lookup(self._ssa.prior_names.get(s.lvalue))
+        return self._combine(s.op[:-1], prior, value)
+
+    @staticmethod
+    def _combine(op: str, a: Value, b: Value) -> Value:
+        if a is OVERDEFINED or b is OVERDEFINED:
+            return OVERDEFINED
+        if a is UNDEFINED or b is UNDEFINED:
+            return UNDEFINED
+        return _fold_binary(op, a, b)
+
+    def _evaluate(self, n: Node) -> Value:
+        if isinstance(n, Constant):
+            return _literal_value(n)
+        elif isinstance(n, ID):
+            return self._lookup(self._ssa.names.get(n)) if n.name in self._tracked else OVERDEFINED
+        elif isinstance(n, BinaryOp):
+            left = self._evaluate(n.left)
+            if n.op in ('&&', '||') and not isinstance(left, _Lattice) and bool(left) == (n.op == '||'):
+                return int(bool(left))
+            return self._combine(n.op, left, self._evaluate(n.right))
+        elif isinstance(n, UnaryOp):
+            value = self._evaluate(n.expr)
+            return value if isinstance(value, _Lattice) else _fold_unary(n.op, value)
+        elif isinstance(n, TernaryOp):
+            cond = self._evaluate(n.cond)
+            if isinstance(cond, _Lattice):
+                # arms which meet to a constant replace the whole expression, effects of condition would be lost
+                if cond is OVERDEFINED and has_side_effects(n.cond):
+                    return OVERDEFINED
+                return cond if cond is UNDEFINED else \
+                    _meet(self._evaluate(n.iftrue), self._evaluate(n.iffalse))
+            return self._evaluate(n.iftrue if cond else n.iffalse)
+        return OVERDEFINED
+
+    def _constant(self, n: Node) -> Optional[Constant]:
+        if n is None or isinstance(n, Constant):
+            return None
+        value = self._evaluate(n)
+        return None if isinstance(value, _Lattice) else make_constant(value)
+
+    # replaces maximal constant subexpressions, returns number of replaced expressions.
+    # Operands of &, of increments and targets of assignments are places, they are never replaced,
+    # operands of sizeof are not evaluated at all
+    def _fold(self, n: Node) -> int:
+        folded = 0
+        stack = [(n, True)]
+        while stack:
+            (n, replaceable) = stack.pop()
+            constant = self._constant(n) if replaceable else None
+            if constant is not None:
+                self._ssa.replacements[n] = constant
+                folded += 1
+            elif isinstance(n, UnaryOp) and n.op == 'sizeof':
+                continue
+            elif isinstance(n, UnaryOp) and (n.op == '&' or n.op in INCREMENT_OPS):
+                stack.append((n.expr, False))
+            elif isinstance(n, Assignment):
+                stack += [(n.lvalue, False), (n.rvalue, True)]
+            elif n is not None and not isinstance(n, (Constant, ID)):
+                stack.extend((c, True) for (_, c) in n.children())
+        return folded
+
+    # records folded expressions and unreachable parts into SSA view, returns number of folded expressions
+    def _apply(self) -> int:
+        graph = self._graph
+        folded = 0
+        for b in range(len(graph)):
+            if not self.executable_blocks[b]:
+                self._ssa.unreachable_blocks.add(b)
+                continue
+            for s in graph.block_statements(b):
+                if isinstance(s, Decl):
+                    folded += self._fold(s.init)
+                elif isinstance(s, Assignment) and s.op != '=' and isinstance(s.lvalue, ID):
+                    value = self._lookup(self._ssa.names.get(s.lvalue))
+                    if isinstance(value, _Lattice):
+                        folded += self._fold(s.rvalue)
+                    else:
+                        self._ssa.replacements[s] = Assignment('=', s.lvalue, make_constant(value), s.coord)
+                        folded += 1
+                elif isinstance(s, Assignment):
+                    folded += self._fold(s.rvalue)
+                elif isinstance(s, UnaryOp) and s.op in INCREMENT_OPS and isinstance(s.expr, ID):
+                    value = self._lookup(self._ssa.names.get(s.expr))
+                    if not isinstance(value, _Lattice):
+                        self._ssa.replacements[s] = Assignment('=', s.expr, make_constant(value), s.coord)
+                        folded += 1
+                else:
+                    folded += self._fold(s)
+
+        for e in range(len(graph.succs)):
+            if not self.executable_edges[e]:
+                self._ssa.unreachable_edges.add(e)
+        return folded
@@ -0,0 +1,250 @@
+import mmap
+import os
+import struct
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator, Optional
+
+from c_lang_ssa.ast_utils import get_definition_node
+from c_lang_ssa.block.block import ConditionBlock
+from c_lang_ssa.ssapass.ssapass import SSAPass
+
+# File layout:
+#   header  MAGIC, u16 version
+#   records u32 length + function record, one per function, written as functions are ready
+#   index   varint count, (string name, varint offset of record)*
+#   footer  u64 offset of index, MAGIC
+# Function record: string table followed by blocks, all integers are LEB128 varints,
+# strings are varint length + utf-8 and are referenced by their table index.
+MAGIC = b'CSSA'
+VERSION = 1
+_HEADER = struct.Struct('<4sH')
+_LENGTH = struct.Struct('<I')
+_FOOTER = struct.Struct('<Q4s')
+
+BLOCK_CONDITION = 1
+BLOCK_FINAL = 2
+BLOCK_UNREACHABLE = 4
+
+
+@dataclass
+class StatementRecord:
+    text: str
+    defined: Optional[str] = None
+    used: list[str] = field(default_factory=list)
+
+
+@dataclass
+class BlockRecord:
+    flags: int
+    succs: list[int]
+    phis: list[tuple[str, list[Optional[str]]]]
+    statements: list[StatementRecord]
+
+    @property
+    def is_condition(self) -> bool:
+        return bool(self.flags & BLOCK_CONDITION)
+
+
+@dataclass
+class FunctionRecord:
+    name: str
+    blocks: list[BlockRecord]
+
+
+def _put_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _put_string(out: bytearray, s: str):
+    data = s.encode()
+    _put_varint(out, len(data))
+    out += data
+
+
+class _Decoder:
+    def __init__(self, data, offset: int):
+        self._data = data
+        self.offset = offset
+
+    def varint(self) -> int:
+        result = 0
+        shift = 0
+        while True:
+            byte = self._data[self.offset]
+            self.offset += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def string(self) -> str:
+        length = self.varint()
+        s = bytes(self._data[self.offset:self.offset + length]).decode()
+        self.offset += length
+        return s
+
+
+def encode_function(name: str, ssa: SSAPass) -> bytes:
+    strings: dict[str, int] = {}
+
+    def ref(s: Optional[str]) -> int:
+        # 0 is reserved for missing value (undefined phi operand, statement without definition)
+        if s is None:
+            return 0
+        if s not in strings:
+            strings[s] = len(strings) + 1
+        return strings[s]
+
+    graph = ssa.graph
+    cg = ssa.generator()
+    body = bytearray()
+    _put_varint(body, len(graph))
+    for b in range(len(graph)):
+        block = graph.blocks[b]
+        flags = (BLOCK_CONDITION if isinstance(block, ConditionBlock) else 0) \
+            | (BLOCK_FINAL if block.is_final else 0) \
+            | (BLOCK_UNREACHABLE if b in ssa.unreachable_blocks else 0)
+        _put_varint(body, flags)
+        succs = graph.successors(b)
+        _put_varint(body, len(succs))
+        for s in succs:
+            _put_varint(body, s)
+        _put_varint(body, len(ssa.phis[b]))
+        for phi in ssa.phis[b]:
+            _put_varint(body, ref(phi.name))
+            _put_varint(body, len(phi.args))
+            for a in phi.args:
+                _put_varint(body, ref(a))
+        _put_varint(body, graph.statement_offsets[b + 1] - graph.statement_offsets[b])
+        for i in range(graph.statement_offsets[b], graph.statement_offsets[b + 1]):
+            s = ssa.replacements.get(graph.statements[i], graph.statements[i])
+            node = get_definition_node(s)
+            used = ssa.def_use.used_by_statement(i)
+            _put_varint(body, ref(cg.visit(s)))
+            _put_varint(body, ref(ssa.names.get(node) if node is not None else None))
+            _put_varint(body, len(used))
+            for u in used:
+                _put_varint(body, ref(u))
+
+    out = bytearray()
+    _put_string(out, name)
+    _put_varint(out, len(strings))
+    for s in strings:
+        _put_string(out, s)
+    return bytes(out + body)
+
+
+def decode_function(data, offset: int = 0) -> FunctionRecord:
+    d = _Decoder(data, offset)
+    name = d.string()
+    strings: list[Optional[str]] = [None] + [d.string() for _ in range(d.varint())]
+    blocks = []
+    for _ in range(d.varint()):
+        flags = d.varint()
+        succs = [d.varint() for _ in range(d.varint())]
+        phis = []
+        for _ in range(d.varint()):
+            phi_name = strings[d.varint()]
+            phis.append((phi_name, [strings[d.varint()] for _ in range(d.varint())]))
+        statements = []
+        for _ in range(d.varint()):
+            text = strings[d.varint()]
+            defined = strings[d.varint()]
+            used = [strings[d.varint()] for _ in range(d.varint())]
+            statements.append(StatementRecord(text=text, defined=defined, used=used))
+        blocks.append(BlockRecord(flags=flags, succs=succs, phis=phis, statements=statements))
+    return FunctionRecord(name=name, blocks=blocks)
+
+
+class SSAWriter:
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self._offset = 0
+        self._index: list[tuple[str, int]] = []
+        self._write(_HEADER.pack(MAGIC, VERSION))
+
+    def _write(self, data: bytes):
+        self._f.write(data)
+        self._offset += len(data)
+
+    def write(self, name: str, ssa: SSAPass):
+        record = encode_function(name, ssa)
+        self._index.append((name, self._offset))
+        self._write(_LENGTH.pack(len(record)))
+        self._write(record)
+
+    def close(self):
+        index = bytearray()
+        _put_varint(index, len(self._index))
+        for (name, offset) in self._index:
+            _put_string(index, name)
+            _put_varint(index, offset)
+        index_offset = self._offset
+        self._write(bytes(index))
+        self._write(_FOOTER.pack(index_offset, MAGIC))
+        self._f.flush()
+
+    def __enter__(self) -> 'SSAWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Reader maps the file into memory and decodes functions only when they are asked for.
+# File which was not closed (no index) is indexed by walking record lengths.
+class SSAReader:
+    def __init__(self, path: str):
+        self._file = open(path, 'rb')
+        if os.fstat(self._file.fileno()).st_size < _HEADER.size:
+            self._file.close()
+            raise ValueError(f"{path} is not SSA dump of version {VERSION}")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version) = _HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not SSA dump of version {VERSION}")
+        self._index = self._read_index()
+
+    def _read_index(self) -> dict[str, int]:
+        data = self._data
+        if len(data) >= _HEADER.size + _FOOTER.size:
+            (index_offset, magic) = _FOOTER.unpack_from(data, len(data) - _FOOTER.size)
+            if magic == MAGIC:
+                d = _Decoder(data, index_offset)
+                return {d.string(): d.varint() for _ in range(d.varint())}
+        index = {}
+        offset = _HEADER.size
+        while offset + _LENGTH.size <= len(data):
+            (length,) = _LENGTH.unpack_from(data, offset)
+            if offset + _LENGTH.size + length > len(data):
+                break
+            index[_Decoder(data, offset + _LENGTH.size).string()] = offset
+            offset += _LENGTH.size + length
+        return index
+
+    def names(self) -> list[str]:
+        return list(self._index.keys())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __getitem__(self, name: str) -> FunctionRecord:
+        return decode_function(self._data, self._index[name] + _LENGTH.size)
+
+    def __iter__(self) -> Iterator[FunctionRecord]:
+        for name in self._index:
+            yield self[name]
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def __enter__(self) -> 'SSAReader':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,19 +1,330 @@
 import graphviz
 
 from c_lang_ssa.block.block import *
-import copy
+from c_lang_ssa.ast_utils import get_definition, get_definition_node, get_usages, renamed_decl
+from c_lang_ssa.blockgraph.blockgraph import BlockGraph
+from c_lang_ssa.defuse.defuse import DefUse, Site
+from c_lang_ssa.dominators.dominators import DominatorTree
+from c_lang_ssa.liveness.liveness import Liveness
+from c_lang_ssa.stats.stats import Stats, phase
 
 
+# SSA view of a CFG. The CFG and its AST are never changed: new names are kept in a side table
+# keyed by ID and Decl nodes and phis are kept per block index, so many views can share one CFG
 class SSAPass:
-    def __init__(self, start_block: Block):
-        self.start_block = copy.deepcopy(start_block)
-        variables = self.start_block.fill_decls()
-        self.start_block.init_phi_functions(variables)
-        self.start_block.rename(variables)
-        pass
+    def __init__(self, start_block: Block, pruned: bool = False, stats: Optional[Stats] = None,
+                 func_def: Optional[FuncDef] = None):
+        self.stats = stats
+        self.start_block = start_block
+        # function the CFG was built from, its nodes are the nodes of the CFG
+        self.func_def = func_def
+        with phase(stats, 'ssa.block_graph'):
+            self.graph = BlockGraph(self.start_block)
+        with phase(stats, 'ssa.dominators'):
+            self.dom_tree = DominatorTree(self.graph)
+        self.phis: list[list[Phi]] = [[] for _ in range(len(self.graph))]
+        self.names: dict[Node, str] = {}
+        # name which target of compound assignment (x += 1) or increment had before it
+        self.prior_names: dict[Node, str] = {}
+        self.def_use = DefUse()
+        # filled by optimization passes, the CFG itself is left untouched
+        self.replacements: dict[Node, Node] = {}
+        self.unreachable_blocks: set[int] = set()
+        self.unreachable_edges: set[int] = set()
+        # declarations of structs and functions are not variables
+        variables = list(dict.fromkeys(s.name for s in self.graph.statements
+                                       if isinstance(s, Decl) and s.name is not None
+                                       and not isinstance(s.type, FuncDecl)))
+        with phase(stats, 'ssa.phis'):
+            self._place_phi_functions(variables, pruned)
+        with phase(stats, 'ssa.rename'):
+            new_names = self._rename(variables)
+        with phase(stats, 'ssa.def_use'):
+            self.index_def_use()
+        if stats is not None:
+            phis = sum(len(p) for p in self.phis)
+            stats.count('ssa.functions')
+            stats.count('ssa.blocks', len(self.graph))
+            stats.count('ssa.variables', len(variables))
+            stats.count('ssa.phis', phis)
+            stats.count('ssa.new_names', new_names)
+            # names of statements definitions are in the same table as names of uses
+            stats.count('ssa.renamed_uses', len(self.names) - (new_names - phis))
+
+    # minimal SSA: phi for variable only in iterated dominance frontier of its definitions,
+    # pruned SSA additionally drops phis for variables which are dead at block entry
+    def _place_phi_functions(self, variables: list[str], pruned: bool):
+        def_blocks = {v: [] for v in variables}
+        for b in range(len(self.graph)):
+            for s in self.graph.block_statements(b):
+                name = get_definition(s)
+                if name in def_blocks:
+                    def_blocks[name].append(b)
+
+        liveness = Liveness(self.graph, variables) if pruned else None
+        for (v, blocks) in def_blocks.items():
+            for b in sorted(self.dom_tree.iterated_frontier(blocks)):
+                if liveness is None or liveness.is_live_in(b, v):
+                    self.phis[b].append(Phi(variable=v, name=v, args=[None] * self.graph.predecessors_count(b)))
+
+    # Cytron et al. renaming: preorder walk of dominator tree with a stack of names for every variable
+    # returns number of new names
+    def _rename(self, variables: list[str]) -> int:
+        graph = self.graph
+        counters = {v: 0 for v in variables}
+        stacks = {v: [] for v in variables}
+
+        def push_new_name(variable: str) -> str:
+            new_name = f"{variable}_{counters[variable]}"
+            counters[variable] += 1
+            stacks[variable].append(new_name)
+            pushed.append(variable)
+            return new_name
+
+        worklist = [(0, None)]
+        while worklist:
+            (b, popped) = worklist.pop()
+            if popped is not None:
+                for v in popped:
+                    stacks[v].pop()
+                continue
+
+            pushed = []
+            for phi in self.phis[b]:
+                phi.name = push_new_name(phi.variable)
+
+            for s in graph.block_statements(b):
+                for u in get_usages(s):
+                    names = stacks.get(u.name)
+                    if names:
+                        self.names[u] = names[-1]
+                node = get_definition_node(s)
+                if node is not None and node.name in stacks:
+                    if node in self.names:
+                        self.prior_names[node] = self.names[node]
+                    self.names[node] = push_new_name(node.name)
+
+            for e in graph.successor_edges(b):
+                for phi in self.phis[graph.succs[e]]:
+                    names = stacks[phi.variable]
+                    phi.args[graph.succ_positions[e]] = names[-1] if names else None
+
+            worklist.append((b, pushed))
+            worklist.extend((c, None) for c in reversed(self.dom_tree.children[b]))
+        return sum(counters.values())
+
+    # one pass over renamed statements and phis, repeated by passes which change the view
+    def index_def_use(self):
+        graph = self.graph
+        self.def_use = DefUse()
+        for b in range(len(graph)):
+            for phi in self.phis[b]:
+                self.def_use.add_definition(phi.name, Site(block=b, statement=-1, phi=phi))
+                for (position, arg) in enumerate(phi.args):
+                    if arg is not None:
+                        self.def_use.add_use(arg, Site(block=b, statement=-1, phi=phi, position=position))
+
+            for i in range(graph.statement_offsets[b], graph.statement_offsets[b + 1]):
+                s = self.replacements.get(graph.statements[i], graph.statements[i])
+                node = get_definition_node(s)
+                for u in get_usages(s, self.replacements):
+                    name = self.prior_names.get(u) if u is node else self.names.get(u)
+                    if name is not None:
+                        self.def_use.add_use(name, Site(block=b, statement=i, node=u))
+                if node is not None and node in self.names:
+                    self.def_use.add_definition(self.names[node], Site(block=b, statement=i, node=node))
+
+    # Copy-on-write of the CFG: the view gets its own blocks without unreachable blocks and edges
+    # and without removed statements, then straight-line chains and empty blocks are merged.
+    # Phi operands travel to the end of predecessor blocks as _PhiMove pseudo statements,
+    # so they follow their predecessors through merging, phi blocks get a target-less _PhiMove
+    # in front, so they are never taken for empty blocks.
+    def restructure(self, removed: Optional[set[Node]] = None):
+        with phase(self.stats, 'ssa.restructure'):
+            self._restructure(removed or set())
+
+    def _restructure(self, removed: set[Node]):
+        graph = self.graph
+        copies: list[Optional[Block]] = [None] * len(graph)
+        for b in range(len(graph)):
+            if b in self.unreachable_blocks:
+                continue
+            block = graph.blocks[b]
+            statements = [s for s in graph.block_statements(b) if s not in removed]
+            live_edges = [e for e in graph.successor_edges(b) if e not in self.unreachable_edges]
+            if isinstance(block, ConditionBlock) and len(live_edges) == 2:
+                copy = ConditionBlock()
+                copy.add_statements(statements)
+            else:
+                # condition known at compile time has no side effects and is dropped
+                copy = BaseBlock(is_final=block.is_final, label=getattr(block, 'label', ""))
+                copy.add_statements([] if isinstance(block, ConditionBlock) else statements)
+            copies[b] = copy
+
+        def live_preds(b: int) -> list[int]:
+            return [k for k in range(graph.predecessors_count(b))
+                    if graph.predecessor_edge(b, k) not in self.unreachable_edges]
+
+        def live_targets(b: int) -> list[int]:
+            return [graph.succs[e] for e in graph.successor_edges(b) if e not in self.unreachable_edges]
+
+        # empty block in front of a phi block would keep its phi operands forever,
+        # so its predecessors jump to the phi block directly when this does not create duplicate edges
+        forward = {}
+        for t in range(len(graph)):
+            if copies[t] is None or not self.phis[t] or len(live_preds(t)) < 2:
+                continue
+            t_preds = {graph.predecessors(t)[k] for k in live_preds(t)}
+            worklist = list(t_preds)
+            while worklist:
+                e = worklist.pop()
+                e_preds = [graph.predecessors(e)[k] for k in live_preds(e)]
+                if e != 0 and copies[e].is_empty and not self.phis[e] and len(live_targets(e)) == 1 \
+                        and e_preds and not any(p in t_preds or p in forward for p in e_preds):
+                    forward[e] = t
+                    t_preds.update(e_preds)
+                    worklist += e_preds
+
+        phis_of: dict[Block, list[Phi]] = {}
+        for b in range(len(graph)):
+            if copies[b] is None or b in forward:
+                continue
+            preds = live_preds(b)
+            if len(preds) == 1:
+                copies[b].statements[:0] = [self._phi_copy(phi, phi.args[preds[0]])
+                                            for phi in self.phis[b] if phi.args[preds[0]] is not None]
+            elif self.phis[b]:
+                phis_of[copies[b]] = self.phis[b]
+                copies[b].statements.insert(0, _PhiMove(None, []))
+                for k in preds:
+                    pred = graph.predecessors(b)[k]
+                    move_sources = [pred]
+                    while any(source in forward for source in move_sources):
+                        move_sources = [p for source in move_sources for p in
+                                        ([graph.predecessors(source)[j] for j in live_preds(source)]
+                                         if source in forward else [source])]
+                    for source in move_sources:
+                        copies[source].add_statements([_PhiMove(copies[b], [phi.args[k] for phi in self.phis[b]])])
+
+        for b in range(len(graph)):
+            if copies[b] is None or b in forward:
+                continue
+            for (k, t) in enumerate(live_targets(b)):
+                while t in forward:
+                    t = forward[t]
+                if isinstance(copies[b], ConditionBlock):
+                    (copies[b].add_left_block if k == 0 else copies[b].add_right_block)(copies[t])
+                else:
+                    copies[b].add_next_block(copies[t])
+                copies[t].add_parent(copies[b])
+
+        self.start_block = copies[0]
+        (merged, eliminated) = self.start_block.merge_blocks_recursive()
+        if self.stats is not None:
+            self.stats.count('ssa.restructure.blocks_merged', merged)
+            self.stats.count('ssa.restructure.blocks_eliminated', eliminated)
+
+        moves: dict[Block, dict[Block, list[Optional[str]]]] = {}
+        for block in BlockGraph(self.start_block).blocks:
+            block_moves = [s for s in block.statements if isinstance(s, _PhiMove)]
+            if block_moves:
+                moves[block] = {m.target: m.args for m in block_moves if m.target is not None}
+                block.statements[:] = [s for s in block.statements if not isinstance(s, _PhiMove)]
+
+        self.graph = BlockGraph(self.start_block)
+        self.dom_tree = DominatorTree(self.graph)
+        self.phis = [[] for _ in range(len(self.graph))]
+        for (t, block) in enumerate(self.graph.blocks):
+            for (i, phi) in enumerate(phis_of.get(block, [])):
+                args = [moves[self.graph.blocks[p]][block][i] for p in self.graph.predecessors(t)]
+                self.phis[t].append(Phi(variable=phi.variable, name=phi.name, args=args))
+        self.unreachable_blocks = set()
+        self.unreachable_edges = set()
+        self.index_def_use()
+
+    def _phi_copy(self, phi: Phi, arg: str) -> Assignment:
+        lvalue = ID(phi.variable)
+        rvalue = ID(phi.variable)
+        self.names[lvalue] = phi.name
+        self.names[rvalue] = arg
+        return Assignment('=', lvalue, rvalue)
+
+    # blocks are stored as a flat list with successor indices, so pickling does not recurse along the CFG
+    def __getstate__(self) -> dict:
+        graph = self.graph
+        return {
+            'blocks': [(type(b), b.statements, b.is_final, b.color, getattr(b, 'label', "")) for b in graph.blocks],
+            'succs': [list(graph.successors(b)) for b in range(len(graph))],
+            'phis': self.phis,
+            'names': self.names,
+            'prior_names': self.prior_names,
+            'replacements': self.replacements,
+            'unreachable_blocks': self.unreachable_blocks,
+            'unreachable_edges': self.unreachable_edges,
+            'func_def': self.func_def,
+        }
+
+    def __setstate__(self, state: dict):
+        blocks = []
+        for (block_type, statements, is_final, _, label) in state['blocks']:
+            block = ConditionBlock() if block_type is ConditionBlock else BaseBlock(is_final=is_final, label=label)
+            block.add_statements(statements)
+            blocks.append(block)
+        for (block, succs) in zip(blocks, state['succs']):
+            for (k, t) in enumerate(succs):
+                if isinstance(block, ConditionBlock):
+                    (block.add_left_block if k == 0 else block.add_right_block)(blocks[t])
+                else:
+                    block.add_next_block(blocks[t])
+                blocks[t].add_parent(block)
+        for (block, (_, _, _, color, _)) in zip(blocks, state['blocks']):
+            block.set_color(color)
+
+        self.start_block = blocks[0]
+        self.graph = BlockGraph(self.start_block)
+        self.dom_tree = DominatorTree(self.graph)
+        self.phis = state['phis']
+        self.names = state['names']
+        self.prior_names = state['prior_names']
+        self.replacements = state['replacements']
+        self.stats = None
+        self.unreachable_blocks = state['unreachable_blocks']
+        self.unreachable_edges = state['unreachable_edges']
+        self.func_def = state['func_def']
+        self.index_def_use()
+
+    def generator(self) -> 'SSAGenerator':
+        return SSAGenerator(self.names, self.replacements)
+
+    def generate_dot(self, dot):
+        self.start_block.generate_dot(dot, self.generator(), self.phis)
 
     def show(self):
         dot = graphviz.Digraph("CFG", format='png', renderer='cairo', strict=True)
-        self.start_block.generate_dot(dot)
+        self.generate_dot(dot)
         dot.view(quiet_view=True)
 
+
+class _PhiMove:
+    __slots__ = ('target', 'args')
+
+    def __init__(self, target: Block, args: list[Optional[str]]):
+        self.target = target
+        self.args = args
+
+
+class SSAGenerator(CGenerator):
+    def __init__(self, names: dict[Node, str], replacements: Optional[dict[Node, Node]] = None):
+        super().__init__()
+        self._names = names
+        self._replacements = replacements or {}
+
+    def visit(self, node: Node) -> str:
+        return super().visit(self._replacements.get(node, node))
+
+    def visit_ID(self, n: ID) -> str:
+        return self._names.get(n, n.name)
+
+    def visit_Decl(self, n: Decl, *args, **kwargs) -> str:
+        name = self._names.get(n)
+        return super().visit_Decl(n if name is None else renamed_decl(n, name), *args, **kwargs)
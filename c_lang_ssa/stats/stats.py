@@ -0,0 +1,90 @@
+import contextlib
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Optional
+
+_NO_PHASE = contextlib.nullcontext()
+
+
+# Counters, wall time and allocations of pass phases. Passes take optional Stats and only check it
+# for None when it is off. Allocations are measured when tracemalloc is tracing.
+# Stats of functions built in other processes are pickled back and merged.
+class Stats:
+    # node_types: count and time CfgPass traversal of every node type, it slows traversal down
+    def __init__(self, node_types: bool = True):
+        self.node_types = node_types
+        self.counters: dict[str, int] = defaultdict(int)
+        self.seconds: dict[str, float] = defaultdict(float)
+        # net size of memory allocated by phase and left allocated after it
+        self.allocated: dict[str, int] = defaultdict(int)
+        # peak size of memory allocated during phase
+        self.peak: dict[str, int] = defaultdict(int)
+        # peaks of open phases before their nested phases reset the peak of tracemalloc
+        self._open_peaks: list[int] = []
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def add_time(self, name: str, seconds: float):
+        self.seconds[name] += seconds
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            (before, peak) = tracemalloc.get_traced_memory()
+            if self._open_peaks:
+                self._open_peaks[-1] = max(self._open_peaks[-1], peak)
+            tracemalloc.reset_peak()
+            self._open_peaks.append(before)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - start
+            if tracing:
+                (current, peak) = tracemalloc.get_traced_memory()
+                peak = max(peak, self._open_peaks.pop())
+                if self._open_peaks:
+                    # peak of nested phase is a peak of the enclosing one too
+                    self._open_peaks[-1] = max(self._open_peaks[-1], peak)
+                self.allocated[name] += current - before
+                self.peak[name] = max(self.peak[name], peak - before)
+
+    def merge(self, other: 'Stats'):
+        for (name, n) in other.counters.items():
+            self.counters[name] += n
+        for (name, seconds) in other.seconds.items():
+            self.seconds[name] += seconds
+        for (name, size) in other.allocated.items():
+            self.allocated[name] += size
+        for (name, size) in other.peak.items():
+            self.peak[name] = max(self.peak[name], size)
+
+    def to_dict(self) -> dict:
+        return {
+            'counters': dict(self.counters),
+            'seconds': dict(self.seconds),
+            'allocated': dict(self.allocated),
+            'peak': dict(self.peak),
+        }
+
+    def format(self) -> str:
+        lines = []
+        for name in sorted(self.seconds.keys() | self.counters.keys()):
+            line = f"{name:40}"
+            if name in self.counters:
+                line += f" {self.counters[name]:>10}"
+            else:
+                line += f" {'':>10}"
+            if name in self.seconds:
+                line += f" {self.seconds[name] * 1000:>10.2f} ms"
+            if name in self.peak:
+                line += f" {self.allocated[name] / 1024:>10.1f} KiB {self.peak[name] / 1024:>10.1f} KiB peak"
+            lines.append(line.rstrip())
+        return '\n'.join(lines)
+
+
+def phase(stats: Optional[Stats], name: str):
+    return stats.phase(name) if stats is not None else _NO_PHASE
@@ -0,0 +1,72 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import graphviz
+from pycparser.c_ast import *
+
+from c_lang_ssa.cache.cache import FunctionCache
+from c_lang_ssa.cfgpass.cfgpass import CfgPass
+from c_lang_ssa.ssapass.ssapass import SSAPass
+from c_lang_ssa.stats.stats import Stats
+
+
+def _build_function_ssa(func_def: FuncDef, pruned: bool, stats: Optional[Stats] = None) -> tuple[str, SSAPass]:
+    cfg = CfgPass(FileAST([func_def]), stats=stats)
+    name = func_def.decl.name
+    return name, SSAPass(cfg.functions[name], pruned=pruned, stats=stats, func_def=cfg.func_defs[name])
+
+
+# in worker process stats are collected separately and sent back with SSA
+def _build_function_ssa_profiled(func_def: FuncDef, pruned: bool) -> tuple[str, SSAPass, Stats]:
+    stats = Stats()
+    return _build_function_ssa(func_def, pruned, stats) + (stats,)
+
+
+# SSA for every function of translation unit,
+# functions are independent, so with processes > 1 they are built in a process pool,
+# with cache only functions which changed since the previous run are built
+class UnitPass:
+    def __init__(self, ast: FileAST, processes: int = 1, pruned: bool = False,
+                 cache: Optional[FunctionCache] = None, stats: Optional[Stats] = None):
+        func_defs = [n for n in ast.ext if isinstance(n, FuncDef)]
+        keys = [cache.key(f, pruned=pruned) for f in func_defs] if cache is not None else []
+        cached = [cache.get(k) for k in keys] if cache is not None else [None] * len(func_defs)
+
+        missing = [f for (f, ssa) in zip(func_defs, cached) if ssa is None]
+        built = iter(self._build(missing, processes, pruned, stats))
+        self.functions: dict[str, SSAPass] = {}
+        for (i, f) in enumerate(func_defs):
+            if cached[i] is not None:
+                self.functions[f.decl.name] = cached[i]
+                cached[i].stats = stats
+                continue
+            (name, ssa) = next(built)
+            self.functions[name] = ssa
+            if cache is not None:
+                cache.put(keys[i], ssa)
+
+    @staticmethod
+    def _build(func_defs: list[FuncDef], processes: int, pruned: bool,
+               stats: Optional[Stats]) -> list[tuple[str, SSAPass]]:
+        if processes <= 1 or len(func_defs) <= 1:
+            return [_build_function_ssa(f, pruned, stats) for f in func_defs]
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            chunksize = max(1, len(func_defs) // (processes * 4))
+            if stats is None:
+                return list(executor.map(_build_function_ssa, func_defs,
+                                         [pruned] * len(func_defs), chunksize=chunksize))
+            built = []
+            for (name, ssa, function_stats) in executor.map(_build_function_ssa_profiled, func_defs,
+                                                            [pruned] * len(func_defs), chunksize=chunksize):
+                stats.merge(function_stats)
+                ssa.stats = stats
+                built.append((name, ssa))
+            return built
+
+    def show(self):
+        dot = graphviz.Digraph("SSA", format='png', renderer='cairo', strict=True)
+        for (name, ssa) in self.functions.items():
+            with dot.subgraph(name=f"cluster_{name}") as sub:
+                sub.attr(label=name)
+                ssa.generate_dot(sub)
+        dot.view(quiet_view=True)
@@ -0,0 +1,74 @@
+import shutil
+import subprocess
+
+import pytest
+from pycparser import CParser
+from pycparser.c_generator import CGenerator
+
+from c_lang_ssa.block.block import BaseBlock
+from c_lang_ssa.blockgraph.blockgraph import BlockGraph
+from c_lang_ssa.outofssapass.outofssapass import translate_unit
+from c_lang_ssa.unitpass.unitpass import UnitPass
+
+
+# C text of source after SSA construction, passes (applied to SSA of every function) and out-of-SSA
+def translate(source: str, passes=()) -> str:
+    ast = CParser().parse(source)
+    unit = UnitPass(ast)
+    for ssa in unit.functions.values():
+        for p in passes:
+            p(ssa)
+    return CGenerator().visit(translate_unit(ast, unit.functions))
+
+
+@pytest.fixture(name='translate')
+def translate_fixture():
+    return translate
+
+
+# BlockGraph of blocks named by edges (source, target) and statements parsed from C text of every block,
+# entry is the source of the first edge. Returns the graph and indices of blocks by name
+def block_graph(edges: list[tuple[str, str]], statements: dict[str, str] = None) -> tuple[BlockGraph, dict[str, int]]:
+    blocks = {}
+    for name in (n for edge in edges for n in edge):
+        if name not in blocks:
+            blocks[name] = BaseBlock(label=name)
+    for (source, target) in edges:
+        blocks[source].add_next_block(blocks[target])
+        blocks[target].add_parent(blocks[source])
+    for (name, text) in (statements or {}).items():
+        blocks[name].add_statements(CParser().parse(f"void f() {{ {text} }}").ext[0].body.block_items)
+    graph = BlockGraph(blocks[edges[0][0]])
+    return graph, {name: b.index for (name, b) in blocks.items()}
+
+
+@pytest.fixture(name='block_graph')
+def block_graph_fixture():
+    return block_graph
+
+
+@pytest.fixture
+def run_c(tmp_path):
+    if shutil.which('gcc') is None:
+        pytest.skip('gcc is not available')
+    count = 0
+
+    def run(source: str) -> str:
+        nonlocal count
+        count += 1
+        path = tmp_path / f"program{count}.c"
+        path.write_text(source)
+        binary = tmp_path / f"program{count}"
+        subprocess.run(['gcc', '-w', '-o', str(binary), str(path)], check=True, capture_output=True, text=True)
+        return subprocess.run([str(binary)], check=True, capture_output=True, text=True, timeout=10).stdout
+
+    return run
+
+
+# output of the program is the same before and after the passes
+@pytest.fixture
+def same_behaviour(run_c):
+    def check(source: str, passes=()):
+        assert run_c(translate(source, passes)) == run_c(source)
+
+    return check
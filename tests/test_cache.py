@@ -0,0 +1,81 @@
+import os
+
+from pycparser import CParser
+from pycparser.c_generator import CGenerator
+
+from c_lang_ssa.cache import cache as cache_module
+from c_lang_ssa.cache.cache import FunctionCache
+from c_lang_ssa.outofssapass.outofssapass import translate_unit
+from c_lang_ssa.unitpass.unitpass import UnitPass
+
+SOURCE = """
+int f(int n) { int s = 0; for (int i = 0; i < n; i++) s += i; return s; }
+int g(int x) { if (x > 0) x = x - 1; else x = 0; return x; }
+"""
+
+
+def _unit(directory, source: str = SOURCE, **options) -> tuple[UnitPass, FunctionCache]:
+    cache = FunctionCache(str(directory), **options)
+    return UnitPass(CParser().parse(source), cache=cache), cache
+
+
+def test_hits_after_misses(tmp_path):
+    (first, cache) = _unit(tmp_path)
+    assert (cache.hits, cache.misses) == (0, 2)
+    (second, cache) = _unit(tmp_path)
+    assert (cache.hits, cache.misses) == (2, 0) and cache.hit_rate == 1.0
+    for name in ('f', 'g'):
+        (built, cached) = (first.functions[name], second.functions[name])
+        assert len(cached.graph) == len(built.graph)
+        assert [[phi.name for phi in phis] for phis in cached.phis] == [[phi.name for phi in phis] for phis in built.phis]
+
+
+def test_changed_function_misses(tmp_path):
+    _unit(tmp_path)
+    (_, cache) = _unit(tmp_path, SOURCE.replace('x - 1', 'x - 2'))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_construction_version_invalidates_entries(tmp_path, monkeypatch):
+    func_def = CParser().parse(SOURCE).ext[0]
+    key = FunctionCache.key(func_def, pruned=False)
+    assert FunctionCache.key(func_def, pruned=True) != key
+    _unit(tmp_path)
+    monkeypatch.setattr(cache_module, '_CONSTRUCTION_VERSION', cache_module._CONSTRUCTION_VERSION + 1)
+    assert FunctionCache.key(func_def, pruned=False) != key
+    (_, cache) = _unit(tmp_path)
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_corrupted_entry_misses(tmp_path):
+    _unit(tmp_path)
+    for entry in os.scandir(tmp_path):
+        with open(entry.path, 'wb') as f:
+            f.write(b'not a pickle')
+    (unit, cache) = _unit(tmp_path)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert set(unit.functions) == {'f', 'g'}
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    ssa = UnitPass(CParser().parse(SOURCE)).functions['f']
+    cache = FunctionCache(str(tmp_path))
+    for key in ('a', 'b', 'c'):
+        cache.put(key, ssa)
+    size = os.path.getsize(cache._path('a'))
+    for (t, key) in enumerate(('a', 'b', 'c')):
+        os.utime(cache._path(key), (1000 + t, 1000 + t))
+    # hit makes the oldest entry the most recently used one
+    cache = FunctionCache(str(tmp_path), max_bytes=3 * size + size // 2)
+    assert cache.get('a') is not None
+    cache.put('d', ssa)
+    assert {e.name for e in os.scandir(tmp_path)} == {cache._path(k).rsplit(os.sep, 1)[1] for k in 'acd'}
+    assert cache.get('b') is None and cache.get('c') is not None
+
+
+def test_cached_function_translates_like_built_one(tmp_path):
+    ast = CParser().parse(SOURCE)
+    (first, _) = _unit(tmp_path)
+    (second, _) = _unit(tmp_path)
+    assert CGenerator().visit(translate_unit(ast, second.functions)) == \
+        CGenerator().visit(translate_unit(ast, first.functions))
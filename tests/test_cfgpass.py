@@ -0,0 +1,38 @@
+import pytest
+from pycparser import CParser
+from pycparser.c_generator import CGenerator
+
+from c_lang_ssa.cfgpass.cfgpass import CfgPass
+
+PRELUDE = "int printf(const char *format, ...);\nint calls = 0;\nlong next(long v) { calls++; return v; }\n"
+
+PROGRAMS = {
+    'long_condition': "int main() { long v = 4294967297L; switch (v + 0) { case 1: printf(\"1\\n\"); break; "
+                      "case 4294967297L: printf(\"big\\n\"); break; } return 0; }",
+    'unsigned_condition': "int main() { unsigned long v = 0; switch (v - 1) { case 4294967295UL: printf(\"low\\n\"); "
+                          "break; default: printf(\"default\\n\"); } return 0; }",
+    'negative_condition': "int main() { int v = 2; switch (v - 3) { case -1: printf(\"-1\\n\"); break; } return 0; }",
+    'call_condition': "int main() { switch (next(4294967296L)) { case 0: printf(\"0\\n\"); break; "
+                      "case 4294967296L: printf(\"big\\n\"); break; } printf(\"%d\\n\", calls); return 0; }",
+    'increment_condition': "int main() { long v = 4294967296L; switch (v++) { case 0: printf(\"0\\n\"); break; "
+                           "default: printf(\"%ld\\n\", v); } return 0; }",
+}
+
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_switch_behaviour_is_kept(same_behaviour, name):
+    same_behaviour(PRELUDE + PROGRAMS[name])
+
+
+def test_pure_condition_is_not_copied(translate):
+    assert '__switch' not in translate("int f(long v) { switch (v * 2) { case 2: return 1; } return 0; }")
+
+
+def test_ast_is_not_changed():
+    source = "int g; int f(int x) { int y = x; { int x = 2; y += x; } { int g = 1; y += g; } return y + g; }"
+    ast = CParser().parse(source)
+    text = CGenerator().visit(ast)
+    first = CfgPass(ast).func_defs['f']
+    assert CGenerator().visit(ast) == text
+    assert CGenerator().visit(CfgPass(ast).func_defs['f']) == CGenerator().visit(first)
+    assert 'int x_1 = 2;' in CGenerator().visit(first) and 'int g_1 = 1;' in CGenerator().visit(first)
@@ -0,0 +1,64 @@
+from c_lang_ssa.dataflow.dataflow import DataflowSolver, GenKillProblem, Meet
+from c_lang_ssa.liveness.liveness import Liveness
+
+LOOP = [('entry', 'header'), ('header', 'body'), ('body', 'header'), ('header', 'exit')]
+LOOP_STATEMENTS = {
+    'entry': "s = 0; i = 0;",
+    'header': "i < n;",
+    'body': "t = i * 2; s = s + t; i = i + 1;",
+    'exit': "return s;",
+}
+
+
+def test_block_graph_is_in_reverse_postorder(block_graph):
+    (graph, index) = block_graph(LOOP, LOOP_STATEMENTS)
+    assert index['entry'] == 0 and index['header'] < index['body']
+    assert sorted(graph.successors(index['header'])) == sorted([index['body'], index['exit']])
+    assert sorted(graph.predecessors(index['header'])) == sorted([index['entry'], index['body']])
+    for b in range(len(graph)):
+        for e in graph.successor_edges(b):
+            t = graph.succs[e]
+            assert graph.predecessor_edge(t, graph.succ_positions[e]) == e
+    assert len(graph.block_statements(index['body'])) == 3
+
+
+def test_liveness_on_loop(block_graph):
+    (graph, index) = block_graph(LOOP, LOOP_STATEMENTS)
+    liveness = Liveness(graph, ['s', 'i', 't', 'n'])
+
+    def live(bits: int) -> set[str]:
+        return set(liveness.names(bits))
+
+    assert live(liveness.live_in[index['entry']]) == {'n'}
+    assert live(liveness.live_in[index['header']]) == {'s', 'i', 'n'}
+    assert live(liveness.live_out[index['body']]) == {'s', 'i', 'n'}
+    assert live(liveness.live_in[index['body']]) == {'s', 'i', 'n'}
+    assert live(liveness.live_in[index['exit']]) == {'s'}
+    assert live(liveness.live_out[index['exit']]) == set()
+    assert not liveness.is_live_out(index['body'], 't') and liveness.is_live_in(index['header'], 'i')
+    assert liveness.max_pressure() == 3
+
+
+class _Available(GenKillProblem):
+    meet = Meet.INTERSECTION
+
+
+def test_forward_union(block_graph):
+    # facts: 0 defined in entry, 1 defined in body
+    (graph, index) = block_graph(LOOP)
+    gen = [0] * len(graph)
+    gen[index['entry']] = 0b01
+    gen[index['body']] = 0b10
+    solver = DataflowSolver(graph, GenKillProblem(2, gen, [0] * len(graph)))
+    assert solver.ins[index['header']] == 0b11 and solver.outs[index['entry']] == 0b01
+    assert solver.outs[index['exit']] == 0b11
+
+
+def test_forward_intersection(block_graph):
+    # a fact generated only on one side of a diamond is not available at the join
+    (graph, index) = block_graph([('entry', 'left'), ('entry', 'right'), ('left', 'join'), ('right', 'join')])
+    gen = [0] * len(graph)
+    gen[index['entry']] = 0b01
+    gen[index['left']] = 0b10
+    solver = DataflowSolver(graph, _Available(2, gen, [0] * len(graph)))
+    assert solver.ins[index['join']] == 0b01 and solver.outs[index['left']] == 0b11
@@ -0,0 +1,25 @@
+import pytest
+
+from c_lang_ssa.dcepass.dcepass import DCEPass
+from c_lang_ssa.sccppass.sccppass import SCCPPass
+
+PRELUDE = "int printf(const char *format, ...);\nvoid init(int *p) { *p = 7; }\n"
+
+PROGRAMS = {
+    'assigned_in_condition': "int main() { int n = 3; int c = 0; while ((c = n) > 0) n--; printf(\"%d\\n\", c); "
+                             "return 0; }",
+    'chained_assignment': "int main() { int x; int y = 0; x = y = 5; printf(\"%d\\n\", x); return 0; }",
+    'member_address': "int main() { struct { int f; } s; s.f = 1; init(&s.f); printf(\"%d\\n\", s.f); return 0; }",
+    'element_address': "int main() { int a[2]; a[0] = 1; init(&a[0]); printf(\"%d\\n\", a[0]); return 0; }",
+    'dead_code': "int main() { int x = 5; int y = x * 2; y = 3; printf(\"%d\\n\", x); return 0; }",
+}
+
+
+@pytest.mark.parametrize('name', PROGRAMS)
+@pytest.mark.parametrize('passes', [[DCEPass], [SCCPPass, DCEPass]], ids=['dce', 'sccp_dce'])
+def test_behaviour_is_kept(same_behaviour, name, passes):
+    same_behaviour(PRELUDE + PROGRAMS[name], passes)
+
+
+def test_dead_statements_are_removed(translate):
+    assert 'y' not in translate("int f(int x) { int y = x * 2; return x; }", [DCEPass])
@@ -0,0 +1,46 @@
+from c_lang_ssa.dominators.dominators import DominatorTree
+
+DIAMOND = [('entry', 'left'), ('entry', 'right'), ('left', 'join'), ('right', 'join'), ('join', 'exit')]
+LOOP = [('entry', 'header'), ('header', 'body'), ('body', 'latch'), ('latch', 'header'), ('header', 'exit')]
+# both a and b are entered from entry, so neither dominates the other
+IRREDUCIBLE = [('entry', 'a'), ('entry', 'b'), ('a', 'b'), ('b', 'a'), ('b', 'exit')]
+
+
+def _tree(block_graph, edges):
+    (graph, index) = block_graph(edges)
+    tree = DominatorTree(graph)
+    name = {i: n for (n, i) in index.items()}
+    idom = {name[b]: name[tree.idom[b]] for b in range(1, len(graph))}
+    frontiers = {name[b]: {name[f] for f in tree.frontiers[b]} for b in range(len(graph))}
+    return tree, index, idom, frontiers
+
+
+def test_diamond(block_graph):
+    (tree, index, idom, frontiers) = _tree(block_graph, DIAMOND)
+    assert idom == {'left': 'entry', 'right': 'entry', 'join': 'entry', 'exit': 'join'}
+    assert frontiers == {'entry': set(), 'left': {'join'}, 'right': {'join'}, 'join': set(), 'exit': set()}
+    assert tree.dominates(index['entry'], index['exit']) and tree.dominates(index['join'], index['join'])
+    assert not tree.dominates(index['left'], index['join'])
+    assert sorted(tree.iterated_frontier([index['left']])) == [index['join']]
+
+
+def test_loop(block_graph):
+    (tree, index, idom, frontiers) = _tree(block_graph, LOOP)
+    assert idom == {'header': 'entry', 'body': 'header', 'latch': 'body', 'exit': 'header'}
+    assert frontiers == {'entry': set(), 'header': {'header'}, 'body': {'header'}, 'latch': {'header'},
+                         'exit': set()}
+    assert tree.dominates(index['header'], index['latch']) and not tree.dominates(index['latch'], index['header'])
+    assert tree.iterated_frontier([index['body']]) == [index['header']]
+
+
+def test_irreducible(block_graph):
+    (tree, index, idom, frontiers) = _tree(block_graph, IRREDUCIBLE)
+    assert idom == {'a': 'entry', 'b': 'entry', 'exit': 'b'}
+    assert frontiers == {'entry': set(), 'a': {'b'}, 'b': {'a'}, 'exit': set()}
+    assert sorted(tree.iterated_frontier([index['a']])) == sorted([index['a'], index['b']])
+
+
+def test_children_and_orders(block_graph):
+    (tree, index, _, _) = _tree(block_graph, DIAMOND)
+    assert sorted(tree.children[index['entry']]) == sorted(index[n] for n in ('left', 'right', 'join'))
+    assert tree.preorder[index['entry']] == 0 and tree.postorder[index['entry']] == len(index) - 1
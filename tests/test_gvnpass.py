@@ -0,0 +1,54 @@
+import pytest
+from pycparser import CParser
+
+from c_lang_ssa.gvnpass.gvnpass import GVNPass
+from c_lang_ssa.unitpass.unitpass import UnitPass
+
+PRELUDE = "int printf(const char *format, ...);\nint g = 1;\nvoid bump(void) { g++; }\n" \
+          "void set(int *p) { *p += 10; }\n"
+
+# function f of every program and arguments main prints it with
+FUNCTIONS = {
+    'dominating_block': ("int f(int a, int b, int c) { int x = a * b; int y = 0; if (c) y = a * b + 1; "
+                         "else y = b * a; return x + y; }", ["3, 4, 0", "3, 4, 1"]),
+    'sibling_branch': ("int f(int a, int b, int c) { int y = 0; if (c) y = a * b; else y = 1; int z = a * b; "
+                       "return y + z; }", ["3, 4, 0", "3, 4, 1"]),
+    'loop': ("int f(int a, int n) { int s = 0; int k = a + 1; for (int i = 0; i < n; i++) s += a + 1; "
+             "return s + k; }", ["2, 5"]),
+    'call_between': ("int f(int a) { int x = g + a; bump(); int y = g + a; return x * 100 + y; }", ["5"]),
+    'address_taken': ("int f(int a) { int v = a; set(&v); int x = v + 1; set(&v); int y = v + 1; "
+                      "return x * 100 + y; }", ["5"]),
+    'reassigned_operand': ("int f(int a, int b) { int x = a + b; a = a + 1; int y = a + b; return x * 100 + y; }",
+                           ["5, 6"]),
+}
+
+
+def _program(name: str) -> str:
+    (function, calls) = FUNCTIONS[name]
+    prints = ' '.join(f"printf(\"%d\\n\", f({args}));" for args in calls)
+    return f"{PRELUDE}{function}\nint main() {{ {prints} return 0; }}\n"
+
+
+def _eliminated(name: str) -> int:
+    return GVNPass(UnitPass(CParser().parse(PRELUDE + FUNCTIONS[name][0])).functions['f']).eliminated
+
+
+@pytest.mark.parametrize('name', FUNCTIONS)
+def test_behaviour_is_kept(same_behaviour, name):
+    same_behaviour(_program(name), [GVNPass])
+
+
+def test_expressions_of_dominating_blocks_are_reused(translate):
+    assert _eliminated('dominating_block') == 2
+    assert _eliminated('loop') == 1
+    assert 'y_1 = x + 1;' in translate(PRELUDE + FUNCTIONS['dominating_block'][0], [GVNPass])
+
+
+def test_expression_of_sibling_branch_is_not_reused():
+    assert _eliminated('sibling_branch') == 0
+
+
+def test_no_elimination_across_call_or_through_address():
+    assert _eliminated('call_between') == 0
+    assert _eliminated('address_taken') == 0
+    assert _eliminated('reassigned_operand') == 0
@@ -0,0 +1,38 @@
+import shutil
+
+import pytest
+from pycparser import CParser
+from pycparser.c_generator import CGenerator
+
+from c_lang_ssa.ingest.ingest import PreprocessOptions, fake_libc_includes, preprocess, without_fake_libc
+from c_lang_ssa.outofssapass.outofssapass import translate_unit
+from c_lang_ssa.unitpass.unitpass import UnitPass
+
+SOURCE = """#include <stdio.h>
+#include <stdlib.h>
+int square(int v);
+int main(void) { size_t n = 3; printf("%d\\n", square((int) n)); exit(0); }
+int square(int v) { return v * v; }
+"""
+
+
+@pytest.fixture
+def preprocessed(tmp_path):
+    if shutil.which('cpp') is None:
+        pytest.skip('cpp is not available')
+    path = tmp_path / 'program.c'
+    path.write_text(SOURCE)
+    return preprocess(str(path), PreprocessOptions())
+
+
+def test_real_headers_are_included(preprocessed):
+    assert fake_libc_includes(preprocessed) == ['stdio.h', 'stdlib.h']
+
+
+def test_translated_file_compiles(preprocessed, run_c):
+    ast = CParser().parse(preprocessed)
+    unit = UnitPass(ast)
+    c_ast = without_fake_libc(translate_unit(ast, unit.functions))
+    text = ''.join(f"#include <{h}>\n" for h in fake_libc_includes(preprocessed)) + CGenerator().visit(c_ast)
+    assert 'typedef' not in text and 'int square(int v);' in text
+    assert run_c(text) == '9\n'
@@ -0,0 +1,64 @@
+from pycparser import CParser
+
+from c_lang_ssa.loops.loops import InductionVariables, LoopForest
+from c_lang_ssa.unitpass.unitpass import UnitPass
+
+
+def _ssa(source: str, name: str = 'f'):
+    return UnitPass(CParser().parse(source)).functions[name]
+
+
+def _steps(source: str) -> dict[str, int]:
+    return {v.phi.variable: v.step for v in InductionVariables(_ssa(source)).variables}
+
+
+def test_nested_loops():
+    forest = LoopForest(_ssa("int f(int n) { int s = 0; for (int i = 0; i < n; i++) "
+                             "for (int j = 0; j < n; j++) s += j; return s; }").graph)
+    (outer, inner) = forest.loops
+    assert (outer.parent, outer.depth, inner.parent, inner.depth) == (-1, 1, 0, 2)
+    assert outer.children == [1] and forest.max_depth == 2
+    assert not outer.irreducible and not inner.irreducible
+    assert forest.is_nested(1, 0) and not forest.is_nested(0, 1)
+    assert set(forest.body(1)) < set(forest.body(0))
+    assert forest.contains(0, inner.header) and not forest.contains(1, outer.header)
+    assert forest.depth(inner.header) == 2 and forest.depth(0) == 0
+
+
+def test_sibling_loops():
+    forest = LoopForest(_ssa("int f(int n) { int s = 0; while (s < n) s++; while (s > 0) s -= 2; return s; }").graph)
+    assert [(loop.parent, loop.depth) for loop in forest.loops] == [(-1, 1), (-1, 1)]
+    assert forest.back_edges == forest.loops[0].back_edges + forest.loops[1].back_edges
+
+
+def test_irreducible_loop():
+    forest = LoopForest(_ssa("int f(int n) { int i = 0; if (n) goto inside; top: i++; inside: i += 2; "
+                             "if (i < n) goto top; return i; }").graph)
+    (loop,) = forest.loops
+    assert loop.irreducible and len(loop.entries) == 1
+    assert loop.entries[0] != loop.header and forest.contains(0, loop.entries[0])
+
+
+def test_no_loops():
+    forest = LoopForest(_ssa("int f(int n) { if (n) return 1; return 0; }").graph)
+    assert forest.loops == [] and forest.max_depth == 0
+
+
+def test_induction_variables():
+    assert _steps("int f(int n) { int s = 0; for (int i = 0; i < n; i++) s += i; return s; }") == {'i': 1}
+    assert _steps("int f(int n) { int i = n; while (i > 0) { i -= 2; i = i - 1; } return i; }") == {'i': -3}
+    assert _steps("int f(int n) { int i = 0; while (i < n) { i += 2; i -= 2; } return i; }") == {}
+
+
+def test_irreducible_loop_has_no_induction_variables():
+    assert _steps("int f(int n) { int i = 0; if (n) goto inside; top: i++; inside: i += 2; "
+                  "if (i < n) goto top; return i; }") == {}
+
+
+def test_variables_defined_inside_expressions_are_not_induction_variables():
+    assert _steps("int f(int n, int *a) { int i; for (i = 0; i < n; i++) a[i++] = 0; return i; }") == {}
+    assert _steps("int f(int n) { int s = 0; int j = 0; while (j < n) { s += (j += 3); j++; } return s; }") == {}
+
+
+def test_address_taken_variables_are_not_induction_variables():
+    assert _steps("void g(int *p); int f(int n) { int i = 0; while (i < n) { g(&i); i++; } return i; }") == {}
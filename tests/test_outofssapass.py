@@ -0,0 +1,28 @@
+import pytest
+
+from c_lang_ssa.dcepass.dcepass import DCEPass
+from c_lang_ssa.gvnpass.gvnpass import GVNPass
+from c_lang_ssa.sccppass.sccppass import SCCPPass
+
+PRELUDE = "int printf(const char *format, ...);\nint g = 10;\n"
+
+PROGRAMS = {
+    'shadowed': "int main() { int x = 1; { int x = 2; x = x + 1; } printf(\"%d\\n\", x); return 0; }",
+    'shadowed_parameter': "int f(int x) { { int x = 2; x++; } return x; } "
+                          "int main() { printf(\"%d\\n\", f(5)); return 0; }",
+    'shadowed_global': "int main() { int r = 0; { int g = 2; g++; r = g; } g = g + 1; printf(\"%d %d\\n\", r, g); "
+                       "return 0; }",
+    'sibling_scopes': "int main() { int y = 0; { int x = 2; y += x; } { double x = 1.5; y += (int) (x * 2); } "
+                      "printf(\"%d\\n\", y); return 0; }",
+    'loop_scopes': "int main() { int y = 0; for (int i = 0; i < 3; i++) { int i = 5; y += i; } "
+                   "for (int i = 0; i < 2; i++) y += i; printf(\"%d\\n\", y); return 0; }",
+    'nested_assignment': "int main() { int n = 3; int x = 1; int a = x; x = 2; int y = (x = 3) + x; "
+                         "if (n > 2) x = 7; else x = 8; int z = x; while ((x = n) > 0) n--; "
+                         "printf(\"%d %d %d %d\\n\", a, y, z, x); return 0; }",
+}
+
+
+@pytest.mark.parametrize('name', PROGRAMS)
+@pytest.mark.parametrize('passes', [[], [SCCPPass, GVNPass, DCEPass]], ids=['ssa', 'optimized'])
+def test_behaviour_is_kept(same_behaviour, name, passes):
+    same_behaviour(PRELUDE + PROGRAMS[name], passes)
@@ -0,0 +1,34 @@
+import pytest
+
+from c_lang_ssa.sccppass.sccppass import SCCPPass
+
+PRELUDE = "int printf(const char *format, ...);\nvoid init(int *p) { *p = 7; }\n" \
+          "int calls = 0;\nint g(void) { printf(\"g\\n\"); return ++calls; }\n"
+
+PROGRAMS = {
+    'unsigned_wraps': "int main() { unsigned u = 0; u = u - 1; if (u > 5) printf(\"big\\n\"); return 0; }",
+    'double_truncated': "int main() { int x = 3.7; if (x == 3) printf(\"three\\n\"); return 0; }",
+    'char_converted': "int main() { char c = 200; if (c > 100) printf(\"big\\n\"); printf(\"%d\\n\", c); return 0; }",
+    'int_wraps': "int main() { int x = 2147483647; x = x * 2; printf(\"%d\\n\", x); return 0; }",
+    'unsigned_literal': "int main() { int x = -1; if (x < 1u) printf(\"less\\n\"); return 0; }",
+    'address_taken': "int main() { int x = 0; init(&x); if (x) printf(\"%d\\n\", x); return 0; }",
+    'member_address': "int main() { struct { int f; } s; s.f = 0; init(&s.f); printf(\"%d\\n\", s.f); return 0; }",
+    'nested_increment': "int main() { int a[4]; int i = 0; a[i++] = 1; a[i++] = 2; printf(\"%d %d\\n\", i, a[1]); "
+                        "return 0; }",
+    'nested_assignment': "int main() { int x = 0, y = 0; x = y = 5; printf(\"%d %d\\n\", x, y); return 0; }",
+    'constant_branch': "int main() { int x = 4; int y = x * 3; if (y > 10) y = y - 10; else y = 0; "
+                       "printf(\"%d\\n\", y); return 0; }",
+    'loop': "int main() { int s = 0; for (int i = 0; i < 10; i++) s += i; printf(\"%d\\n\", s); return 0; }",
+    'call_in_ternary': "int main() { int y = (g() ? 3 : 3) + 1; printf(\"%d %d\\n\", y, calls); return 0; }",
+    'call_in_ternary_argument': "int main() { printf(\"%d\\n\", g() ? 1 : 1); printf(\"%d\\n\", calls); return 0; }",
+    'increment_in_ternary': "int main() { int i = 0; int y = 0; y = (i++ ? 2 : 2) + 1; printf(\"%d %d\\n\", y, i); return 0; }",
+}
+
+
+@pytest.mark.parametrize('name', PROGRAMS)
+def test_behaviour_is_kept(same_behaviour, name):
+    same_behaviour(PRELUDE + PROGRAMS[name], [SCCPPass])
+
+
+def test_constant_is_folded(translate):
+    assert 'return 12;' in translate("int f() { int x = 4; return x * 3; }", [SCCPPass])
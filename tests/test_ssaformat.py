@@ -0,0 +1,69 @@
+import pytest
+from pycparser import CParser
+
+from c_lang_ssa.ssaformat.ssaformat import SSAReader, SSAWriter, encode_function
+from c_lang_ssa.unitpass.unitpass import UnitPass
+
+SOURCE = """
+int f(int n) { int s = 0; for (int i = 0; i < n; i++) s += i; return s; }
+int g(int x) { if (x > 0) x = x - 1; else x = 0; return x; }
+"""
+
+
+@pytest.fixture
+def functions():
+    return UnitPass(CParser().parse(SOURCE)).functions
+
+
+@pytest.fixture
+def dump(tmp_path, functions):
+    path = tmp_path / 'unit.ssab'
+    with open(path, 'wb') as f, SSAWriter(f) as writer:
+        for (name, ssa) in functions.items():
+            writer.write(name, ssa)
+    return path
+
+
+def test_round_trip(dump, functions):
+    with SSAReader(str(dump)) as reader:
+        assert reader.names() == ['f', 'g'] and 'f' in reader and 'h' not in reader
+        f = reader['f']
+        ssa = functions['f']
+        assert f.name == 'f' and len(f.blocks) == len(ssa.graph)
+        for (b, block) in enumerate(f.blocks):
+            assert block.succs == list(ssa.graph.successors(b))
+            assert [name for (name, _) in block.phis] == [phi.name for phi in ssa.phis[b]]
+            assert len(block.statements) == len(ssa.graph.block_statements(b))
+        assert any(block.is_condition for block in f.blocks)
+        phi_args = [args for block in f.blocks for (_, args) in block.phis]
+        assert any(len(args) == 2 and all(args) for args in phi_args)
+        assert [record.name for record in reader] == ['f', 'g']
+
+
+def test_truncated_file_keeps_complete_records(dump, functions):
+    data = dump.read_bytes()
+    (first, second) = (len(encode_function(name, functions[name])) for name in ('f', 'g'))
+    # header, length and the first record, length and half of the second one: index and footer are gone
+    dump.write_bytes(data[:6 + 4 + first + 4 + second // 2])
+    with SSAReader(str(dump)) as reader:
+        assert reader.names() == ['f']
+        assert reader['f'].name == 'f'
+
+
+def test_unclosed_file_is_indexed_by_records(tmp_path, functions):
+    path = tmp_path / 'unit.ssab'
+    with open(path, 'wb') as f:
+        writer = SSAWriter(f)
+        writer.write('f', functions['f'])
+        writer.write('g', functions['g'])
+    with SSAReader(str(path)) as reader:
+        assert reader.names() == ['f', 'g']
+
+
+@pytest.mark.parametrize('data', [b'', b'CS', b'XXXX\x01\x00', b'CSSA\x63\x00'], ids=['empty', 'short', 'magic',
+                                                                                       'version'])
+def test_corrupted_header_is_rejected(tmp_path, data):
+    path = tmp_path / 'bad.ssab'
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        SSAReader(str(path))
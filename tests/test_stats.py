@@ -0,0 +1,46 @@
+import tracemalloc
+
+import pytest
+
+from c_lang_ssa.stats.stats import Stats, phase
+
+
+@pytest.fixture
+def tracing():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def test_nested_phase_keeps_peak_of_enclosing_one(tracing):
+    stats = Stats()
+    with phase(stats, 'outer'):
+        block = bytearray(4 * 1024 * 1024)
+        del block
+        with phase(stats, 'outer.inner'):
+            small = bytearray(1024 * 1024)
+            del small
+    assert stats.peak['outer'] >= 4 * 1024 * 1024
+    assert 1024 * 1024 <= stats.peak['outer.inner'] < 4 * 1024 * 1024
+
+
+def test_peak_of_nested_phase_counts_for_enclosing_one(tracing):
+    stats = Stats()
+    with phase(stats, 'outer'):
+        with phase(stats, 'outer.inner'):
+            block = bytearray(4 * 1024 * 1024)
+            del block
+        small = bytearray(1024 * 1024)
+        del small
+    assert stats.peak['outer'] >= 4 * 1024 * 1024
+    assert stats.peak['outer.inner'] >= 4 * 1024 * 1024
+
+
+def test_counters_and_time_without_tracing():
+    stats = Stats()
+    with phase(stats, 'a'):
+        stats.count('a.items', 3)
+    with phase(None, 'b'):
+        pass
+    assert stats.counters['a.items'] == 3 and stats.seconds['a'] >= 0
+    assert 'a' not in stats.peak and 'b' not in stats.seconds